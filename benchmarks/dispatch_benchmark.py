@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Command Dispatch Benchmark
+--------------------------
+Measures per-utterance dispatch latency of the old linear re.search() scan
+against CommandDispatcher (precompiled scan and keyword-indexed), with 35,
+500 and 5,000 registered patterns.
+
+The first patterns are the real ones from VoiceAssistant.init_commands (read
+from the source, so no audio/TTS dependencies are needed); the rest are
+synthetic skill intents appended after them.
+
+Usage:
+    python benchmarks/dispatch_benchmark.py
+    python benchmarks/dispatch_benchmark.py --sizes 35 500 5000 --rounds 200
+"""
+
+import argparse
+import ast
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.command_dispatcher import CommandDispatcher
+
+UTTERANCES = [
+    "what's the weather in athens",
+    "forecast for lamia",
+    "what is the moon phase",
+    "when's the next full moon",
+    "what time is it",
+    "tell me about albert einstein",
+    "play bohemian rhapsody on spotify",
+    "next song",
+    "set volume to 40 percent",
+    "remind me to call mom at 3 pm",
+    "goodbye",
+    "something nobody registered a pattern for",
+]
+
+
+def load_assistant_patterns():
+    """Read the command patterns from VoiceAssistant.init_commands without importing it"""
+    with open(os.path.join(ROOT, "voice_assistant.py"), encoding="utf-8") as source:
+        tree = ast.parse(source.read())
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and node.name == "init_commands":
+            for child in ast.walk(node):
+                if isinstance(child, ast.Dict):
+                    return [key.value for key in child.keys
+                            if isinstance(key, ast.Constant) and isinstance(key.value, str)]
+    return []
+
+
+def build_patterns(size, base_patterns):
+    """Pad the real patterns with synthetic intents up to the requested size"""
+    patterns = list(base_patterns[:size])
+    index = 0
+    while len(patterns) < size:
+        patterns.append(rf"(?:turn|switch) (on|off) (?:the )?device{index}(?: in (.+))?")
+        index += 1
+    return patterns
+
+
+def linear_dispatch(patterns, text):
+    """The original process_command loop"""
+    for pattern in patterns:
+        matches = re.search(pattern, text, re.IGNORECASE)
+        if matches:
+            return pattern
+    return None
+
+
+def time_per_call(func, rounds):
+    """Average seconds per utterance over several rounds of the utterance set"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in UTTERANCES:
+            func(text)
+    return (time.perf_counter() - start) / (rounds * len(UTTERANCES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Command dispatch latency benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[35, 500, 5000])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    base_patterns = load_assistant_patterns()
+    print(f"Loaded {len(base_patterns)} patterns from voice_assistant.py")
+    print(f"{'patterns':>10} {'linear (us)':>14} {'compiled (us)':>15} {'indexed (us)':>14} {'speedup':>9} {'build (ms)':>12}")
+
+    for size in args.sizes:
+        patterns = build_patterns(size, base_patterns)
+        # Scale rounds down for large catalogs so every size finishes in seconds
+        rounds = max(1, args.rounds * 35 // size)
+
+        # Warm the re module cache the same way a running assistant would
+        linear_dispatch(patterns, UTTERANCES[0])
+        linear = time_per_call(lambda text: linear_dispatch(patterns, text), rounds)
+
+        build_start = time.perf_counter()
+        dispatcher = CommandDispatcher({pattern: None for pattern in patterns})
+        build_time = time.perf_counter() - build_start
+        scanner = CommandDispatcher({pattern: None for pattern in patterns}, use_index=False)
+
+        # Every engine must agree on the winning pattern for every utterance
+        for text in UTTERANCES:
+            expected = linear_dispatch(patterns, text)
+            for engine in (scanner, dispatcher):
+                func, matches = engine.match(text)
+                actual = matches.re.pattern if matches else None
+                assert actual == expected, f"Mismatch for '{text}': {actual!r} != {expected!r}"
+
+        compiled = time_per_call(scanner.match, rounds)
+        indexed = time_per_call(dispatcher.match, rounds)
+        print(f"{size:>10} {linear * 1e6:>14.1f} {compiled * 1e6:>15.1f} {indexed * 1e6:>14.1f} "
+              f"{linear / indexed:>8.1f}x {build_time * 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
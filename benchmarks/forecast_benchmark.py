@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Forecast Aggregation Benchmark
+------------------------------
+Compares the original get_weather_forecast aggregation (per-slot
+datetime.fromtimestamp + strftime, per-day lists, max(set, key=count) mode,
+strptime for day names) with ForecastAggregator on synthetic OpenWeatherMap
+forecast payloads of increasing size.
+
+Usage:
+    python benchmarks/forecast_benchmark.py
+    python benchmarks/forecast_benchmark.py --slots 40 4000 400000 --days 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import timeit
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.forecast_aggregator import ForecastAggregator
+
+DESCRIPTIONS = ["clear sky", "few clouds", "scattered clouds", "broken clouds", "light rain",
+                "moderate rain", "thunderstorm", "snow", "mist", "overcast clouds"]
+
+
+def synthetic_payload(slots, slot_seconds):
+    """Build a forecast payload with a given number of slots, starting now"""
+    rng = random.Random(0)
+    start = int(time.time())
+    entries = []
+    for i in range(slots):
+        temp = 15 + rng.uniform(-8, 8)
+        entry = {
+            "dt": start + i * slot_seconds,
+            "main": {"temp_min": round(temp - rng.uniform(0, 2), 2),
+                     "temp_max": round(temp + rng.uniform(0, 2), 2),
+                     "humidity": rng.randint(30, 95)},
+            "weather": [{"description": rng.choice(DESCRIPTIONS)}],
+            "wind": {"speed": round(rng.uniform(0, 12), 2)},
+            "pop": round(rng.random(), 2),
+        }
+        if rng.random() < 0.3:
+            entry["rain"] = {"3h": round(rng.uniform(0, 4), 2)}
+        entries.append(entry)
+    return {"city": {"name": "Athens", "timezone": 7200}, "list": entries}
+
+
+def legacy_aggregate(forecast_data, max_days):
+    """The original aggregation loop from get_weather_forecast"""
+    day_forecast_data = {}
+    day_forecasts = {}
+    today = datetime.now().strftime("%Y-%m-%d")
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+
+    for forecast in forecast_data['list']:
+        forecast_date = datetime.fromtimestamp(forecast['dt'])
+        forecast_day = forecast_date.strftime("%Y-%m-%d")
+        if forecast_day not in day_forecast_data and len(day_forecast_data) < max_days:
+            day_forecast_data[forecast_day] = {'descriptions': [], 'temp_mins': [], 'temp_maxs': []}
+        if forecast_day in day_forecast_data:
+            day_forecast_data[forecast_day]['descriptions'].append(forecast['weather'][0]['description'])
+            day_forecast_data[forecast_day]['temp_mins'].append((forecast['main']['temp_min']))
+            day_forecast_data[forecast_day]['temp_maxs'].append((forecast['main']['temp_max']))
+
+    for forecast_day, data in day_forecast_data.items():
+        descriptions = data['descriptions']
+        description = max(set(descriptions), key=descriptions.count)
+        temp_min = min(data['temp_mins'])
+        temp_max = max(data['temp_maxs'])
+        if forecast_day == today:
+            day_name = "Today"
+        elif forecast_day == tomorrow:
+            day_name = "Tomorrow"
+        else:
+            day_name = datetime.strptime(forecast_day, "%Y-%m-%d").strftime("%A")
+        day_forecasts[day_name] = {'description': description, 'high': temp_max, 'low': temp_min}
+    return day_forecasts
+
+
+def per_call_us(func, budget=0.5):
+    """Average microseconds per call, running for roughly budget seconds"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    runs = max(1, int(number * budget / 0.2))
+    return min(timer.repeat(repeat=3, number=runs)) / runs * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast aggregation benchmark")
+    parser.add_argument("--slots", type=int, nargs="+", default=[40, 4000, 400000],
+                        help="Forecast slots per payload (OpenWeatherMap returns 40)")
+    parser.add_argument("--days", type=int, default=5, help="Days to aggregate")
+    args = parser.parse_args()
+
+    aggregator = ForecastAggregator(days=args.days)
+    print(f"{'slots':>8} {'legacy µs':>14} {'aggregator µs':>14} {'speedup':>9}")
+    for slots in args.slots:
+        # Spread the slots over the requested days so every day gets a large bucket
+        slot_seconds = max(1, args.days * 86400 // slots) if slots > args.days * 8 else 10800
+        payload = synthetic_payload(slots, slot_seconds)
+        legacy = per_call_us(lambda: legacy_aggregate(payload, args.days))
+        current = per_call_us(lambda: aggregator.aggregate(payload["list"], payload["city"]["timezone"]))
+        print(f"{slots:>8} {legacy:>14.1f} {current:>14.1f} {legacy / current:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Gazetteer Lookup Benchmark
+--------------------------
+Times place-name resolution over a large gazetteer: the trigram-indexed
+Gazetteer against difflib.get_close_matches over the same names (what
+WeatherSkill.match_location used to do over its five cities).
+
+Uses an OpenWeatherMap city list when given, otherwise synthesizes names.
+
+Usage:
+    python benchmarks/gazetteer_benchmark.py
+    python benchmarks/gazetteer_benchmark.py --city-list city.list.json.gz
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from difflib import get_close_matches
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.gazetteer import Gazetteer, Place
+
+SYLLABLES = ["la", "mi", "a", "the", "ns", "ko", "pa", "tras", "her", "ak", "li", "on", "sa", "lo",
+             "ni", "ki", "ber", "lin", "par", "is", "ro", "ma", "vi", "en", "na", "to", "ky", "mo"]
+
+
+def synthetic_places(count):
+    """Random pronounceable place names"""
+    rng = random.Random(1)
+    return [Place("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize(),
+                  rng.choice(["GR", "US", "DE", "FR", "IT"]), index)
+            for index in range(count)]
+
+
+def misspell(name, rng):
+    """Replace one letter, like a misrecognized vowel ("lemia" for "Lamia")"""
+    position = rng.randrange(len(name))
+    return name[:position] + rng.choice("aeiou") + name[position + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gazetteer lookup benchmark")
+    parser.add_argument("--city-list", help="OpenWeatherMap city.list.json(.gz)")
+    parser.add_argument("--places", type=int, default=200000, help="Synthetic places without --city-list")
+    parser.add_argument("--queries", type=int, default=200, help="Misspelled names to resolve")
+    parser.add_argument("--difflib-queries", type=int, default=5, help="Queries for the (slow) difflib baseline")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.city_list:
+        gazetteer = Gazetteer.load(args.city_list)
+    else:
+        gazetteer = Gazetteer(synthetic_places(args.places))
+    print(f"Indexed {len(gazetteer)} places ({len(gazetteer.index)} distinct names) "
+          f"in {time.perf_counter() - start:.2f} s")
+
+    rng = random.Random(2)
+    names = gazetteer.index.strings
+    queries = [misspell(rng.choice(names), rng) for _ in range(args.queries)]
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        gazetteer.resolve(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"{'trigram index':<24} p50 {statistics.median(timings):8.2f} ms   "
+          f"p99 {timings[min(len(timings) - 1, int(len(timings) * 0.99))]:8.2f} ms")
+
+    timings = []
+    for query in queries[:args.difflib_queries]:
+        start = time.perf_counter()
+        get_close_matches(query, names, n=1, cutoff=0.6)
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"{'difflib linear scan':<24} p50 {statistics.median(timings):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
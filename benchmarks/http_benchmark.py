@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+HTTP Client Pooling Benchmark
+-----------------------------
+Compares bare requests.get() (a new connection per request, as the skills
+used to do) with the shared pooled HttpClient against a local stub server
+that answers with a small JSON body, like the weather and astronomy APIs.
+
+The stub can add a delay to every new connection (--handshake-ms) to stand in
+for the TCP + TLS round trips a real HTTPS API costs; pooling only pays it once
+per connection. Reports requests/sec and p50/p99 latency, sequentially and
+with several concurrent callers.
+
+Usage:
+    python benchmarks/http_benchmark.py
+    python benchmarks/http_benchmark.py --requests 500 --handshake-ms 30 --threads 4
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import requests
+
+from utils.http_client import HttpClient
+
+BODY = json.dumps({
+    "name": "Athens",
+    "sys": {"country": "GR"},
+    "main": {"temp": 21.4, "humidity": 52},
+    "weather": [{"main": "Clear", "description": "clear sky"}],
+    "wind": {"speed": 3.1, "deg": 200},
+}).encode()
+
+
+def make_handler(handshake_delay):
+    """Build a keep-alive request handler that delays each new connection"""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            # Headers and body go out as separate writes; without this, Nagle's algorithm
+            # and delayed ACKs add ~40 ms to every reused connection
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if handshake_delay:
+                time.sleep(handshake_delay)
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def run(get, url, count, threads):
+    """Issue count GET requests from a number of threads; return (wall seconds, latencies)"""
+
+    def one(_):
+        start = time.perf_counter()
+        response = get(url)
+        response.json()
+        return time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+    if threads == 1:
+        latencies = [one(i) for i in range(count)]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(one, range(count)))
+    return time.perf_counter() - wall_start, latencies
+
+
+def report(name, wall, latencies):
+    """Print requests/sec and latency percentiles"""
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    p99 = latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * 0.99))]
+    print(f"{name:<32} {len(latencies_ms) / wall:>10.0f} {statistics.median(latencies_ms):>10.2f} {p99:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pooled vs unpooled HTTP benchmark")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per run")
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent callers for the concurrent runs")
+    parser.add_argument("--handshake-ms", type=float, default=20,
+                        help="Delay added to every new connection, standing in for TCP/TLS setup")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.handshake_ms / 1000))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/data/2.5/weather"
+
+    client = HttpClient(pool_maxsize=max(10, args.threads))
+    print(f"{args.requests} requests per run, {args.handshake_ms:.0f} ms per new connection")
+    print(f"{'client':<32} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    try:
+        for threads in (1, args.threads):
+            label = "sequential" if threads == 1 else f"{threads} threads"
+            report(f"requests.get ({label})", *run(lambda u: requests.get(u, timeout=10), url, args.requests, threads))
+            report(f"HttpClient pooled ({label})", *run(client.get, url, args.requests, threads))
+    finally:
+        client.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
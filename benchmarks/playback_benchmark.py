@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Playback Confirmation Benchmark
+-------------------------------
+Times SpotifySkill's playback commands (play song, next, previous, resume)
+against the local Spotify API stub (spotify_stub.py) with three ways of
+reporting what's playing afterwards:
+
+    fixed wait   the original time.sleep(2) before reading the playback state
+    poll         polling with exponential backoff until the change shows up
+    background   returning at once and polling on a background thread
+
+The stub makes each change visible only after --settle-ms, standing in for
+the delay before the Spotify servers reflect a command.
+
+Usage:
+    python benchmarks/playback_benchmark.py
+    python benchmarks/playback_benchmark.py --commands 5 --settle-ms 150 600
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.spotify_stub import SpotifyStub, write_token_cache
+from skills.spotify_skill import SpotifySkill
+from utils.http_client import HttpClient
+
+
+class FixedWaitSkill(SpotifySkill):
+    """SpotifySkill reading the playback state after a fixed two-second sleep, as before"""
+
+    def get_currently_playing(self, sp=None, settled=None):
+        time.sleep(2)
+        return super().get_currently_playing(sp)
+
+
+def measure(command, count, setup=None):
+    """Latencies in milliseconds of count calls of a command, running setup (untimed) before each"""
+    latencies = []
+    for _ in range(count):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = command()
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not result.get("success"):
+            raise RuntimeError(result.get("error"))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Playback confirmation latency benchmark")
+    parser.add_argument("--commands", type=int, default=3, help="Calls per command")
+    parser.add_argument("--settle-ms", type=float, nargs="+", default=[300],
+                        help="Delay before a command shows up in the playback state")
+    parser.add_argument("--handshake-ms", type=float, default=20,
+                        help="Delay added to every new connection, standing in for TCP/TLS setup")
+    args = parser.parse_args()
+
+    cache_path = write_token_cache(tempfile.mkdtemp())
+    redirect_uri = "http://127.0.0.1:8888/callback"
+    http = HttpClient()
+    print(f"{args.commands} calls per command, {args.handshake_ms:.0f} ms per new connection")
+    print(f"{'settle ms':>9} {'command':<10} {'fixed wait':>12} {'poll':>12} {'background':>12}   (p50 ms)")
+    try:
+        for settle_ms in args.settle_ms:
+            stub = SpotifyStub(handshake_ms=args.handshake_ms, settle_ms=settle_ms).start()
+            # Searching every time, so each "play song" plays a different track
+            options = dict(http=http, cache_path=cache_path, search_cache_path=None, search_ttl=0, search_stale_ttl=0)
+            skills = [FixedWaitSkill("id", "secret", redirect_uri, **options),
+                      SpotifySkill("id", "secret", redirect_uri, **options),
+                      SpotifySkill("id", "secret", redirect_uri, confirm_in_background=True, **options)]
+            for skill in skills:
+                stub.point(skill)
+
+            def pause(skill):
+                skill.pause_playback()
+                time.sleep(settle_ms / 1000)
+
+            def listen(skill):
+                # Spoken commands are seconds apart, so the current track has been playing a while
+                time.sleep(2)
+
+            commands = [("play song", lambda skill: skill.play_song("bring me to life"), None),
+                        ("next", lambda skill: skill.next_track(), listen),
+                        ("previous", lambda skill: skill.previous_track(), listen),
+                        ("resume", lambda skill: skill.resume_playback(), pause)]
+            for name, command, setup in commands:
+                medians = []
+                for skill in skills:
+                    # Let background confirmations of the previous command finish first
+                    time.sleep(settle_ms / 1000 + 0.2)
+                    medians.append(statistics.median(measure(lambda: command(skill), args.commands,
+                                                             setup and (lambda: setup(skill)))))
+                print(f"{settle_ms:>9.0f} {name:<10} " + " ".join(f"{median:>12.1f}" for median in medians))
+
+            time.sleep(settle_ms / 1000 + 0.2)
+            for skill in skills:
+                skill.client.stop()
+            stub.shutdown()
+    finally:
+        http.close()
+
+
+if __name__ == "__main__":
+    main()
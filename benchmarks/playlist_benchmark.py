@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Playlist Lookup Benchmark
+-------------------------
+Compares finding a playlist the way play_playlist used to (known .env
+playlists, then the first 50 library playlists fetched on every request,
+then a remote search) with PlaylistCatalog, against the local Spotify API
+stub holding a library of --playlists playlists.
+
+Reports how long loading the catalog takes (sequential and concurrent
+paging, and from disk after a restart), lookup latency for exact,
+misrecognized and partial names, and how many requests each approach
+resolves to the right playlist.
+
+Usage:
+    python benchmarks/playlist_benchmark.py
+    python benchmarks/playlist_benchmark.py --playlists 5000 --latency-ms 80
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.spotify_stub import SpotifyStub, write_token_cache
+from skills.spotify_client import SpotifyClient
+from skills.spotify_playlists import PlaylistCatalog
+from utils.http_client import HttpClient
+
+SCOPE = "user-read-playback-state,user-modify-playback-state,user-read-currently-playing,playlist-read-private"
+
+
+def legacy_lookup(sp, spoken, aliases):
+    """The lookup order of the original play_playlist, minus starting playback"""
+    spoken = spoken.lower().strip()
+    known = {uri: variations for uri, variations in aliases}
+    for uri, variations in known.items():
+        if spoken in variations:
+            return uri
+    for uri, variations in known.items():
+        for variation in variations:
+            if variation in spoken:
+                return uri
+    for playlist in sp.current_user_playlists(limit=50)["items"]:
+        if spoken in playlist["name"].lower():
+            return playlist["uri"]
+    results = sp.search(q=spoken, type="playlist", limit=5)
+    return results["playlists"]["items"][0]["uri"]
+
+
+def misrecognize(name, rng):
+    """Drop or swap a letter, as speech recognition might"""
+    letters = list(name)
+    i = rng.choice([i for i in range(1, len(letters) - 1) if letters[i].isalpha() and letters[i + 1].isalpha()])
+    if rng.random() < 0.5:
+        del letters[i]
+    else:
+        letters[i], letters[i + 1] = letters[i + 1], letters[i]
+    return "".join(letters)
+
+
+def timed(func):
+    """(result, milliseconds) of calling func"""
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Playlist lookup benchmark")
+    parser.add_argument("--playlists", type=int, default=2000, help="Playlists in the library")
+    parser.add_argument("--lookups", type=int, default=50, help="Lookups per kind of name")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Server time per request")
+    parser.add_argument("--handshake-ms", type=float, default=20,
+                        help="Delay added to every new connection, standing in for TCP/TLS setup")
+    args = parser.parse_args()
+
+    stub = SpotifyStub(handshake_ms=args.handshake_ms, latency_ms=args.latency_ms,
+                       playlists=args.playlists).start()
+    directory = tempfile.mkdtemp()
+    cache_path = write_token_cache(directory)
+    http = HttpClient(pool_maxsize=16)
+    client = SpotifyClient("id", "secret", "http://127.0.0.1:8888/callback", SCOPE, http=http, cache_path=cache_path)
+    client.spotify.prefix = f"{stub.base}/v1/"
+    aliases = [("spotify:playlist:liked", ["liked songs", "my liked songs", "saved songs", "favorites"]),
+               ("spotify:playlist:weekly", ["discover weekly"])]
+
+    print(f"{args.playlists} playlists, {args.latency_ms:.0f} ms per request, "
+          f"{args.handshake_ms:.0f} ms per new connection")
+    catalog_path = os.path.join(directory, "playlists.json")
+    for workers in (1, 8):
+        catalog = PlaylistCatalog(client, path=None, workers=workers, aliases=aliases)
+        _, elapsed = timed(catalog.ensure_loaded)
+        print(f"catalog load from Spotify, {workers} worker(s): {elapsed:8.1f} ms")
+    catalog.path = catalog_path
+    catalog._save()
+    restarted = PlaylistCatalog(client, path=catalog_path, aliases=aliases)
+    _, elapsed = timed(restarted.ensure_loaded)
+    print(f"catalog load from disk:               {elapsed:8.1f} ms")
+    _, elapsed = timed(restarted.refresh)
+    print(f"background refresh, nothing changed:  {elapsed:8.1f} ms")
+
+    rng = random.Random(0)
+    picks = [rng.choice(stub.playlists) for _ in range(args.lookups)]
+    kinds = [("exact name", [(p["name"], p["uri"]) for p in picks]),
+             ("misrecognized", [(misrecognize(p["name"], rng), p["uri"]) for p in picks]),
+             ("alias in request", [("play my liked songs", "spotify:playlist:liked")] * args.lookups)]
+
+    print(f"\n{'lookup':<18} {'legacy p50 ms':>14} {'legacy right':>13} {'catalog p50 ms':>15} {'catalog right':>14}")
+    for kind, requests in kinds:
+        legacy_times, catalog_times, legacy_right, catalog_right = [], [], 0, 0
+        for spoken, uri in requests:
+            found, elapsed = timed(lambda: legacy_lookup(client.spotify, spoken, aliases))
+            legacy_times.append(elapsed)
+            legacy_right += found == uri
+            found, elapsed = timed(lambda: restarted.resolve(spoken))
+            catalog_times.append(elapsed)
+            catalog_right += bool(found) and found[0] == uri
+        print(f"{kind:<18} {statistics.median(legacy_times):>14.2f} {legacy_right:>8}/{len(requests):<4} "
+              f"{statistics.median(catalog_times):>15.3f} {catalog_right:>9}/{len(requests):<4}")
+
+    client.stop()
+    http.close()
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Playlist Intent Benchmark
+-------------------------
+Measures how long matching the "play <playlist> on spotify" intent takes per
+utterance as the user's alias table grows, comparing a regex alternation of
+every alias (how init_commands used to spell out the playlist names) with
+PhraseCommand, which finds the aliases with a word-level PhraseTrie.
+
+The aliases are made-up three-word playlist names. The utterances ask for
+the first and last alias, a song that isn't a playlist and something
+unrelated to Spotify; both matchers must agree on every one.
+
+Usage:
+    python benchmarks/playlist_intent_benchmark.py
+    python benchmarks/playlist_intent_benchmark.py --sizes 10 1000 10000 50000 --rounds 500
+"""
+
+import argparse
+import itertools
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.spotify_stub import WORDS
+from utils.command_dispatcher import PhraseCommand
+from utils.phrase_trie import PhraseTrie
+
+BEFORE = r"play (?:the )?"
+AFTER = r"(?: on| in)? spotify"
+
+
+def make_aliases(count):
+    """count distinct three-word playlist names"""
+    names = (" ".join(words) for words in itertools.product(WORDS, repeat=3))
+    return [name.lower() for name in itertools.islice(names, count)]
+
+
+def time_per_call(func, utterances, rounds):
+    """Average microseconds per utterance"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in utterances:
+            func(text)
+    return (time.perf_counter() - start) / (rounds * len(utterances)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Playlist intent matching benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'aliases':>8} {'regex build ms':>15} {'trie build ms':>14} {'regex us':>10} {'trie us':>9} {'speedup':>9}")
+    for size in args.sizes:
+        aliases = make_aliases(size)
+        utterances = [f"play the {aliases[0]} on spotify", f"play {aliases[-1]} spotify",
+                      "play bring me to life on spotify", "what's the weather in athens"]
+
+        start = time.perf_counter()
+        regex = re.compile(BEFORE + "(" + "|".join(map(re.escape, aliases)) + ")" + AFTER, re.IGNORECASE)
+        regex_build = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        command = PhraseCommand(BEFORE, PhraseTrie(aliases), AFTER)
+        trie_build = (time.perf_counter() - start) * 1000
+
+        for text in utterances:
+            expected, actual = regex.search(text), command.search(text)
+            assert (expected and expected.group(1)) == (actual and actual.group(1)), \
+                f"Mismatch for '{text}': {actual and actual.group(1)!r} != {expected and expected.group(1)!r}"
+
+        # Scale rounds down for large tables so every size finishes in seconds
+        rounds = max(5, args.rounds * 100 // max(size, 100))
+        regex_time = time_per_call(regex.search, utterances, rounds)
+        trie_time = time_per_call(command.search, utterances, args.rounds)
+        print(f"{size:>8} {regex_build:>15.1f} {trie_build:>14.1f} {regex_time:>10.1f} {trie_time:>9.1f} "
+              f"{regex_time / trie_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Song Search Benchmark
+---------------------
+Times SpotifySkill.play_song against the local Spotify API stub
+(spotify_stub.py) and counts the API requests each call makes, not counting
+the playback state reads that confirm what's playing:
+
+    uncached      every call searches Spotify, as before the search cache
+    cold          the first request for each song
+    repeat        the same songs again, answered from the search cache
+    stale devices first requests that also have to fetch the device list again
+    speculative   the same, with the search started as soon as the command
+                  was recognized (prefetch_song), so the two overlap
+
+Playback is confirmed in the background, as in the assistant, so the times
+are up to Spotify accepting the command.
+
+Usage:
+    python benchmarks/song_search_benchmark.py
+    python benchmarks/song_search_benchmark.py --songs 50 --latency-ms 80
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.spotify_stub import SpotifyStub, write_token_cache
+from skills.spotify_skill import SpotifySkill
+from utils.http_client import HttpClient
+
+
+def measure(stub, skill, songs, setup=None):
+    """(p50 ms, API requests per call) of playing each song, running setup(song) (untimed) before each"""
+    latencies, requests = [], []
+    for song in songs:
+        if setup:
+            setup(song)
+        before = stub.api_calls()
+        start = time.perf_counter()
+        result = skill.play_song(song)
+        latencies.append((time.perf_counter() - start) * 1000)
+        requests.append(stub.api_calls() - before)
+        if not result.get("success"):
+            raise RuntimeError(result.get("error"))
+    return statistics.median(latencies), statistics.mean(requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Song search cache benchmark")
+    parser.add_argument("--songs", type=int, default=20, help="Distinct songs requested")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Server time per request")
+    parser.add_argument("--handshake-ms", type=float, default=20,
+                        help="Delay added to every new connection, standing in for TCP/TLS setup")
+    args = parser.parse_args()
+
+    stub = SpotifyStub(handshake_ms=args.handshake_ms, latency_ms=args.latency_ms).start()
+    directory = tempfile.mkdtemp()
+    cache_path = write_token_cache(directory)
+    http = HttpClient()
+    redirect_uri = "http://127.0.0.1:8888/callback"
+    uncached = SpotifySkill("id", "secret", redirect_uri, http=http, cache_path=cache_path,
+                            confirm_in_background=True, search_cache_path=None, search_ttl=0, search_stale_ttl=0)
+    cached = SpotifySkill("id", "secret", redirect_uri, http=http, cache_path=cache_path,
+                          confirm_in_background=True, search_cache_path=os.path.join(directory, "searches.json"))
+    for skill in (uncached, cached):
+        stub.point(skill)
+        # Cache the device list, as in a running assistant
+        skill.devices.preferred()
+
+    songs = [f"song number {i}" for i in range(args.songs)]
+
+    def new_songs(kind):
+        return [f"{kind} song {i}" for i in range(args.songs)]
+
+    def stale_devices(song):
+        # The device list has gone stale, so the command has to fetch it again
+        cached.devices.invalidate()
+
+    def speculate(song):
+        stale_devices(song)
+        cached.prefetch_song(song)
+
+    print(f"{args.songs} songs, {args.latency_ms:.0f} ms per request, {args.handshake_ms:.0f} ms per new connection")
+    print(f"{'play song':<14} {'p50 ms':>8} {'requests':>9}")
+    rows = [("uncached", measure(stub, uncached, songs)),
+            ("cold", measure(stub, cached, songs)),
+            ("repeat", measure(stub, cached, songs)),
+            ("stale devices", measure(stub, cached, new_songs("other"), stale_devices)),
+            ("speculative", measure(stub, cached, new_songs("speculated"), speculate))]
+    for name, (median, requests) in rows:
+        print(f"{name:<14} {median:>8.1f} {requests:>9.1f}")
+
+    # Let the background confirmations finish before the stub goes away
+    time.sleep(1)
+    for skill in (uncached, cached):
+        skill.client.stop()
+    http.close()
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
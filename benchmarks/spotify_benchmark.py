@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Spotify Command Latency Benchmark
+---------------------------------
+Times the pause, next and volume commands of SpotifySkill against a local
+stub of the Spotify Web API, once with a new spotipy client, OAuth manager
+and devices() lookup per command (as the skill used to do) and once with the
+long-lived SpotifyClient and cached DeviceRegistry. Also counts the API
+requests each command makes, not counting the playback state reads that
+confirm what's playing.
+
+Like http_benchmark.py, the stub (spotify_stub.py) can add a delay to every
+new connection (--handshake-ms) to stand in for the TCP + TLS handshake with
+api.spotify.com.
+
+Usage:
+    python benchmarks/spotify_benchmark.py
+    python benchmarks/spotify_benchmark.py --commands 100 --handshake-ms 40
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import spotipy
+from spotipy.oauth2 import SpotifyOAuth
+
+from benchmarks.spotify_stub import SpotifyStub, write_token_cache
+from skills.spotify_skill import SpotifySkill
+from utils.http_client import HttpClient
+
+
+class PerCommandClientSkill(SpotifySkill):
+    """SpotifySkill building a new client and OAuth manager and listing devices for every command, as before"""
+
+    def _get_spotify_client(self):
+        auth_manager = SpotifyOAuth(client_id=self.client_id, client_secret=self.client_secret,
+                                    redirect_uri=self.redirect_uri, scope=self.scope,
+                                    cache_path=self.cache_path)
+        auth_manager.OAUTH_TOKEN_URL = f"{self.stub.base}/api/token"
+        sp = spotipy.Spotify(auth_manager=auth_manager)
+        sp.prefix = f"{self.stub.base}/v1/"
+        self.command_client = sp
+        return sp
+
+    def _ensure_active_device(self):
+        # Every command gets its client first, then looked up the devices with it
+        devices = self.command_client.devices()["devices"]
+        return self.devices._choose(devices)[0]["id"], None
+
+
+def measure(command, count):
+    """Latencies in milliseconds of count calls of a command"""
+    # One untimed call first, so the device list is cached like in a running assistant
+    command()
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        result = command()
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not result.get("success"):
+            raise RuntimeError(result.get("error"))
+    return latencies
+
+
+def report(name, latencies, calls):
+    """Print latency percentiles and API requests per command"""
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<32} {statistics.median(latencies):>10.2f} {statistics.mean(latencies):>10.2f} {p99:>10.2f} "
+          f"{calls:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spotify command latency benchmark")
+    parser.add_argument("--commands", type=int, default=50, help="Calls per command")
+    parser.add_argument("--handshake-ms", type=float, default=20,
+                        help="Delay added to every new connection, standing in for TCP/TLS setup")
+    args = parser.parse_args()
+
+    stub = SpotifyStub(handshake_ms=args.handshake_ms).start()
+    cache_path = write_token_cache(tempfile.mkdtemp())
+    redirect_uri = "http://127.0.0.1:8888/callback"
+
+    before = PerCommandClientSkill("id", "secret", redirect_uri, cache_path=cache_path, confirm_in_background=True)
+    before.cache_path, before.stub = cache_path, stub
+
+    http = HttpClient()
+    after = SpotifySkill("id", "secret", redirect_uri, http=http, cache_path=cache_path, confirm_in_background=True)
+    stub.point(after)
+
+    print(f"{args.commands} calls per command, {args.handshake_ms:.0f} ms per new connection")
+    print(f"{'command':<32} {'p50 ms':>10} {'mean ms':>10} {'p99 ms':>10} {'requests':>10}")
+    try:
+        for label, skill in (("per-command client", before), ("long-lived client", after)):
+            for name, command in (("pause", skill.pause_playback), ("next", skill.next_track),
+                                  ("volume", lambda: skill.set_volume(40))):
+                calls = stub.api_calls()
+                latencies = measure(command, args.commands)
+                report(f"{name} ({label})", latencies, (stub.api_calls() - calls) / (args.commands + 1))
+    finally:
+        after.client.stop()
+        http.close()
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Local stub of the Spotify Web API for the Spotify benchmarks
+------------------------------------------------------------
+Answers the player, search, playlist and token endpoints SpotifySkill uses
+and keeps a little playback state (track, context, playing, volume), so
+commands really change what current_playback() returns. Like a real device,
+a change only becomes visible settle_ms after the command. Every new
+connection can be delayed by handshake_ms to stand in for TCP + TLS setup,
+and every request by latency_ms for the server's response time.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SCOPE = "user-read-playback-state,user-modify-playback-state,user-read-currently-playing,playlist-read-private"
+TRACKS = [{"uri": f"spotify:track:{i:022d}", "name": f"Track {i}", "artists": [{"name": "Stub Artist"}],
+           "album": {"name": "Stub Album"}, "duration_ms": 200000} for i in range(50)]
+DEVICES = {"devices": [
+    {"id": "desktop", "name": "Desktop", "type": "Computer", "is_active": True, "volume_percent": 50},
+]}
+# Playlist names are made of two of these, for up to 2500 distinct names
+WORDS = ["Amber", "Autumn", "Blue", "Brass", "Cedar", "Chill", "Cosmic", "Crystal", "Dawn", "Desert", "Drift",
+         "Echo", "Ember", "Evening", "Faded", "Feather", "Golden", "Harbor", "Hollow", "Indigo", "Jazz", "Lantern",
+         "Lunar", "Marble", "Meadow", "Midnight", "Mountain", "Neon", "Northern", "Ocean", "Pale", "Paper",
+         "Quiet", "Rain", "Rusty", "Saffron", "Silver", "Slow", "Solar", "Static", "Summer", "Tide", "Velvet",
+         "Violet", "Wander", "Whisper", "Wild", "Winter", "Wooden", "Zephyr"]
+TOKEN = {"access_token": "stub-token", "token_type": "Bearer", "expires_in": 3600, "refresh_token": "stub-refresh"}
+
+
+def _progress(state, now):
+    """Playback position in ms of a state at a monotonic time"""
+    elapsed = max(0, now - state["since"]) if state["playing"] else 0
+    return int(state["progress"] + elapsed * 1000)
+
+
+class SpotifyStub:
+    """A threaded stub server with playback state"""
+
+    def __init__(self, handshake_ms=20, settle_ms=0, latency_ms=0, playlists=0):
+        self.handshake = handshake_ms / 1000
+        self.settle = settle_ms / 1000
+        self.latency = latency_ms / 1000
+        self.playlists = [{"name": f"{WORDS[i // len(WORDS) % len(WORDS)]} {WORDS[i % len(WORDS)]}",
+                           "uri": f"spotify:playlist:{i:022d}", "snapshot_id": "1"} for i in range(playlists)]
+        self.requests = 0
+        self.calls = Counter()  # (method, path) -> requests
+        self._lock = threading.Lock()
+        # progress is the position at monotonic time "since" and advances while playing
+        self._visible = self._state = {"index": 0, "context": None, "playing": True, "progress": 60000,
+                                       "since": time.monotonic(), "volume": 50}
+        self._visible_at = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def api_calls(self):
+        """Requests so far, not counting playback state reads (confirmation polls) and token refreshes"""
+        return sum(count for (method, path), count in self.calls.items()
+                   if not (method == "GET" and path.endswith("/me/player")) and not path.startswith("/api/"))
+
+    def point(self, skill):
+        """Send a SpotifySkill's long-lived client to the stub"""
+        skill.client.spotify.prefix = f"{self.base}/v1/"
+        skill.client.auth_manager.OAUTH_TOKEN_URL = f"{self.base}/api/token"
+
+    # --- State --- #
+    def playback(self):
+        """The state current_playback() sees, lagging commands by settle seconds"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._state if now >= self._visible_at else self._visible
+        return {"is_playing": state["playing"], "progress_ms": _progress(state, now),
+                "context": {"uri": state["context"]} if state["context"] else None,
+                "device": DEVICES["devices"][0], "item": TRACKS[state["index"]]}
+
+    def change(self, **changes):
+        """Apply a command to the state; it shows up after the settle delay"""
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._visible_at:
+                self._visible = self._state
+            state = dict(self._state, progress=_progress(self._state, now), since=now)
+            state.update(changes)
+            self._state = state
+            self._visible_at = now + self.settle
+
+    def _skip(self, step):
+        index = (self._state["index"] + step) % len(TRACKS)
+        self.change(index=index, progress=0, playing=True)
+
+    # --- HTTP --- #
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out as separate writes; without this, Nagle's algorithm
+                # and delayed ACKs add ~40 ms to every reused connection
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                if stub.handshake:
+                    time.sleep(stub.handshake)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    return json.loads(raw) if raw else {}
+                except ValueError:
+                    return {}
+
+            def _reply(self, payload=None):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                stub.requests += 1
+                stub.calls[self.command, urlparse(self.path).path] += 1
+                body = json.dumps(payload).encode() if payload is not None else b""
+                self.send_response(200 if body else 204)
+                if body:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.endswith("/me/player/devices"):
+                    self._reply(DEVICES)
+                elif url.path.endswith("/me/player"):
+                    self._reply(stub.playback())
+                elif url.path.endswith("/search"):
+                    query = parse_qs(url.query).get("q", [""])[0]
+                    # A different track each time, so playing it is a change
+                    index = (sum(map(ord, query)) + stub.requests) % len(TRACKS)
+                    self._reply({"tracks": {"items": [TRACKS[index]]},
+                                 "playlists": {"items": [{"name": query, "uri": "spotify:playlist:search"}]}})
+                elif url.path.endswith("/me/playlists"):
+                    query = parse_qs(url.query)
+                    limit, offset = int(query.get("limit", ["50"])[0]), int(query.get("offset", ["0"])[0])
+                    self._reply({"items": stub.playlists[offset:offset + limit], "total": len(stub.playlists),
+                                 "limit": limit, "offset": offset})
+                else:
+                    self._reply({"items": [], "next": None})
+
+            def do_PUT(self):
+                path, body = urlparse(self.path).path, self._body()
+                if path.endswith("/play"):
+                    if body.get("uris"):
+                        index = next(i for i, track in enumerate(TRACKS) if track["uri"] == body["uris"][0])
+                        stub.change(index=index, context=None, progress=0, playing=True)
+                    elif body.get("context_uri"):
+                        stub.change(context=body["context_uri"], index=0, progress=0, playing=True)
+                    else:
+                        stub.change(playing=True)
+                elif path.endswith("/pause"):
+                    stub.change(playing=False)
+                elif path.endswith("/volume"):
+                    volume = parse_qs(urlparse(self.path).query).get("volume_percent", ["50"])[0]
+                    stub.change(volume=int(volume))
+                self._reply()
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                self._body()
+                if path.startswith("/api/token"):
+                    self._reply(TOKEN)
+                    return
+                if path.endswith("/next"):
+                    stub._skip(1)
+                elif path.endswith("/previous"):
+                    stub._skip(-1)
+                self._reply()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def write_token_cache(directory):
+    """Write a valid cached token, as after the first browser login, and return its path"""
+    path = os.path.join(directory, ".cache")
+    with open(path, "w") as cache_file:
+        json.dump(dict(TOKEN, scope=SCOPE.replace(",", " "), expires_at=int(time.time()) + 3600), cache_file)
+    return path
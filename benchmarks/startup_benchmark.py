@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+-----------------
+Measures time-to-first-prompt of `python main.py text` and `python main.py voice`:
+the wall time from launching the process until the assistant prints that it is
+active. Each run is a fresh interpreter, so import cost is included.
+
+Pass --baseline with a git revision to measure that revision too (checked out
+into a temporary worktree) and compare it against the current tree.
+
+Usage:
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --baseline HEAD~1 --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Line printed by each mode once the assistant is ready for the user
+READY_MARKERS = {
+    "text": "Text Assistant is active",
+    "voice": "Voice Assistant is active",
+}
+
+
+def time_to_prompt(repo, mode, timeout):
+    """Launch main.py in a mode and return the seconds until its ready line, or None"""
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py", mode],
+        cwd=repo,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding="utf-8",
+        errors="replace"
+    )
+    # Don't let a run that never gets ready hang the benchmark
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    try:
+        for line in process.stdout:
+            if READY_MARKERS[mode] in line:
+                return time.perf_counter() - start
+        return None
+    finally:
+        timer.cancel()
+        process.kill()
+        process.wait()
+
+
+def measure(repo, mode, runs, timeout):
+    """Time several launches and return the successful timings in milliseconds"""
+    timings = []
+    for _ in range(runs):
+        elapsed = time_to_prompt(repo, mode, timeout)
+        if elapsed is not None:
+            timings.append(elapsed * 1000)
+    return timings
+
+
+def report(label, mode, timings, runs):
+    """Print one result row"""
+    if not timings:
+        print(f"{label:<12} {mode:<6} {'no ready line (see main.py output)':>40}")
+        return
+    print(f"{label:<12} {mode:<6} {statistics.median(timings):>12.0f} {min(timings):>12.0f} "
+          f"{len(timings):>6}/{runs}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-first-prompt benchmark for main.py")
+    parser.add_argument("--modes", nargs="+", default=["text", "voice"], choices=sorted(READY_MARKERS))
+    parser.add_argument("--runs", type=int, default=5, help="Launches per mode")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for a ready line")
+    parser.add_argument("--baseline", help="Git revision to compare against (e.g. HEAD~1)")
+    args = parser.parse_args()
+
+    trees = [("current", ROOT)]
+    worktree = None
+    if args.baseline:
+        worktree = tempfile.mkdtemp(prefix="startup-baseline-")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, args.baseline],
+                       cwd=ROOT, check=True, capture_output=True)
+        trees.insert(0, (args.baseline, worktree))
+
+    try:
+        print(f"{'tree':<12} {'mode':<6} {'median ms':>12} {'min ms':>12} {'runs':>8}")
+        for mode in args.modes:
+            for label, repo in trees:
+                report(label, mode, measure(repo, mode, args.runs, args.timeout), args.runs)
+    finally:
+        if worktree:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=ROOT, capture_output=True)
+
+
+if __name__ == "__main__":
+    main()
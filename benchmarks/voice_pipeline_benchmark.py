@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Voice Pipeline Replay Harness
+-----------------------------
+Drives VoiceAssistant.start_voice_mode end to end from recorded sessions
+(16 kHz mono 16-bit WAV or raw PCM) instead of the microphone, so the wake
+word -> capture -> recognition -> dispatch path can be measured in CI or on
+machines without a sound card. Replays run faster than real time unless
+--realtime is given.
+
+Reports frames processed per second and the wake-to-dispatch latency of every
+command found in the recordings.
+
+By default commands are only resolved to their intent, not executed, and TTS
+is printed instead of spoken. Pass --transcripts to replace online speech
+recognition with one line of text per captured command.
+
+Usage:
+    python benchmarks/voice_pipeline_benchmark.py session.wav
+    python benchmarks/voice_pipeline_benchmark.py session.wav --transcripts session.txt --execute
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from voice_assistant import VoiceAssistant
+from utils.audio_sources import FileAudioSource
+
+
+def replay(assistant, path, realtime):
+    """Replay one recording through voice mode and collect its measurements"""
+    latencies = []
+    original_process_command = assistant.process_command
+
+    def timed_process_command(text):
+        if assistant.last_wake_time is not None:
+            latencies.append(time.perf_counter() - assistant.last_wake_time)
+        return original_process_command(text)
+
+    assistant.process_command = timed_process_command
+    assistant.is_active = True
+    source = FileAudioSource(path, realtime=realtime)
+
+    start = time.perf_counter()
+    assistant.start_voice_mode(audio_source=source)
+    elapsed = time.perf_counter() - start
+
+    assistant.process_command = original_process_command
+    return source, elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded sessions through the voice pipeline")
+    parser.add_argument("recordings", nargs="+", help="WAV or raw PCM session recordings")
+    parser.add_argument("--transcripts", help="Text file with one recognized command per line")
+    parser.add_argument("--execute", action="store_true", help="Run the matched command handlers")
+    parser.add_argument("--realtime", action="store_true", help="Pace the replay like a live microphone")
+    args = parser.parse_args()
+
+    assistant = VoiceAssistant()
+    # Print responses instead of synthesizing them
+    assistant.speak = lambda text, text_color=None: print(f"Assistant: {text}")
+
+    if args.transcripts:
+        with open(args.transcripts, encoding="utf-8") as transcript_file:
+            transcripts = iter([line.strip().lower() for line in transcript_file if line.strip()])
+        assistant._recognize = lambda audio: next(transcripts, None)
+
+    if not args.execute:
+        def resolve_only(text):
+            # Resolve the intent but skip the handler (and its network calls)
+            assistant.dispatcher.match(text)
+            return None
+
+        assistant.process_command = resolve_only
+
+    total_frames = 0
+    total_audio = 0.0
+    total_elapsed = 0.0
+    all_latencies = []
+    for path in args.recordings:
+        source, elapsed, latencies = replay(assistant, path, args.realtime)
+        total_frames += source.frames_read
+        total_audio += source.position
+        total_elapsed += elapsed
+        all_latencies.extend(latencies)
+        print(f"{path}: {source.frames_read} frames, {source.position:.1f} s of audio in {elapsed:.2f} s, "
+              f"{len(latencies)} command(s)")
+
+    print()
+    print(f"Frames processed:     {total_frames}")
+    print(f"Frames per second:    {total_frames / total_elapsed:.0f} ({total_audio / total_elapsed:.1f}x real time)")
+    if all_latencies:
+        latencies_ms = sorted(latency * 1000 for latency in all_latencies)
+        print(f"Wake-to-dispatch ms:  mean {statistics.mean(latencies_ms):.1f}, "
+              f"p50 {statistics.median(latencies_ms):.1f}, max {latencies_ms[-1]:.1f}")
+    else:
+        print("No commands were dispatched; check the recordings contain a wake word.")
+
+
+if __name__ == "__main__":
+    main()
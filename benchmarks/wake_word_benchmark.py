@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Wake Word Frame Path Benchmark
+------------------------------
+Replays a recorded PCM file through WakeWordDetector.listen and compares the
+old struct.unpack_from() frame conversion with the reusable array('h') path,
+the NumPy view path and batched reads. Reports frames/sec and the CPU share
+needed to keep up with real time.
+
+Without --access-key, a stub engine stands in for Porcupine; it converts each
+frame to a ctypes array exactly like pvporcupine.process() does, so only the
+detection itself is left out.
+
+Usage:
+    python benchmarks/wake_word_benchmark.py --pcm recording.wav
+    python benchmarks/wake_word_benchmark.py --seconds 300 --batch 4
+"""
+
+import argparse
+import ctypes
+import os
+import random
+import struct
+import sys
+import time
+import wave
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.wake_word_detector import WakeWordDetector, numpy
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 512
+
+
+class StubPorcupine:
+    """Stand-in engine doing the same per-frame conversion as pvporcupine"""
+    sample_rate = SAMPLE_RATE
+    frame_length = FRAME_LENGTH
+
+    def process(self, pcm):
+        if len(pcm) != self.frame_length:
+            raise ValueError("Invalid frame length")
+        (ctypes.c_short * len(pcm))(*pcm)
+        return -1
+
+    def delete(self):
+        pass
+
+
+class ReplayStream:
+    """Minimal stand-in for a PyAudio input stream that plays back a buffer"""
+
+    def __init__(self, pcm):
+        self.pcm = pcm
+        self.offset = 0
+
+    def read(self, num_frames, exception_on_overflow=True):
+        size = num_frames * 2
+        data = self.pcm[self.offset:self.offset + size]
+        self.offset += size
+        return data
+
+    def get_read_available(self):
+        return (len(self.pcm) - self.offset) // 2
+
+    def close(self):
+        pass
+
+
+def load_pcm(path, seconds):
+    """Load 16 kHz mono 16-bit PCM from a WAV/raw file, or synthesize noise"""
+    if path:
+        if path.lower().endswith(".wav"):
+            with wave.open(path, "rb") as wav:
+                if wav.getframerate() != SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                    raise SystemExit("Expected a 16 kHz mono 16-bit WAV file")
+                return wav.readframes(wav.getnframes())
+        with open(path, "rb") as raw:
+            return raw.read()
+
+    rng = random.Random(0)
+    samples = [int(rng.gauss(0, 300)) for _ in range(SAMPLE_RATE)]
+    return struct.pack(f"{len(samples)}h", *samples) * seconds
+
+
+def run_legacy(engine, pcm):
+    """The original listen() loop: read, struct.unpack_from, process"""
+    stream = ReplayStream(pcm)
+    frames = 0
+    while True:
+        data = stream.read(engine.frame_length)
+        if len(data) < engine.frame_length * 2:
+            return frames
+        engine.process(struct.unpack_from("h" * engine.frame_length, data))
+        frames += 1
+
+
+def run_detector(engine, pcm, frames_per_read, use_numpy):
+    """Drive the real WakeWordDetector.listen over the recording"""
+    detector = WakeWordDetector(access_key=None, frames_per_read=frames_per_read, use_numpy=use_numpy)
+    detector.porcupine = engine
+    detector.audio_stream = ReplayStream(pcm)
+    detector._prepare_buffers()
+
+    # Stop before the final partial batch
+    batch_bytes = engine.frame_length * 2 * frames_per_read
+    batches = len(pcm) // batch_bytes
+    for _ in range(batches):
+        detector.listen()
+    return batches * frames_per_read
+
+
+def measure(name, func, audio_seconds):
+    """Time a run and print frames/sec and CPU share at real time"""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    frames = func()
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    print(f"{name:<28} {frames / wall:>12.0f} {cpu / audio_seconds * 100:>10.2f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wake word frame path benchmark")
+    parser.add_argument("--pcm", help="16 kHz mono 16-bit WAV or raw PCM recording")
+    parser.add_argument("--seconds", type=int, default=120, help="Length of synthetic audio without --pcm")
+    parser.add_argument("--batch", type=int, default=4, help="Frames per read for the batched run")
+    parser.add_argument("--access-key", help="Use the real Porcupine engine with this access key")
+    args = parser.parse_args()
+
+    if args.access_key:
+        import pvporcupine
+        engine = pvporcupine.create(access_key=args.access_key, keywords=["jarvis"])
+    else:
+        engine = StubPorcupine()
+
+    pcm = load_pcm(args.pcm, args.seconds)
+    audio_seconds = len(pcm) / 2 / SAMPLE_RATE
+    print(f"Replaying {audio_seconds:.0f} s of audio ({len(pcm) // (FRAME_LENGTH * 2)} frames)")
+    print(f"{'frame path':<28} {'frames/sec':>12} {'CPU':>11}")
+
+    measure("struct.unpack_from (old)", lambda: run_legacy(engine, pcm), audio_seconds)
+    measure("array('h') buffer", lambda: run_detector(engine, pcm, 1, False), audio_seconds)
+    measure(f"array('h') x{args.batch} per read", lambda: run_detector(engine, pcm, args.batch, False), audio_seconds)
+    if numpy is not None:
+        measure("numpy int16 view", lambda: run_detector(engine, pcm, 1, True), audio_seconds)
+        measure(f"numpy x{args.batch} per read", lambda: run_detector(engine, pcm, args.batch, True), audio_seconds)
+    else:
+        print("numpy is not installed; skipping the NumPy frame path")
+
+    engine.delete()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,162 +1,188 @@
 import base64
-import requests
 import datetime
-from datetime import datetime, timezone as dt_timezone, timedelta
+import threading
+from datetime import datetime, timezone as dt_timezone
 from colorama import init, Fore, Style
 from pytz import timezone as pytz_timezone
+from utils.http_client import HttpClient
+from utils.lunar_ephemeris import PHASE_EVENTS, moon_phase
+from utils.lunar_events import LunarEventTable
+from utils.period_memo import PeriodMemo
 
 init(autoreset=False)
 
+# Degrees of elongation either side of new/first quarter/full/last quarter that
+# still count as that phase: the Moon gains ~12.2 degrees a day on the Sun, so
+# this names the phase for about 12 hours either side of the exact instant
+PRINCIPAL_PHASE_TOLERANCE = 6.1
+
 class MoonPhaseSkill:
     """Skill for retrieving the current moon phase."""
     
-    def __init__(self, api_key):
-        """Initialize with API key"""
+    def __init__(self, api_key, http=None, cross_check=False, timezone="Europe/Athens", memo_period=3600):
+        """Initialize with API key and the shared HTTP client
+        
+        The phase is computed locally; with cross_check the astronomyapi.com
+        answer is also fetched in the background and any disagreement printed.
+        Results are memoized until the next memo_period boundary (3600 for the
+        top of the hour, 86400 for midnight) in the given time zone.
+        """
         self.api_key = api_key
+        self.http = http or HttpClient()
+        self.cross_check = cross_check
+        self.timezone_name = timezone
+        self.timezone = pytz_timezone(timezone)
+        self.memo = PeriodMemo(memo_period, self.timezone)
+        self.lunar_events = LunarEventTable()
+        self._auth_header = None
         self.base_url = "https://api.astronomyapi.com/api/v2/bodies/positions"
         
     def get_moon_phase(self, date=None):
-        """Get the current moon phase information"""
+        """Get the current moon phase information (date is an optional "YYYY-MM-DD" at the current time)"""
+        key = ("phase", self.timezone_name, date)
+        result = self.memo.lookup(key)
+        if result is None:
+            result = self._compute_moon_phase(date)
+            if result["success"]:
+                self.memo.store(key, result)
+        return result
+    
+    def _compute_moon_phase(self, date=None):
+        """Compute the moon phase information, without the memo"""
         try:
             # Ensure the date and time are in UTC
             now_utc = datetime.now(dt_timezone.utc)
-            date = date or now_utc.strftime("%Y-%m-%d")
-            time = now_utc.strftime("%H:%M:%S")
+            when = now_utc
+            if date:
+                when = datetime.strptime(date, "%Y-%m-%d").replace(
+                    hour=now_utc.hour, minute=now_utc.minute, second=now_utc.second, tzinfo=dt_timezone.utc)
             
-            auth = base64.b64encode(f"{self.api_key['app_id']}:{self.api_key['app_secret']}".encode()).decode()
+            phase = moon_phase(when)
+            phase_name = self._get_phase_name(phase["angle"])
+            illumination = phase["illumination"]
             
-            params = {
-                'latitude': 0,  # Replace with your latitude
-                'longitude': 0,  # Replace with your longitude
-                'elevation': 0,  # Replace with your elevation
-                'from_date': date,
-                'to_date': date,
-                'time': time,
-                'bodies': 'moon',
-            }
-            
-            headers = {
-                
-                'Authorization': f'Basic {auth}'
-            }
+            if self.cross_check:
+                threading.Thread(target=self._cross_check, args=(when, phase_name, illumination),
+                                 name="moon-cross-check", daemon=True).start()
             
-            response = requests.get(self.base_url, headers=headers, params=params)
+            response_text = f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}The current moon phase is{Style.RESET_ALL} {Fore.CYAN}{phase_name}{Style.RESET_ALL} {Style.BRIGHT}{Fore.LIGHTYELLOW_EX}with an illumination of approximately{Style.RESET_ALL} {Fore.CYAN}{round(illumination * 100)}%.{Style.RESET_ALL}"
+            detailed_info = (f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}Moon Phase:{Style.RESET_ALL} {Fore.CYAN}{phase_name}{Style.RESET_ALL}\n"
+                            f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}Illumination: {Style.RESET_ALL} {Fore.CYAN}{round(illumination * 100)}%{Style.RESET_ALL}\n")
             
-            if response.status_code == 200:
-                data = response.json()
-
-                # Extract moon phase data correctly
-                moon_data = data['data']['table']['rows'][1]['cells'][0]  # Access the moon entry
-                phase_name = moon_data['extraInfo']['phase']['string']  # Correct field for phase name
-                fraction = moon_data['extraInfo']['phase']['fraction']
-
-                # Fallback logic for illumination
-                if float(fraction) == 0.0:
-                    if "New Moon" in phase_name:
-                        illumination = 0.0
-                    elif "Waxing Crescent" in phase_name:
-                        illumination = 0.25
-                    elif "First Quarter" in phase_name:
-                        illumination = 0.5
-                    elif "Waxing Gibbous" in phase_name:
-                        illumination = 0.75
-                    elif "Full Moon" in phase_name:
-                        illumination = 1.0
-                    elif "Waning Gibbous" in phase_name:
-                        illumination = 0.75
-                    elif "Last Quarter" in phase_name:
-                        illumination = 0.5
-                    elif "Waning Crescent" in phase_name:
-                        illumination = 0.25
-                    else:
-                        illumination = 0.0
-                else:
-                    illumination = float(fraction)  # Convert fraction to float
-
-                response_text = f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}The current moon phase is{Style.RESET_ALL} {Fore.CYAN}{phase_name}{Style.RESET_ALL} {Style.BRIGHT}{Fore.LIGHTYELLOW_EX}with an illumination of approximately{Style.RESET_ALL} {Fore.CYAN}{int(illumination * 100)}%.{Style.RESET_ALL}"
-                detailed_info = (f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}Moon Phase:{Style.RESET_ALL} {Fore.CYAN}{phase_name}{Style.RESET_ALL}\n"
-                                f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}Illumination: {Style.RESET_ALL} {Fore.CYAN}{int(illumination * 100)}%{Style.RESET_ALL}\n")
-
-                return {
-                    "success": True,
-                    "speech": response_text,
-                    "detailed_info": detailed_info,
-                    "phase": phase_name,
-                    "illumination": illumination,
-                    "phase_angle": None,
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"API error: {response.status_code} - {response.reason}"
-                }
+            return {
+                "success": True,
+                "speech": response_text,
+                "detailed_info": detailed_info,
+                "phase": phase_name,
+                "illumination": illumination,
+                "phase_angle": phase["angle"],
+            }
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e)
             }
-    def _get_phase_name(self, angle):
+    
+    def _get_api_phase(self, when):
+        """Get (phase name, illuminated fraction) from astronomyapi.com"""
+        if self._auth_header is None:
+            auth = base64.b64encode(f"{self.api_key['app_id']}:{self.api_key['app_secret']}".encode()).decode()
+            self._auth_header = f'Basic {auth}'
+        
+        params = {
+            'latitude': 0,  # Replace with your latitude
+            'longitude': 0,  # Replace with your longitude
+            'elevation': 0,  # Replace with your elevation
+            'from_date': when.strftime("%Y-%m-%d"),
+            'to_date': when.strftime("%Y-%m-%d"),
+            'time': when.strftime("%H:%M:%S"),
+            'bodies': 'moon',
+        }
+        
+        headers = {
+            'Authorization': self._auth_header
+        }
+        
+        response = self.http.get(self.base_url, headers=headers, params=params)
+        if response.status_code != 200:
+            raise RuntimeError(f"API error: {response.status_code} - {response.reason}")
+        
+        # Access the moon entry
+        moon_data = response.json()['data']['table']['rows'][1]['cells'][0]
+        return moon_data['extraInfo']['phase']['string'], float(moon_data['extraInfo']['phase']['fraction'])
+    
+    def _cross_check(self, when, phase_name, illumination):
+        """Compare the computed phase with astronomyapi.com and report disagreements"""
+        try:
+            api_name, api_fraction = self._get_api_phase(when)
+        except Exception as e:
+            print(f"Moon phase cross-check failed: {e}")
+            return
+        
+        # The API sometimes reports a fraction of 0.0 for every phase; only compare real values
+        fraction_differs = api_fraction != 0.0 and abs(api_fraction - illumination) > 0.05
+        if api_name.lower() != phase_name.lower() or fraction_differs:
+            print(f"Moon phase cross-check: computed {phase_name} ({illumination:.2f}), "
+                  f"astronomyapi.com says {api_name} ({api_fraction:.2f})")
+    
+    def _get_phase_name(self, angle, tolerance=PRINCIPAL_PHASE_TOLERANCE):
             """Get the name of the moon phase based on the angle"""
-            if angle == 0:
+            angle %= 360
+            if angle < tolerance or angle > 360 - tolerance:
                 return "New Moon"
-            elif 0 < angle < 90:
+            elif angle < 90 - tolerance:
                 return "Waxing Crescent"
-            elif angle == 90:
+            elif angle <= 90 + tolerance:
                 return "First Quarter"
-            elif 90 < angle < 180:
+            elif angle < 180 - tolerance:
                 return "Waxing Gibbous"
-            elif angle == 180:
+            elif angle <= 180 + tolerance:
                 return "Full Moon"
-            elif 180 < angle < 270:
+            elif angle < 270 - tolerance:
                 return "Waning Gibbous"
-            elif angle == 270:
+            elif angle <= 270 + tolerance:
                 return "Last Quarter"
             else:
                 return "Waning Crescent"
     
     def get_next_full_moon(self):
         """Get the date of the next full moon"""
+        return self.get_next_event("Full Moon")
+    
+    def get_next_event(self, phase):
+        """Get the date of the next new moon, first quarter, full moon or last quarter"""
         try:
-            # Adjusted list of known full moon dates for 2025
-            full_moons_2025 = [
-                datetime(2025, 1, 13, 22, 27, tzinfo=dt_timezone.utc),
-                datetime(2025, 2, 12, 13, 53, tzinfo=dt_timezone.utc),
-                datetime(2025, 3, 14, 2, 55, tzinfo=dt_timezone.utc),
-                datetime(2025, 4, 13, 13, 22, tzinfo=dt_timezone.utc),  # Corrected to April 13, 2025
-                datetime(2025, 5, 12, 0, 56, tzinfo=dt_timezone.utc),   # Corrected to May 12, 2025
-                datetime(2025, 6, 10, 15, 2, tzinfo=dt_timezone.utc),
-                datetime(2025, 7, 10, 6, 37, tzinfo=dt_timezone.utc),
-                datetime(2025, 8, 8, 23, 2, tzinfo=dt_timezone.utc),
-                datetime(2025, 9, 7, 15, 10, tzinfo=dt_timezone.utc),
-                datetime(2025, 10, 7, 5, 48, tzinfo=dt_timezone.utc),
-                datetime(2025, 11, 5, 18, 19, tzinfo=dt_timezone.utc),
-                datetime(2025, 12, 5, 4, 15, tzinfo=dt_timezone.utc),
-            ]
-
-            # Get current date and time
-            now_utc = datetime.now(dt_timezone.utc)
-
-            # Find the next full moon after the current time or within the next 24 hours
-            next_full_moon_date = next((fm for fm in full_moons_2025 if fm >= now_utc), None)
-
-            if not next_full_moon_date:
-                # If no future full moon is found, estimate using the last known date
-                last_full_moon = full_moons_2025[-1]
-                lunar_cycle = 29.53059  # Average lunar cycle in days
-                next_full_moon_date = last_full_moon + timedelta(days=lunar_cycle)
-
-            # Define Greece time zone
-            GREECE_TZ = pytz_timezone("Europe/Athens")
+            key = ("next", self.timezone_name, self.lunar_events.angle_of(phase))
+        except ValueError as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+        result = self.memo.lookup(key)
+        if result is None:
+            result = self._compute_next_event(phase)
+            if result["success"]:
+                # The answer changes once the event itself has passed
+                self.memo.store(key, result, expires_at=result["timestamp"])
+        return result
+    
+    def _compute_next_event(self, phase):
+        """Compute the date of the next event of a phase, without the memo"""
+        try:
+            # Computed lunar events, looked up with a binary search
+            event_timestamp = self.lunar_events.next_event(phase)
+            next_event = datetime.fromtimestamp(event_timestamp, dt_timezone.utc)
+            phase_name = PHASE_EVENTS[self.lunar_events.angle_of(phase)]
 
-            # Convert the next full moon date to the Greece time zone
-            local_next_full_moon_date = next_full_moon_date.astimezone(GREECE_TZ)
+            # Convert the event date to the local time zone
+            local_event_date = next_event.astimezone(self.timezone)
 
-            # Format the date in the Greece time zone
-            formatted_date = local_next_full_moon_date.strftime("%A, %B %d, %Y")
+            # Format the date in the local time zone
+            formatted_date = local_event_date.strftime("%A, %B %d, %Y")
 
-            # Calculate days until the next full moon
-            local_now = datetime.now(GREECE_TZ)
-            days_until_next = (local_next_full_moon_date - local_now).total_seconds() / (24 * 3600)
+            # Calculate days until the event
+            local_now = datetime.now(self.timezone)
+            days_until_next = (local_event_date - local_now).total_seconds() / (24 * 3600)
 
             # Round up partial days to the next full day
             days_away = int(days_until_next) if days_until_next.is_integer() else int(days_until_next) + 1
@@ -169,11 +195,13 @@ class MoonPhaseSkill:
             else:
                 time_description = f"in {days_away} days"
 
-            response_text = f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}The next full moon will be{Style.RESET_ALL} {Fore.CYAN}{time_description}{Style.RESET_ALL}, {Style.BRIGHT}{Fore.LIGHTYELLOW_EX}on{Style.RESET_ALL} {Fore.CYAN}{formatted_date}.{Style.RESET_ALL}"
+            response_text = f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}The next {phase_name.lower()} will be{Style.RESET_ALL} {Fore.CYAN}{time_description}{Style.RESET_ALL}, {Style.BRIGHT}{Fore.LIGHTYELLOW_EX}on{Style.RESET_ALL} {Fore.CYAN}{formatted_date}.{Style.RESET_ALL}"
 
             return {
                 "success": True,
+                "phase": phase_name,
                 "date": formatted_date,
+                "timestamp": event_timestamp,
                 "days_away": days_away,
                 "speech": response_text
             }
@@ -181,4 +209,43 @@ class MoonPhaseSkill:
             return {
                 "success": False,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+    
+    def get_full_moons(self, year=None):
+        """Get every full moon of a year (the current year by default)"""
+        key = ("full moons", self.timezone_name, year)
+        result = self.memo.lookup(key)
+        if result is None:
+            result = self._compute_full_moons(year)
+            if result["success"]:
+                # The count still to come changes at the next full moon
+                self.memo.store(key, result, expires_at=self.lunar_events.next_event("Full Moon"))
+        return result
+    
+    def _compute_full_moons(self, year=None):
+        """Compute every full moon of a year, without the memo"""
+        try:
+            now = datetime.now(self.timezone)
+            year = int(year) if year else now.year
+            
+            dates = [datetime.fromtimestamp(timestamp, dt_timezone.utc).astimezone(self.timezone)
+                     for timestamp in self.lunar_events.events_in_year("Full Moon", year)]
+            remaining = [date for date in dates if date >= now]
+            
+            date_list = ", ".join(date.strftime("%B %d") for date in dates)
+            response_text = f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}There are {len(dates)} full moons in {year}:{Style.RESET_ALL} {Fore.CYAN}{date_list}.{Style.RESET_ALL}"
+            if year == now.year:
+                response_text += f" {Style.BRIGHT}{Fore.LIGHTYELLOW_EX}{len(remaining)} of them are still to come.{Style.RESET_ALL}"
+            
+            return {
+                "success": True,
+                "year": year,
+                "dates": [date.strftime("%A, %B %d, %Y") for date in dates],
+                "remaining": len(remaining),
+                "speech": response_text
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
@@ -0,0 +1,147 @@
+import threading
+import time
+
+import spotipy
+from spotipy.cache_handler import CacheFileHandler, CacheHandler
+from spotipy.oauth2 import SpotifyOAuth
+
+from utils.http_client import HttpClient
+
+
+class _MemoryCachedTokens(CacheHandler):
+    """Keeps the token in memory and writes it through to spotipy's cache file
+
+    spotipy asks the cache handler for the token before every API call; the
+    file handler would re-read and parse the cache file each time.
+    """
+
+    def __init__(self, cache_path=None):
+        self._file = CacheFileHandler(cache_path=cache_path)
+        self._token = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get_cached_token(self):
+        with self._lock:
+            if not self._loaded:
+                self._token = self._file.get_cached_token()
+                self._loaded = True
+            return self._token
+
+    def save_token_to_cache(self, token_info):
+        with self._lock:
+            self._token = token_info
+            self._loaded = True
+        self._file.save_token_to_cache(token_info)
+
+
+class SpotifyClient:
+    """One long-lived, authenticated Spotify Web API client
+
+    The spotipy client and its OAuth manager are built once, share the pooled
+    HttpClient session (so commands reuse an open HTTPS connection) and read
+    the token from memory. A daemon thread refreshes the access token
+    refresh_margin seconds before it expires, so a command never waits on a
+    token refresh; spotipy still refreshes on demand if that ever fails.
+    """
+
+    # How long to wait before looking again when there is no token yet or a refresh failed
+    RETRY_INTERVAL = 60
+
+    def __init__(self, client_id, client_secret, redirect_uri, scope, http=None, cache_path=None,
+                 refresh_margin=300):
+        """Initialize the client; nothing is built or fetched until first use"""
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.redirect_uri = redirect_uri
+        self.scope = scope
+        self.http = http or HttpClient()
+        self.refresh_margin = refresh_margin
+        self.tokens = _MemoryCachedTokens(cache_path)
+        self._spotify = None
+        self._auth_manager = None
+        self._refresher = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def spotify(self):
+        """The spotipy.Spotify client, built on first use"""
+        if self._spotify is None:
+            with self._lock:
+                if self._spotify is None:
+                    # spotipy only reuses a requests.Session; anything else (httpx) gets its own
+                    session = self.http.session
+                    timeout = (self.http.connect_timeout, self.http.read_timeout)
+                    self._auth_manager = SpotifyOAuth(
+                        client_id=self.client_id,
+                        client_secret=self.client_secret,
+                        redirect_uri=self.redirect_uri,
+                        scope=self.scope,
+                        cache_handler=self.tokens,
+                        requests_session=session,
+                        requests_timeout=timeout
+                    )
+                    self._spotify = spotipy.Spotify(auth_manager=self._auth_manager, requests_session=session,
+                                                    requests_timeout=timeout)
+                    self.start()
+        return self._spotify
+
+    @property
+    def auth_manager(self):
+        """The SpotifyOAuth manager (builds the client if needed)"""
+        self.spotify
+        return self._auth_manager
+
+    def expires_in(self):
+        """Seconds until the cached access token expires, or None without a token"""
+        token = self.tokens.get_cached_token()
+        if not token:
+            return None
+        return token["expires_at"] - time.time()
+
+    def start(self):
+        """Start refreshing the token in the background"""
+        if self._refresher is not None:
+            return
+        self._stop.clear()
+        self._refresher = threading.Thread(target=self._refresh_loop, name="spotify-token-refresh", daemon=True)
+        self._refresher.start()
+
+    def stop(self):
+        """Stop the background refresh"""
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=1)
+            self._refresher = None
+
+    def refresh(self):
+        """Refresh the access token now"""
+        token = self.tokens.get_cached_token()
+        if not token or "refresh_token" not in token:
+            return None
+        return self.auth_manager.refresh_access_token(token["refresh_token"])
+
+    def _refresh_loop(self):
+        """Sleep until refresh_margin seconds before expiry, refresh, repeat"""
+        while not self._stop.is_set():
+            expires_in = self.expires_in()
+            if expires_in is None:
+                # Not authorized yet; the first command runs the browser flow
+                self._stop.wait(self.RETRY_INTERVAL)
+                continue
+
+            delay = expires_in - self.refresh_margin
+            if delay > 0:
+                self._stop.wait(delay)
+                continue
+
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing Spotify token: {e}")
+                self._stop.wait(self.RETRY_INTERVAL)
+                continue
+            if (self.expires_in() or 0) <= self.refresh_margin:
+                # Tokens that live shorter than the margin would otherwise refresh in a tight loop
+                self._stop.wait(self.RETRY_INTERVAL)
@@ -0,0 +1,75 @@
+import time
+
+from colorama import Fore, Style
+
+from utils.response_cache import TTLCache
+
+# Device types that are never chosen over a computer or speaker
+MOBILE_TYPES = ("smartphone", "mobile", "phone")
+
+
+class DeviceRegistry:
+    """Cached list of the user's Spotify devices and the one commands should target
+
+    The list comes from a TTLCache: within ttl it is served from memory, for
+    stale_ttl after that it is still served while a background thread fetches
+    a fresh copy, so commands don't pay a devices() round trip. A command that
+    fails because its device went away calls invalidate() and asks again.
+    """
+
+    def __init__(self, client, ttl=30, stale_ttl=600, prefer_computer=True):
+        """Initialize the registry for a SpotifyClient"""
+        self.client = client
+        self.prefer_computer = prefer_computer
+        self.cache = TTLCache(ttl=ttl, max_entries=1, stale_ttl=stale_ttl)
+        self._preferred = (None, None)  # (device list, device chosen from it), so each list is filtered once
+
+    def _fetch(self):
+        """Ask Spotify for the device list"""
+        return self.client.spotify.devices()["devices"]
+
+    def devices(self):
+        """The device list, from cache when possible"""
+        return self.cache.get_or_fetch("devices", self._fetch)
+
+    def invalidate(self):
+        """Forget the device list, e.g. after a command failed because its device is gone"""
+        self.cache.invalidate("devices")
+
+    def preferred(self):
+        """The device to control (a computer over a phone when prefer_computer), or None"""
+        devices = self.devices()
+        if not devices:
+            # Don't keep serving "no devices" once Spotify has been opened
+            self.invalidate()
+            return None
+        chosen_from, device = self._preferred
+        if chosen_from is not devices:
+            device, label = self._choose(devices)
+            self._preferred = (devices, device)
+            print(f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}{label}{Style.RESET_ALL} {Style.BRIGHT}{Fore.CYAN}{device['name']}{Style.RESET_ALL}")
+        return device
+
+    def _choose(self, devices):
+        """Pick the preferred device from a non-empty list, with a label to print"""
+        if self.prefer_computer:
+            for device in devices:
+                device_type = device["type"].lower()
+                if not any(mobile in device_type for mobile in MOBILE_TYPES):
+                    return device, "Selected computer device:"
+        return devices[0], "Selected device:"
+
+    def wait_for_device(self, timeout=15, first_delay=0.25, max_delay=2):
+        """Poll with backoff until a device shows up (e.g. after launching Spotify); the device or None"""
+        deadline = time.monotonic() + timeout
+        delay = first_delay
+        while True:
+            self.invalidate()
+            device = self.preferred()
+            if device is not None:
+                return device
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+
+from utils.trigram_index import TrigramIndex, normalize
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.expanduser("~"), ".cache", "voice_assistant", "spotify_playlists.json")
+
+# Playlists whose URIs live in .env, with the names they can be asked for by (the first is spoken back);
+# used when no alias table is configured
+KNOWN_PLAYLISTS = [
+    ("echo_tides", ["echo tides", "this is echo tides"]),
+    ("this_is_doechii", ["this is d"]),
+    ("this_is_evanescense", ["this is evanescense", "this is evanescence"]),
+    ("discover_weekly", ["discover weekly"]),
+    ("release_radar", ["release radar"]),
+    ("daylist_roulette", ["roulette"]),
+    ("favorite_songs", ["liked songs", "my liked songs", "saved songs", "favorites"]),
+    ("daily_mix_1", ["daily mix 1"]),
+    ("daily_mix_2", ["daily mix 2"]),
+    ("daily_mix_3", ["daily mix 3"]),
+    ("final_fantasy_vii", ["Final Fantasy VII"]),
+    ("this_is_my_chemical_romance", ["this is My Chemical Romance", "my chemical romance"]),
+    ("this_is_agnes_obel", ["this is agnes obel"]),
+]
+
+
+def known_playlists():
+    """(uri, aliases) of the KNOWN_PLAYLISTS; uri is None when its .env variable is unset
+
+    Aliases without a URI still make the playlist intent recognize the name,
+    which is then looked up in the library or searched for.
+    """
+    return [(os.getenv(variable), aliases) for variable, aliases in KNOWN_PLAYLISTS]
+
+
+def load_playlist_aliases(path=None):
+    """(uri, aliases) of a user's playlists, from the alias table at path or else the environment
+
+    The table is a JSON object mapping playlist URIs to the names they can be
+    asked for by, the first being the one spoken back, e.g.
+    {"spotify:playlist:37i9dQZEVXcQ9COmYvdajy": ["discover weekly"]}
+    """
+    if not path:
+        return known_playlists()
+    try:
+        with open(path, "r", encoding="utf-8") as aliases_file:
+            table = json.load(aliases_file)
+    except (OSError, ValueError) as e:
+        print(f"Could not read the playlist aliases from {path}: {e}")
+        return known_playlists()
+    return [(uri, list(aliases)) for uri, aliases in table.items() if aliases]
+
+
+class PlaylistCatalog:
+    """Every playlist in the user's library, indexed for local fuzzy lookup by name or alias
+
+    The library is fetched once, all pages at a time on a thread pool, and
+    saved to disk. After a restart the saved copy is used right away; when it
+    is older than ttl it is re-fetched in the background, and the index is only
+    rebuilt if some playlist's snapshot_id (Spotify's version tag) changed.
+    Names and the .env aliases share one TrigramIndex, so resolving a spoken
+    name is a local lookup of a few milliseconds even for thousands of
+    playlists.
+    """
+
+    PAGE_SIZE = 50  # The API maximum for /me/playlists
+
+    def __init__(self, client, path=DEFAULT_CATALOG_PATH, ttl=3600, workers=8, aliases=None):
+        """Initialize the catalog for a SpotifyClient; nothing is loaded until first use"""
+        self.client = client
+        self.path = path
+        self.ttl = ttl
+        self.workers = workers
+        # Aliases without a URI only matter to intent matching; here the library and search find them
+        self.aliases = [(uri, names) for uri, names in (known_playlists() if aliases is None else aliases) if uri]
+        self.playlists = []
+        self.fetched_at = 0
+        self.index = TrigramIndex()
+        self._targets = []  # string id -> (uri, display name)
+        self._loaded = False
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.playlists)
+
+    # --- Loading --- #
+    def ensure_loaded(self):
+        """Load the catalog from disk or Spotify on first use; refresh a stale one in the background"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    if not self._load():
+                        self._replace(self.fetch_all())
+                        self._save()
+                    self._loaded = True
+        if time.time() - self.fetched_at > self.ttl:
+            self.refresh_in_background()
+
+    def fetch_all(self):
+        """Every playlist in the library, fetching the pages after the first concurrently"""
+        # Imported here, as the assistant loads this module at startup for the alias table
+        from concurrent.futures import ThreadPoolExecutor
+
+        sp = self.client.spotify
+        first = sp.current_user_playlists(limit=self.PAGE_SIZE)
+        pages = [first]
+        offsets = range(self.PAGE_SIZE, first.get("total", 0), self.PAGE_SIZE)
+        if offsets:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                pages.extend(executor.map(
+                    lambda offset: sp.current_user_playlists(limit=self.PAGE_SIZE, offset=offset), offsets))
+        return [{"name": item["name"], "uri": item["uri"], "snapshot_id": item.get("snapshot_id")}
+                for page in pages for item in page["items"] if item]
+
+    def refresh(self):
+        """Re-fetch the library; rebuild the index only if something changed. Returns whether it did"""
+        playlists = self.fetch_all()
+        changed = self._versions(playlists) != self._versions(self.playlists)
+        with self._lock:
+            if changed:
+                self._replace(playlists)
+            else:
+                self.fetched_at = time.time()
+            self._save()
+        return changed
+
+    def refresh_in_background(self):
+        """refresh() on a background thread (one at a time)"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing Spotify playlists: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="spotify-playlists", daemon=True).start()
+
+    @staticmethod
+    def _versions(playlists):
+        return {(playlist["uri"], playlist["snapshot_id"]) for playlist in playlists}
+
+    def _replace(self, playlists):
+        """Swap in a new playlist list and index (callers hold the lock)"""
+        index = TrigramIndex()
+        targets = []
+
+        def add(name, target):
+            string_id = index.add(name)
+            if string_id == len(targets):
+                targets.append(target)
+
+        # Aliases first, so they win over a library playlist of the same name
+        for uri, aliases in self.aliases:
+            for alias in aliases:
+                add(alias, (uri, aliases[0]))
+        for playlist in playlists:
+            add(playlist["name"], (playlist["uri"], playlist["name"]))
+
+        self.index, self._targets, self.playlists = index, targets, playlists
+        self.fetched_at = time.time()
+
+    def _load(self):
+        """Read the saved catalog; whether there was one"""
+        if not self.path:
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as catalog_file:
+                saved = json.load(catalog_file)
+            fetched_at = float(saved["fetched_at"])
+            playlists = [{"name": playlist["name"], "uri": playlist["uri"], "snapshot_id": playlist.get("snapshot_id")}
+                         for playlist in saved["playlists"]]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # Missing, truncated or from an older version; fetch the library again instead
+            return False
+        self._replace(playlists)
+        self.fetched_at = fetched_at
+        return True
+
+    def _save(self):
+        """Write the catalog to disk atomically"""
+        if not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as catalog_file:
+                json.dump({"fetched_at": self.fetched_at, "playlists": self.playlists}, catalog_file)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Could not save the playlist catalog to {self.path}: {e}")
+
+    # --- Lookup --- #
+    def resolve(self, spoken, cutoff=0.6):
+        """(uri, display name) of the playlist best matching a spoken name, or None
+
+        Tries, in order: an exact name or alias, an alias contained in the request
+        ("play my liked songs please"), the closest fuzzy match, and a library
+        playlist whose name contains the request.
+        """
+        self.ensure_loaded()
+        index, targets = self.index, self._targets
+
+        string_id = index.exact(spoken)
+        if string_id is not None:
+            return targets[string_id]
+
+        spoken = normalize(spoken)
+        for uri, aliases in self.aliases:
+            for alias in aliases:
+                if normalize(alias) in spoken:
+                    return uri, aliases[0]
+
+        string_id = index.best(spoken, cutoff=cutoff)
+        if string_id is not None:
+            return targets[string_id]
+
+        for string_id, name in enumerate(index.strings):
+            if spoken in name:
+                return targets[string_id]
+        return None
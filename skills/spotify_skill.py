@@ -1,91 +1,141 @@
-import time
 import os
+import time
 import subprocess
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from colorama import Fore, Style
 from dotenv import load_dotenv
+from spotipy.exceptions import SpotifyException
+from skills.spotify_client import SpotifyClient
+from skills.spotify_devices import DeviceRegistry
+from skills.spotify_playlists import DEFAULT_CATALOG_PATH, PlaylistCatalog
+from utils.response_cache import TTLCache
+from utils.trigram_index import normalize
+
+DEFAULT_SEARCH_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "voice_assistant", "spotify_searches.json")
+
+def _track_uri(playback):
+    """URI of the track in a playback state, or None"""
+    return ((playback or {}).get("item") or {}).get("uri")
+
+
+def _context_uri(playback):
+    """URI of the playlist/album a playback state plays from, or None"""
+    return ((playback or {}).get("context") or {}).get("uri")
+
 
 class SpotifySkill:
     
     load_dotenv()  # Load environment variables from .env file
     
-    def __init__(self, client_id, client_secret, redirect_uri):
-        """Initialize the Spotify skill with authentication details"""
+    # Polling for a playback change after a command: first poll delay, backoff factor and cap, give-up time
+    CONFIRM_FIRST_DELAY = 0.05
+    CONFIRM_BACKOFF = 1.5
+    CONFIRM_MAX_DELAY = 0.5
+    CONFIRM_TIMEOUT = 3.0
+    # How old the last playback state seen can be and still stand in for the state before a skip (s)
+    PLAYBACK_MEMORY = 60
+    # How far a track's position must fall behind where it should be to count as restarted (ms)
+    RESTART_SLACK_MS = 500
+    
+    def __init__(self, client_id, client_secret, redirect_uri, http=None, cache_path=None, refresh_margin=300,
+                 confirm_in_background=False, device_ttl=30, playlist_catalog_path=DEFAULT_CATALOG_PATH,
+                 playlist_aliases=None, search_cache_path=DEFAULT_SEARCH_CACHE_PATH,
+                 search_ttl=86400, search_stale_ttl=30 * 86400):
+        """Initialize the Spotify skill with authentication details and the shared HTTP client
+        
+        With confirm_in_background, playback commands return as soon as Spotify
+        accepts them and "Now playing" is printed once the change shows up.
+        
+        Song searches are cached by normalized query (on disk at search_cache_path)
+        for search_ttl seconds, and for search_stale_ttl more while they are searched
+        again in the background, so a song asked for before starts with one request.
+        
+        playlist_aliases is the user's (uri, aliases) table (load_playlist_aliases);
+        by default the playlists configured in .env.
+        """
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
         self.scope = "user-read-playback-state,user-modify-playback-state,user-read-currently-playing,playlist-read-private"
+        self.client = SpotifyClient(client_id, client_secret, redirect_uri, self.scope, http=http,
+                                    cache_path=cache_path, refresh_margin=refresh_margin)
+        self.confirm_in_background = confirm_in_background
+        self.devices = DeviceRegistry(self.client, ttl=device_ttl)
+        self.playlists = PlaylistCatalog(self.client, path=playlist_catalog_path, aliases=playlist_aliases)
+        self._last_playback = None  # (playback state, time.monotonic() it was read)
+        self.searches = TTLCache(ttl=search_ttl, max_entries=256, stale_ttl=search_stale_ttl, path=search_cache_path)
+        # Runs speculative searches
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="spotify")
     
     def _get_spotify_client(self):
-        """Get an authenticated Spotify client"""
-        return spotipy.Spotify(auth_manager=SpotifyOAuth(
-            client_id=self.client_id,
-            client_secret=self.client_secret,
-            redirect_uri=self.redirect_uri,
-            scope=self.scope
-        ))
+        """Get the authenticated Spotify client (one per skill, token refreshed in the background)"""
+        return self.client.spotify
     
-    def _ensure_active_device(self, sp=None, prefer_computer=True):
+    def _ensure_active_device(self):
         """Ensure there's an active Spotify device, opening Spotify if needed"""
-        if sp is None:
-            sp = self._get_spotify_client()
-            
-        devices = sp.devices()
+        device = self.devices.preferred()
         
-        if not devices['devices']:
+        if device is None:
             print("No active Spotify devices found. Opening Spotify.")
             try:
                 subprocess.Popen("start spotify:", shell=True)
-                time.sleep(5)  # Give Spotify time to start
-                devices = sp.devices()
-                if not devices['devices']:
+                # Poll until the client registers instead of guessing how long it takes to start
+                device = self.devices.wait_for_device()
+                if device is None:
                     return None, "Please open Spotify manually and try again."
             except Exception as e:
                 print(f"Error launching Spotify: {e}")
                 return None, "Please open Spotify manually and try again."
         
-        if prefer_computer and devices['devices']:
-            computer_devices = [d for d in devices['devices']
-                               if 'smartphone' not in d['type'].lower()
-                               and 'mobile' not in d['type'].lower()
-                               and 'phone' not in d['type'].lower()]
-            if computer_devices:
-                print(f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}Selected computer device:{Style.RESET_ALL} {Style.BRIGHT}{Fore.CYAN}{computer_devices[0]['name']}{Style.RESET_ALL}")
-                return computer_devices[0]['id'], None
-        
-        device_id = devices['devices'][0]['id'] if devices['devices'] else None
-        if devices['devices']:
-            print(f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}Selected device:{Style.RESET_ALL} {Style.BRIGHT}{Fore.CYAN}{devices['devices'][0]['name']}{Style.RESET_ALL}")
+        return device['id'], None
+    
+    def _on_device(self, command):
+        """Run command(device_id) on the preferred device; returns an error message or None
         
-        return device_id, None
+        The device comes from the registry's cache, so this is normally the command's
+        only round trip. If Spotify no longer knows the device, the list is fetched
+        again and the command retried once.
+        """
+        device_id, error = self._ensure_active_device()
+        if error:
+            return error
+        try:
+            command(device_id)
+        except SpotifyException as e:
+            if e.http_status != 404:
+                raise
+            self.devices.invalidate()
+            device_id, error = self._ensure_active_device()
+            if error:
+                return error
+            command(device_id)
+        return None
     
     def play_song(self, song_name):
         """Play a song on Spotify"""
         try:
             sp = self._get_spotify_client()
-            device_id, error = self._ensure_active_device(sp)
+            _, error = self._ensure_active_device()
             
             if error:
                 return {"error": error}
             
-            # Search for the track
-            results = sp.search(q=song_name, type='track', limit=5)
+            # Search for the track (from the cache, or a speculative search, for songs asked for before)
+            track = self.find_track(song_name)
             
-            if results['tracks']['items']:
-                track = results['tracks']['items'][0]
+            if track:
                 track_uri = track['uri']
                 track_name = track['name']
-                artist_name = track['artists'][0]['name']
+                artist_name = track['artist']
                 
                 # Play the track on the active device
-                if device_id:
-                    sp.start_playback(device_id=device_id, uris=[track_uri])
-                else:
-                    sp.start_playback(uris=[track_uri])  # Try without specifying device
+                error = self._on_device(lambda device_id: sp.start_playback(device_id=device_id, uris=[track_uri]))
+                if error:
+                    return {"error": error}
                 
                 # Get info about what's now playing
-                current_track_info = self.get_currently_playing(sp)
+                current_track_info = self._confirm_playback(sp, lambda playback: _track_uri(playback) == track_uri)
                 
                 return {
                     "success": True,
@@ -113,108 +163,72 @@ class SpotifySkill:
                 "error": f"Sorry, I had trouble controlling Spotify: {e}"
             }
     
+    def find_track(self, song_name):
+        """The top search result for a song as {"uri", "name", "artist"}, or None, cached by normalized query"""
+        key = normalize(song_name)
+        track = self.searches.get_or_fetch(key, lambda: self._search_track(song_name))
+        if track is None:
+            # Don't remember a miss; the song may be added, or the next attempt heard better
+            self.searches.invalidate(key)
+        return track
+    
+    def _search_track(self, song_name):
+        """Search Spotify for a song; only the top result is ever played, so only it is requested"""
+        items = self._get_spotify_client().search(q=song_name, type='track', limit=1)['tracks']['items']
+        if not items:
+            return None
+        track = items[0]
+        return {"uri": track['uri'], "name": track['name'], "artist": track['artists'][0]['name']}
+    
+    def prefetch_song(self, song_name):
+        """Start searching for a song in the background, e.g. while the command is still being dispatched"""
+        self._executor.submit(self._prefetch_song, song_name)
+    
+    def _prefetch_song(self, song_name):
+        """Warm the search cache; failures are left for play_song to report"""
+        try:
+            self.find_track(song_name)
+        except Exception:
+            pass
+    
     def play_playlist(self, playlist_name):
         """Play a playlist on Spotify with reliable matching"""
-        
-        echo_tides = os.getenv("echo_tides")
-        this_is_doechii = os.getenv("this_is_doechii")
-        this_is_evanescense = os.getenv("this_is_evanescense")
-        discover_weekly = os.getenv("discover_weekly")
-        release_radar = os.getenv("release_radar")
-        daylist_roulette = os.getenv("daylist_roulette")
-        favorite_songs = os.getenv("favorite_songs")
-        daily_mix_1 = os.getenv("daily_mix_1")
-        daily_mix_2 = os.getenv("daily_mix_2")
-        daily_mix_3 = os.getenv("daily_mix_3")
-        final_fantasy_vii = os.getenv("final_fantasy_vii")
-        this_is_my_chemical_romance = os.getenv("this_is_my_chemical_romance")
-        this_is_agnes_obel = os.getenv("this_is_agnes_obel")
-
         # Debug info
         print(f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}Recognized playlist request:{Style.RESET_ALL} {Style.BRIGHT}{Fore.CYAN}'{playlist_name}'{Style.RESET_ALL}")
         
-        # Clean the input
-        playlist_name_lower = playlist_name.lower().strip()
-        
         try:
             sp = self._get_spotify_client()
-            device_id, error = self._ensure_active_device(sp)
+            _, error = self._ensure_active_device()
             
             if error:
                 return {"error": error}
             
-            # Known playlists with name variations
-            known_playlists = {
-                echo_tides: ["echo tides", "this is echo tides"],
-                this_is_doechii: ["this is d", "this is d"],
-                this_is_evanescense: ["this is evanescense", "this is evanescence"],
-                discover_weekly: ["discover weekly"],
-                release_radar: ["release radar"],
-                daylist_roulette: ["roulette"],
-                favorite_songs: ["liked songs", "my liked songs", "saved songs", "favorites"],
-                daily_mix_1: ["daily mix 1"],
-                daily_mix_2: ["daily mix 2"],
-                daily_mix_3: ["daily mix 3"],
-                final_fantasy_vii: ["Final Fantasy VII"],
-                this_is_my_chemical_romance: ["this is My Chemical Romance", "my chemical romance"],
-                this_is_agnes_obel: ["this is agnes obel"]
-            }
-            
-            # Variable to track if playback started successfully
-            playback_started = False
+            # Known playlists and the user's library, matched locally
+            context_uri = None
             playlist_name_display = playlist_name  # Default display name
-            
-            # Try to match with known playlists
-            for uri, variations in known_playlists.items():
-                # Check for exact matches first
-                if playlist_name_lower in variations:
-                    print(f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}Found exact match:{Style.RESET_ALL} {Style.BRIGHT}{Fore.CYAN}{playlist_name_lower}{Style.RESET_ALL}")
-                    playlist_name_display = variations[0]
-                    sp.start_playback(device_id=device_id, context_uri=uri)
-                    playback_started = True
-                    break
-            
-            # If not found in exact matches, try partial matches
-            if not playback_started:
-                for uri, variations in known_playlists.items():
-                    for variation in variations:
-                        if variation in playlist_name_lower:
-                            print(f"Found partial match: {variation} in {playlist_name_lower}")
-                            playlist_name_display = variations[0]
-                            sp.start_playback(device_id=device_id, context_uri=uri)
-                            playback_started = True
-                            break
-                    if playback_started:
-                        break
-            
-            # If still not found, search user's playlists
-            if not playback_started:
-                # First try user's own playlists
-                playlists = []
-                results = sp.current_user_playlists(limit=50)
-                playlists.extend(results['items'])
-                
-                for playlist in playlists:
-                    if playlist_name_lower in playlist['name'].lower():
-                        playlist_name_display = playlist['name']
-                        sp.start_playback(device_id=device_id, context_uri=playlist['uri'])
-                        playback_started = True
-                        break
+            match = self.playlists.resolve(playlist_name)
+            if match:
+                context_uri, playlist_name_display = match
+                print(f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}Found playlist:{Style.RESET_ALL} {Style.BRIGHT}{Fore.CYAN}{playlist_name_display}{Style.RESET_ALL}")
             
             # Last resort: search Spotify
-            if not playback_started:
+            if context_uri is None:
                 results = sp.search(q=playlist_name, type='playlist', limit=5)
-                if results['playlists']['items']:
-                    found = results['playlists']['items'][0]
-                    playlist_name_display = found['name']
-                    owner_name = found['owner']['display_name']
-                    sp.start_playback(device_id=device_id, context_uri=found['uri'])
-                    playback_started = True
+                found = next((item for item in results['playlists']['items'] if item), None)
+                if found:
+                    context_uri, playlist_name_display = found['uri'], found['name']
+            
+            playback_started = False
+            if context_uri is not None:
+                error = self._on_device(lambda device_id: sp.start_playback(device_id=device_id, context_uri=context_uri))
+                if error:
+                    return {"error": error}
+                playback_started = True
             
             # If playback started successfully, check what's playing
             if playback_started:
                 # Get the currently playing track
-                current_track_info = self.get_currently_playing(sp)
+                current_track_info = self._confirm_playback(sp, lambda playback: _context_uri(playback) == context_uri)
                 
                 return {
                     "success": True,
@@ -234,15 +248,99 @@ class SpotifySkill:
                 "error": f"Sorry, I encountered an error: {e}"
             }
     
-    def get_currently_playing(self, sp=None):
-        """Get information about the currently playing track"""
+    def _remember(self, playback):
+        """Keep the latest playback state read, so a skip can be confirmed without reading it first"""
+        self._last_playback = (playback, time.monotonic()) if playback else None
+    
+    @staticmethod
+    def _position(playback, seen_at, at):
+        """(track uri, progress ms) a playback state read at seen_at should have reached at a time, or None"""
+        progress = playback.get("progress_ms") or 0
+        if playback.get("is_playing"):
+            progress += (at - seen_at) * 1000
+        duration = (playback.get("item") or {}).get("duration_ms")
+        if duration and progress >= duration:
+            # That track has ended since, so something else is playing
+            return None
+        return _track_uri(playback), progress
+    
+    def _skipped(self, sent_at):
+        """Test for the playback state after next/previous: another track, or the same one restarted
+        
+        Nothing is read before the command, so it stays a single request. The first
+        state polled counts as the result only if it differs from the last state the
+        skill read in a way only the skip explains (a different track that just
+        started, or the same track further back); otherwise it becomes the baseline
+        later polls are compared with. Another controller (e.g. a phone) changing
+        tracks in between therefore can't be mistaken for the skip.
+        """
+        remembered = self._last_playback
+        if remembered is not None and sent_at - remembered[1] > self.PLAYBACK_MEMORY:
+            remembered = None
+        baseline = None  # (playback, time it was read)
+        
+        def settled(playback):
+            nonlocal baseline
+            now = time.monotonic()
+            track_uri, progress = _track_uri(playback), playback.get("progress_ms") or 0
+            if baseline is None:
+                expected = remembered and self._position(remembered[0], remembered[1], now)
+                if expected is not None:
+                    if track_uri != expected[0] and progress <= (now - sent_at) * 1000 + self.RESTART_SLACK_MS:
+                        return True
+                    if track_uri == expected[0] and progress < expected[1] - self.RESTART_SLACK_MS:
+                        return True
+                baseline = (playback, now)
+                return False
+            expected = self._position(baseline[0], baseline[1], now)
+            return (expected is None or track_uri != expected[0]
+                    or progress < expected[1] - self.RESTART_SLACK_MS)
+        return settled
+    
+    def _wait_for_playback(self, sp, settled, timeout=None):
+        """Poll the playback state with exponential backoff until settled(playback) holds
+        
+        Returns the settled state, or the last one seen once timeout (CONFIRM_TIMEOUT
+        by default) runs out, so a slow device costs at most that long.
+        """
+        deadline = time.monotonic() + (self.CONFIRM_TIMEOUT if timeout is None else timeout)
+        delay = self.CONFIRM_FIRST_DELAY
+        while True:
+            playback = sp.current_playback()
+            self._remember(playback)
+            if playback and settled(playback):
+                return playback
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return playback
+            time.sleep(min(delay, remaining))
+            delay = min(delay * self.CONFIRM_BACKOFF, self.CONFIRM_MAX_DELAY)
+    
+    def _confirm_playback(self, sp, settled):
+        """Report what's playing once a command has taken effect, now or in the background"""
+        # The command changed the state; it is read again while confirming
+        self._last_playback = None
+        if self.confirm_in_background:
+            threading.Thread(target=self.get_currently_playing, args=(sp, settled),
+                             name="spotify-confirm", daemon=True).start()
+            return None
+        return self.get_currently_playing(sp, settled)
+    
+    def get_currently_playing(self, sp=None, settled=None):
+        """Get information about the currently playing track
+        
+        settled is an optional test of the playback state; when given, the state is
+        polled until it passes (e.g. until the track changes after "next").
+        """
         if sp is None:
             sp = self._get_spotify_client()
             
         try:
-            time.sleep(2)  # Wait for Spotify to update
-            
-            current = sp.current_playback()
+            if settled is None:
+                current = sp.current_playback()
+                self._remember(current)
+            else:
+                current = self._wait_for_playback(sp, settled)
             if current and 'item' in current and current['item']:
                 track = current['item']
                 artist_name = track['artists'][0]['name'] if track['artists'] else 'Unknown Artist'
@@ -271,12 +369,12 @@ class SpotifySkill:
         """Pause Spotify playback"""
         try:
             sp = self._get_spotify_client()
-            device_id, error = self._ensure_active_device(sp)
+            error = self._on_device(lambda device_id: sp.pause_playback(device_id=device_id))
             
             if error:
                 return {"error": error}
+            self._last_playback = None
             
-            sp.pause_playback(device_id=device_id)
             return {
                 "success": True,
                 "message": f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}Paused playback on Spotify.{Style.RESET_ALL}"
@@ -292,15 +390,13 @@ class SpotifySkill:
         """Resume Spotify playback"""
         try:
             sp = self._get_spotify_client()
-            device_id, error = self._ensure_active_device(sp)
+            error = self._on_device(lambda device_id: sp.start_playback(device_id=device_id))
             
             if error:
                 return {"error": error}
             
-            sp.start_playback(device_id=device_id)
-            
             # Get info about what's now playing
-            current_track_info = self.get_currently_playing(sp)
+            current_track_info = self._confirm_playback(sp, lambda playback: playback.get("is_playing"))
             
             return {
                 "success": True,
@@ -318,15 +414,14 @@ class SpotifySkill:
         """Skip to the next track"""
         try:
             sp = self._get_spotify_client()
-            device_id, error = self._ensure_active_device(sp)
+            sent_at = time.monotonic()
+            error = self._on_device(lambda device_id: sp.next_track(device_id=device_id))
             
             if error:
                 return {"error": error}
             
-            sp.next_track(device_id=device_id)
-            
             # Get info about what's now playing
-            current_track_info = self.get_currently_playing(sp)
+            current_track_info = self._confirm_playback(sp, self._skipped(sent_at))
             
             return {
                 "success": True,
@@ -344,15 +439,14 @@ class SpotifySkill:
         """Skip to the previous track"""
         try:
             sp = self._get_spotify_client()
-            device_id, error = self._ensure_active_device(sp)
+            sent_at = time.monotonic()
+            error = self._on_device(lambda device_id: sp.previous_track(device_id=device_id))
             
             if error:
                 return {"error": error}
             
-            sp.previous_track(device_id=device_id)
-            
-            # Get info about what's now playing
-            current_track_info = self.get_currently_playing(sp)
+            # Get info about what's now playing; a few seconds into a track, "previous" restarts it instead
+            current_track_info = self._confirm_playback(sp, self._skipped(sent_at))
             
             return {
                 "success": True,
@@ -381,14 +475,13 @@ class SpotifySkill:
         
         try:
             sp = self._get_spotify_client()
-            device_id, error = self._ensure_active_device(sp)
+            
+            # Set volume
+            error = self._on_device(lambda device_id: sp.volume(volume_level, device_id=device_id))
             
             if error:
                 return {"error": error}
             
-            # Set volume
-            sp.volume(volume_level, device_id=device_id)
-            
             return {
                 "success": True,
                 "message": f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}Set Spotify volume to{Style.RESET_ALL} {Style.BRIGHT}{Fore.LIGHTGREEN_EX}{volume_level}{Style.RESET_ALL} {Style.BRIGHT}{Fore.LIGHTYELLOW_EX}percent."
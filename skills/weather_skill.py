@@ -1,84 +1,119 @@
-import requests
-from datetime import datetime, timedelta
-from difflib import get_close_matches
+import os
+from concurrent.futures import ThreadPoolExecutor
+from utils.forecast_aggregator import ForecastAggregator
+from utils.gazetteer import Gazetteer, Place
+from utils.http_client import HttpClient
+from utils.location_resolver import LocationResolver
+from utils.response_cache import TTLCache
+from utils.trigram_index import normalize
+
+
+class WeatherApiError(Exception):
+    """OpenWeatherMap answered with an error status"""
+
 
 class WeatherSkill:
-    def __init__(self, api_key):
-        """Initialize the weather skill with API key"""
-        self.api_key = api_key
+    API_URL = "https://api.openweathermap.org/data/2.5"
+    CURRENT_LOCATION = ["current location", "here", "my location"]
+    # Temperature and wind speed units spoken for each OpenWeatherMap units setting
+    UNIT_LABELS = {
+        "metric": ("°C", "km/h"),
+        "imperial": ("°F", "mph"),
+        "standard": ("K", "km/h"),
+    }
     
-    def match_location(self, spoken_location):
-        """Match spoken location to a list of known locations using fuzzy matching"""
-        known_locations = ["Lamia", "Athens", "Thessaloniki", "Patras", "Heraklion"]
-        
-        # Try exact match first (case insensitive)
-        for loc in known_locations:
-            if spoken_location.lower() == loc.lower():
-                return loc
+    def __init__(self, api_key, http=None, location_resolver=None, units="metric", current_ttl=600,
+                 forecast_ttl=1800, stale_ttl=3600, max_entries=64, cache_dir=None, forecast_days=3,
+                 gazetteer=None):
+        """Initialize the weather skill with API key, the shared HTTP client and response caching
         
-        # Try fuzzy matching
-        matches = get_close_matches(spoken_location, known_locations, n=1, cutoff=0.6)
+        OpenWeatherMap refreshes current conditions roughly every 10 minutes, so
+        answers are cached per location for current_ttl/forecast_ttl seconds and
+        served stale (while refreshing in the background) for stale_ttl more.
+        With cache_dir the caches persist across restarts.
         
-        if matches:
-            print(f"Matched '{spoken_location}' to '{matches[0]}'")
-            return matches[0]
+        gazetteer is a Gazetteer or the path of an OpenWeatherMap city list;
+        places found in it are queried by city id instead of free text.
+        """
+        self.api_key = api_key
+        self.http = http or HttpClient()
+        self.location_resolver = location_resolver or LocationResolver(self.http)
+        if units not in self.UNIT_LABELS:
+            raise ValueError(f"Unknown units {units!r}; expected one of {', '.join(self.UNIT_LABELS)}")
+        self.units = units
+        self.temp_unit, self.wind_unit = self.UNIT_LABELS[units]
+        if isinstance(gazetteer, str):
+            gazetteer = Gazetteer.load(gazetteer)
+        self.gazetteer = gazetteer or Gazetteer.default()
+        self.forecast_aggregator = ForecastAggregator(days=forecast_days)
+        self.cache = {
+            "weather": TTLCache(ttl=current_ttl, max_entries=max_entries, stale_ttl=stale_ttl,
+                                path=cache_dir and os.path.join(cache_dir, "weather_current.json")),
+            "forecast": TTLCache(ttl=forecast_ttl, max_entries=max_entries, stale_ttl=stale_ttl,
+                                 path=cache_dir and os.path.join(cache_dir, "weather_forecast.json")),
+        }
+        # Runs concurrent and prefetched API requests
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="weather")
+    
+    def match_place(self, spoken_location, fuzzy=True):
+        """Match a spoken location to a gazetteer place (exact, then fuzzy unless fuzzy=False), or None"""
+        place = self.gazetteer.resolve(spoken_location, fuzzy=fuzzy)
+        if place and not self.gazetteer.is_exact(spoken_location):
+            print(f"Matched '{spoken_location}' to '{place.label}'")
+        return place
+    
+    def match_location(self, spoken_location):
+        """Match spoken location to a known place name using fuzzy matching"""
+        place = self.match_place(spoken_location)
+        return place.name if place else spoken_location
+    
+    def _resolve_location(self, location):
+        """Turn a spoken location into a Place, replacing "here" and friends with the detected current location"""
+        fuzzy = True
+        if location.lower() in self.CURRENT_LOCATION:
+            detected = self.location_resolver.get()
+            if detected:
+                location = detected
+                # A detected location is spelled right; only look up its city id
+                fuzzy = False
+                print(f"Detected location: {location}")
+            else:
+                print("Could not detect location. Using default.")
         
-        return spoken_location
+        # Unknown names are still tried as free text
+        return self.match_place(location, fuzzy=fuzzy) or Place(location)
+    
+    def _fetch(self, endpoint, place):
+        """Get an OpenWeatherMap endpoint ("weather" or "forecast") for a place, through the cache"""
+        location_key = f"id:{place.id}" if place.id is not None else f"q:{normalize(place.label)}"
+        key = f"{location_key}|{self.units}"
+        return self.cache[endpoint].get_or_fetch(key, lambda: self._request(endpoint, place))
+    
+    def _request(self, endpoint, place):
+        """Call OpenWeatherMap and return the decoded JSON; raises WeatherApiError on an error status"""
+        response = self.http.get(
+            f"{self.API_URL}/{endpoint}",
+            params={**place.query(), "appid": self.api_key, "units": self.units}
+        )
+        if response.status_code != 200:
+            raise WeatherApiError(f"{response.status_code} - {response.reason}")
+        return response.json()
     
     def get_weather(self, location):
         """Get current weather for a location"""
-        location = self.match_location(location)  # Match location to known locations
-        
         try:
-            # Handle current location detection
-            if location.lower() in ["current location", "here", "my location"]:
-                try:
-                    ip_info = requests.get("https://ipinfo.io/json").json()
-                    if "city" in ip_info and "country" in ip_info:
-                        location = f"{ip_info['city']}, {ip_info['country']}"
-                        print(f"Detected location: {location}")
-                except:
-                    print("Could not detect location. Using default.")
+            # Resolve the location (the current location is looked up in the background)
+            place = self._resolve_location(location)
             
-            # Encode the location for the URL
-            encoded_location = requests.utils.quote(location)
+            # Get weather data (from the cache when it is recent enough)
+            try:
+                weather_data = self._fetch("weather", place)
+            except WeatherApiError as e:
+                return {"error": f"Couldn't get weather: {e}"}
             
-            # Get weather data
-            weather_url = f"https://api.openweathermap.org/data/2.5/weather?q={encoded_location}&appid={self.api_key}&units=metric"
-            response = requests.get(weather_url)
-            
-            if response.status_code == 200:
-                weather_data = response.json()
-                
-                # Format the weather data
-                city_name = weather_data['name']
-                country = weather_data['sys']['country']
-                temp = (weather_data['main']['temp'])
-                temp_f = round((temp * 9/5) + 32)  # Convert to F for reference
-                condition = weather_data['weather'][0]['main']
-                description = weather_data['weather'][0]['description']
-                humidity = weather_data['main']['humidity']
-                wind_speed = round(weather_data['wind']['speed'])
-                wind_dir = self.get_wind_direction(weather_data['wind']['deg'])
-                
-                # Format complete response
-                weather_info = f"Current weather in {city_name}, {country}: "
-                weather_info += f"Temperature: {temp}°C ({temp_f}°F), "
-                weather_info += f"Conditions: {description}, "
-                weather_info += f"Humidity: {humidity}%, "
-                weather_info += f"Wind: {wind_speed} km/h from the {wind_dir}"
-                
-                # Create a summary for speech
-                speech_summary = f"It's currently {temp}°C with {description} in {city_name}"
-                
-                # Return both detailed info and speech summary
-                return {
-                    "detailed_info": weather_info,
-                    "speech_summary": speech_summary
-                }
-            else:
-                error_info = f"Couldn't get weather: {response.status_code} - {response.reason}"
-                return {"error": error_info}
+            # A forecast question usually follows; have it ready by then
+            self.prefetch_forecast(place)
+            return self._format_current(weather_data)
                     
         except Exception as e:
             error_info = f"Error getting weather: {e}"
@@ -86,106 +121,126 @@ class WeatherSkill:
 
     def get_weather_forecast(self, location):
         """Get weather forecast for a location"""
-        location = self.match_location(location)  # Match location to known locations
-        
         try:
-            # Handle current location detection
-            if location.lower() in ["current location", "here", "my location"]:
-                try:
-                    ip_info = requests.get("https://ipinfo.io/json").json()
-                    if "city" in ip_info and "country" in ip_info:
-                        location = f"{ip_info['city']}, {ip_info['country']}"
-                        print(f"Detected location: {location}")
-                except:
-                    print("Could not detect location. Using default.")
-            
-            # Encode the location for the URL
-            encoded_location = requests.utils.quote(location)
+            # Resolve the location (the current location is looked up in the background)
+            place = self._resolve_location(location)
             
-            # Get forecast data - use metric units for Celsius
-            forecast_url = f"https://api.openweathermap.org/data/2.5/forecast?q={encoded_location}&appid={self.api_key}&units=metric"
-            response = requests.get(forecast_url)
+            # Get forecast data (from the cache, or a prefetch, when it is recent enough)
+            try:
+                forecast_data = self._fetch("forecast", place)
+            except WeatherApiError as e:
+                return {"error": f"Couldn't get forecast: {e}"}
             
-            if response.status_code == 200:
-                forecast_data = response.json()
-                
-                # Format the forecast
-                city_name = forecast_data['city']['name']
-                forecast_text = f"Weather forecast for {city_name}:\\n"
-                
-                # Track unique days and their forecast info
-                day_forecast_data = {}
-                day_forecasts = {}
-                today = datetime.now().strftime("%Y-%m-%d")
-                tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-                
-                # First pass: collect all forecasts by day
-                for forecast in forecast_data['list']:
-                    # Parse the date
-                    forecast_date = datetime.fromtimestamp(forecast['dt'])
-                    forecast_day = forecast_date.strftime("%Y-%m-%d")
-                    
-                    # Only collect data for the next 3 days
-                    if forecast_day not in day_forecast_data and len(day_forecast_data) < 3:
-                        day_forecast_data[forecast_day] = {
-                            'descriptions': [],
-                            'temp_mins': [],
-                            'temp_maxs': []
-                        }
-                    
-                    if forecast_day in day_forecast_data:
-                        # Add this forecast data to the day's collections
-                        day_forecast_data[forecast_day]['descriptions'].append(forecast['weather'][0]['description'])
-                        day_forecast_data[forecast_day]['temp_mins'].append((forecast['main']['temp_min']))
-                        day_forecast_data[forecast_day]['temp_maxs'].append((forecast['main']['temp_max']))
-                
-                # Process each day's forecasts
-                for forecast_day, data in day_forecast_data.items():
-                    # Get the most common description (mode)
-                    descriptions = data['descriptions']
-                    description = max(set(descriptions), key=descriptions.count)
-                    
-                    # Find actual min and max temps
-                    temp_min = min(data['temp_mins'])
-                    temp_max = max(data['temp_maxs'])
-                    
-                    # Set the day name
-                    if forecast_day == today:
-                        day_name = "Today"
-                    elif forecast_day == tomorrow:
-                        day_name = "Tomorrow"
-                    else:
-                        day_name = datetime.strptime(forecast_day, "%Y-%m-%d").strftime("%A")
-                    
-                    # Store the forecast info
-                    day_forecasts[day_name] = {
-                        'description': description,
-                        'high': temp_max,
-                        'low': temp_min
-                    }
-                    
-                    # Add to the text output
-                    forecast_text += f"{day_name}: {description} with a high of {temp_max}°C and a low of {temp_min}°C\n"
-                
-                # Prepare speech summary
-                speech_intro = f"Here's the forecast for {city_name}"
-                day_summaries = []
-                for day_name, forecast_info in day_forecasts.items():
-                    day_summaries.append(f"{day_name}: {forecast_info['description']} with a high of {forecast_info['high']}°C and a low of {forecast_info['low']}°C")
-                
-                return {
-                    "detailed_info": forecast_text,
-                    "speech_intro": speech_intro, 
-                    "day_summaries": day_summaries
-                }
-            else:
-                error_info = f"Couldn't get forecast: {response.status_code} - {response.reason}"
-                return {"error": error_info}
+            return self._format_forecast(forecast_data)
                     
         except Exception as e:
             error_info = f"Error getting forecast: {e}"
             return {"error": error_info}
+    
+    def get_weather_report(self, location):
+        """Get current conditions and the forecast for a location in one result, fetched concurrently
+        
+        Returns {"location", "current", "forecast"} where current and forecast are
+        what get_weather and get_weather_forecast return (each may hold an error).
+        """
+        try:
+            place = self._resolve_location(location)
+            
+            # Both requests run at the same time (or come straight from the cache)
+            current = self._executor.submit(self._fetch, "weather", place)
+            forecast = self._executor.submit(self._fetch, "forecast", place)
+            
+            report = {"location": place.label}
+            for name, future, formatter in (("current", current, self._format_current),
+                                            ("forecast", forecast, self._format_forecast)):
+                try:
+                    report[name] = formatter(future.result())
+                except WeatherApiError as e:
+                    report[name] = {"error": f"Couldn't get {'weather' if name == 'current' else 'forecast'}: {e}"}
+            return report
+        
+        except Exception as e:
+            error_info = f"Error getting weather report: {e}"
+            return {"error": error_info}
+    
+    def prefetch_forecast(self, place):
+        """Start fetching the forecast for an already resolved place in the background"""
+        self._executor.submit(self._prefetch, "forecast", place)
+    
+    def _prefetch(self, endpoint, place):
+        """Warm the cache for an endpoint; failures are left for the real request to report"""
+        try:
+            self._fetch(endpoint, place)
+        except Exception:
+            pass
+    
+    def _format_current(self, weather_data):
+        """Turn current weather JSON into detailed text and a speech summary"""
+        # Format the weather data
+        city_name = weather_data['name']
+        country = weather_data['sys']['country']
+        temp = (weather_data['main']['temp'])
+        temp_reference = self._reference_temperature(temp)
+        condition = weather_data['weather'][0]['main']
+        description = weather_data['weather'][0]['description']
+        humidity = weather_data['main']['humidity']
+        wind_speed = self._wind_speed(weather_data['wind']['speed'])
+        wind_dir = self.get_wind_direction(weather_data['wind']['deg'])
+        
+        # Format complete response
+        weather_info = f"Current weather in {city_name}, {country}: "
+        weather_info += f"Temperature: {temp}{self.temp_unit} ({temp_reference}), "
+        weather_info += f"Conditions: {description}, "
+        weather_info += f"Humidity: {humidity}%, "
+        weather_info += f"Wind: {wind_speed} {self.wind_unit} from the {wind_dir}"
+        
+        # Create a summary for speech
+        speech_summary = f"It's currently {temp}{self.temp_unit} with {description} in {city_name}"
+        
+        # Return both detailed info and speech summary
+        return {
+            "detailed_info": weather_info,
+            "speech_summary": speech_summary
+        }
+    
+    def _format_forecast(self, forecast_data):
+        """Turn forecast JSON into detailed text, a speech intro and one summary per day"""
+        # Format the forecast
+        city_name = forecast_data['city']['name']
+        forecast_text = f"Weather forecast for {city_name}:\\n"
+        
+        # Summarize the 3-hour slots per day in the city's own time zone
+        days = self.forecast_aggregator.aggregate(forecast_data['list'], forecast_data['city'].get('timezone'))
+        for day in days:
+            # Add to the text output
+            forecast_text += f"{day['name']}: {day['description']} with a high of {day['high']}{self.temp_unit} and a low of {day['low']}{self.temp_unit}\n"
+        
+        # Prepare speech summary
+        speech_intro = f"Here's the forecast for {city_name}"
+        day_summaries = [f"{day['name']}: {day['description']} with a high of {day['high']}{self.temp_unit} and a low of {day['low']}{self.temp_unit}"
+                         for day in days]
+        
+        return {
+            "detailed_info": forecast_text,
+            "speech_intro": speech_intro, 
+            "day_summaries": day_summaries,
+            "days": days
+        }
 
+    def _reference_temperature(self, temp):
+        """The temperature in the other common scale, shown next to it ("68°F" for 20°C)"""
+        if self.units == "imperial":
+            return f"{round((temp - 32) * 5/9)}°C"
+        if self.units == "standard":
+            return f"{round(temp - 273.15)}°C"
+        return f"{round((temp * 9/5) + 32)}°F"
+    
+    def _wind_speed(self, speed):
+        """Wind speed in wind_unit; OpenWeatherMap gives m/s except with imperial units (mph)"""
+        if self.units == "imperial":
+            return round(speed)
+        return round(speed * 3.6)
+    
     def get_wind_direction(self, degrees):
         """Convert wind degrees to cardinal direction"""
         directions = ["north", "northeast", "east", "southeast", "south", "southwest", "west", "northwest", "north"]
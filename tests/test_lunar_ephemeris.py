@@ -0,0 +1,44 @@
+import unittest
+from datetime import datetime, timezone
+
+from utils import lunar_ephemeris
+from utils.lunar_ephemeris import SYNODIC_MONTH, elongation, illumination, moon_phase, moon_phases
+
+# Published instants (UTC) of principal phases
+NEW_MOON = datetime(2024, 4, 8, 18, 21, tzinfo=timezone.utc)  # The total solar eclipse
+FIRST_QUARTER = datetime(2024, 1, 18, 3, 53, tzinfo=timezone.utc)
+FULL_MOON = datetime(2024, 1, 25, 17, 54, tzinfo=timezone.utc)
+LAST_QUARTER = datetime(2024, 2, 2, 23, 18, tzinfo=timezone.utc)
+
+
+class LunarEphemerisTest(unittest.TestCase):
+    def test_elongation_at_principal_phases(self):
+        for when, angle in ((NEW_MOON, 0), (FIRST_QUARTER, 90), (FULL_MOON, 180), (LAST_QUARTER, 270)):
+            with self.subTest(when=when):
+                # The Moon gains about half a degree an hour on the Sun
+                difference = (elongation(when.timestamp()) - angle + 180) % 360 - 180
+                self.assertLess(abs(difference), 0.2)
+
+    def test_illumination(self):
+        self.assertLess(illumination(NEW_MOON.timestamp()), 0.001)
+        self.assertGreater(illumination(FULL_MOON.timestamp()), 0.999)
+        self.assertAlmostEqual(illumination(FIRST_QUARTER.timestamp()), 0.5, delta=0.01)
+
+    def test_moon_phase_accepts_datetimes(self):
+        phase = moon_phase(FULL_MOON)
+        self.assertAlmostEqual(phase["angle"], 180, delta=0.2)
+        self.assertAlmostEqual(phase["age"], SYNODIC_MONTH / 2, delta=0.1)
+        # Naive datetimes are UTC
+        self.assertEqual(moon_phase(FULL_MOON.replace(tzinfo=None)), phase)
+
+    @unittest.skipIf(lunar_ephemeris.numpy is None, "NumPy is not installed")
+    def test_vectorized_matches_scalar(self):
+        timestamps = [NEW_MOON.timestamp() + day * 86400 for day in range(30)]
+        angles, fractions = moon_phases(timestamps)
+        for timestamp, angle, fraction in zip(timestamps, angles, fractions):
+            self.assertAlmostEqual(angle, elongation(timestamp), places=6)
+            self.assertAlmostEqual(fraction, illumination(timestamp), places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from datetime import datetime, timezone
+
+from utils.lunar_ephemeris import SYNODIC_MONTH, lunar_events, mean_phase_time, phase_event_time
+from utils.lunar_events import LunarEventTable
+
+MINUTES = 60
+
+# Published full moons of 2025 (UTC)
+FULL_MOONS_2025 = [
+    datetime(2025, 1, 13, 22, 27), datetime(2025, 2, 12, 13, 53), datetime(2025, 3, 14, 6, 55),
+    datetime(2025, 4, 13, 0, 22), datetime(2025, 5, 12, 16, 56), datetime(2025, 6, 11, 7, 44),
+    datetime(2025, 7, 10, 20, 37), datetime(2025, 8, 9, 7, 55), datetime(2025, 9, 7, 18, 9),
+    datetime(2025, 10, 7, 3, 48), datetime(2025, 11, 5, 13, 19), datetime(2025, 12, 4, 23, 14),
+]
+NEW_MOON = datetime(2024, 4, 8, 18, 21)
+FIRST_QUARTER = datetime(2024, 1, 18, 3, 53)
+FULL_MOON = datetime(2024, 1, 25, 17, 54)
+LAST_QUARTER = datetime(2024, 2, 2, 23, 18)
+
+
+def utc(when):
+    return when.replace(tzinfo=timezone.utc).timestamp()
+
+
+def lunation(when):
+    """Lunations since the new moon of 2000 January 6 (k in Meeus 49.2), rounded to a quarter"""
+    return round((utc(when) - mean_phase_time(0)) / (SYNODIC_MONTH * 86400) * 4) / 4
+
+
+class PhaseEventTest(unittest.TestCase):
+    def test_phase_event_time_matches_published_times(self):
+        for when in (NEW_MOON, FIRST_QUARTER, FULL_MOON, LAST_QUARTER):
+            with self.subTest(when=when):
+                self.assertLess(abs(phase_event_time(lunation(when)) - utc(when)), 10 * MINUTES)
+
+    def test_lunar_events_in_order(self):
+        events = lunar_events(utc(datetime(2024, 1, 12)), utc(datetime(2024, 2, 10)))
+        self.assertEqual([angle for _, angle in events], [90, 180, 270, 0])
+        for (timestamp, _), expected in zip(events, (FIRST_QUARTER, FULL_MOON, LAST_QUARTER)):
+            self.assertLess(abs(timestamp - utc(expected)), 10 * MINUTES)
+
+
+class LunarEventTableTest(unittest.TestCase):
+    def setUp(self):
+        self.table = LunarEventTable(years_ahead=2)
+
+    def test_angle_of(self):
+        self.assertEqual(LunarEventTable.angle_of("Full Moon"), 180)
+        self.assertEqual(LunarEventTable.angle_of("last quarter"), 270)
+        self.assertEqual(LunarEventTable.angle_of(90), 90)
+        with self.assertRaises(ValueError):
+            LunarEventTable.angle_of("blue moon")
+
+    def test_events_in_year(self):
+        full_moons = self.table.events_in_year("full moon", 2025)
+        self.assertEqual(len(full_moons), len(FULL_MOONS_2025))
+        for timestamp, expected in zip(full_moons, FULL_MOONS_2025):
+            self.assertLess(abs(timestamp - utc(expected)), 10 * MINUTES)
+
+    def test_next_event_is_strictly_after(self):
+        september = FULL_MOONS_2025[8]
+        after = utc(datetime(2025, 9, 1))
+        found = self.table.next_event("full moon", after)
+        self.assertLess(abs(found - utc(september)), 10 * MINUTES)
+        following = self.table.next_event("full moon", found)
+        self.assertLess(abs(following - utc(FULL_MOONS_2025[9])), 10 * MINUTES)
+
+    def test_next_events_are_sorted(self):
+        events = self.table.next_events(utc(datetime(2024, 1, 12)))
+        self.assertEqual([name for _, name in events], ["First Quarter", "Full Moon", "Last Quarter", "New Moon"])
+
+    def test_table_grows_to_cover_later_years(self):
+        self.table.next_event("new moon", utc(datetime(2025, 6, 1)))
+        self.assertEqual((self.table.first_year, self.table.last_year), (2025, 2027))
+        last_event = self.table.times[180][-1]
+        self.assertGreater(self.table.next_event("full moon", last_event), last_event)
+        self.table.events_in_year("full moon", 2040)
+        self.assertEqual(self.table.first_year, 2025)
+        self.assertGreaterEqual(self.table.last_year, 2040)
+        self.assertEqual(len(self.table.events_in_year("full moon", 2026)), 13)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from utils.period_memo import PeriodMemo
+
+ATHENS = timezone(timedelta(hours=3))
+
+
+def at(*args, tz=timezone.utc):
+    return datetime(*args, tzinfo=tz).timestamp()
+
+
+class PeriodMemoTest(unittest.TestCase):
+    def test_boundary_is_the_next_local_hour(self):
+        memo = PeriodMemo(period=3600, tz=ATHENS)
+        self.assertEqual(memo.boundary(at(2025, 6, 1, 14, 59, tz=ATHENS)), at(2025, 6, 1, 15, 0, tz=ATHENS))
+        self.assertEqual(memo.boundary(at(2025, 6, 1, 15, 0, tz=ATHENS)), at(2025, 6, 1, 16, 0, tz=ATHENS))
+
+    def test_daily_boundary_is_local_midnight(self):
+        memo = PeriodMemo(period=86400, tz=ATHENS)
+        # 22:30 UTC is already 01:30 the next day in Athens
+        self.assertEqual(memo.boundary(at(2025, 6, 1, 22, 30)), at(2025, 6, 3, 0, 0, tz=ATHENS))
+
+    def test_entry_expires_at_the_boundary(self):
+        memo = PeriodMemo(period=3600, tz=timezone.utc)
+        memo.store("phase", "full", now=at(2025, 6, 1, 14, 59))
+        self.assertEqual(memo.lookup("phase", now=at(2025, 6, 1, 14, 59, 59)), "full")
+        self.assertIsNone(memo.lookup("phase", now=at(2025, 6, 1, 15, 0)))
+        self.assertEqual(len(memo), 0)
+
+    def test_earlier_expiry_wins(self):
+        memo = PeriodMemo(period=86400, tz=timezone.utc)
+        memo.store("event", "soon", now=at(2025, 6, 1, 10), expires_at=at(2025, 6, 1, 12))
+        self.assertEqual(memo.lookup("event", now=at(2025, 6, 1, 11)), "soon")
+        self.assertIsNone(memo.lookup("event", now=at(2025, 6, 1, 12)))
+
+    def test_get_or_compute_computes_once_per_period(self):
+        memo = PeriodMemo(period=3600, tz=timezone.utc)
+        compute = mock.Mock(side_effect=["first", "second"])
+        self.assertEqual(memo.get_or_compute("phase", compute, now=at(2025, 6, 1, 14, 10)), "first")
+        self.assertEqual(memo.get_or_compute("phase", compute, now=at(2025, 6, 1, 14, 50)), "first")
+        self.assertEqual(memo.get_or_compute("phase", compute, now=at(2025, 6, 1, 15, 5)), "second")
+        self.assertEqual(compute.call_count, 2)
+
+    def test_size_cap_drops_expired_then_oldest(self):
+        memo = PeriodMemo(period=3600, tz=timezone.utc, max_entries=2)
+        memo.store("expired", 0, now=at(2025, 6, 1, 13), expires_at=at(2025, 6, 1, 13, 30))
+        memo.store("a", 1, now=at(2025, 6, 1, 14))
+        memo.store("b", 2, now=at(2025, 6, 1, 14))
+        self.assertEqual(len(memo), 2)
+        memo.store("c", 3, now=at(2025, 6, 1, 14))
+        now = at(2025, 6, 1, 14, 1)
+        self.assertIsNone(memo.lookup("a", now=now))
+        self.assertEqual((memo.lookup("b", now=now), memo.lookup("c", now=now)), (2, 3))
+
+    def test_invalidate(self):
+        memo = PeriodMemo(tz=timezone.utc)
+        now = at(2025, 6, 1, 14)
+        memo.store("a", 1, now=now)
+        memo.store("b", 2, now=now)
+        memo.invalidate("a")
+        self.assertIsNone(memo.lookup("a", now=now))
+        self.assertEqual(memo.lookup("b", now=now), 2)
+        memo.invalidate()
+        self.assertEqual(len(memo), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from utils.response_cache import TTLCache
+
+
+class TTLCacheTest(unittest.TestCase):
+    def test_fresh_stale_and_expired(self):
+        cache = TTLCache(ttl=10, stale_ttl=20)
+        cache.set("athens", "sunny")
+        now = time.time()
+
+        with mock.patch("utils.response_cache.time.time", return_value=now + 5):
+            self.assertEqual(cache.get("athens"), "sunny")
+            self.assertTrue(cache.lookup("athens")[2])
+        with mock.patch("utils.response_cache.time.time", return_value=now + 15):
+            value, _, is_fresh = cache.lookup("athens")
+            self.assertEqual(value, "sunny")
+            self.assertFalse(is_fresh)
+            self.assertIsNone(cache.get("athens"))
+        with mock.patch("utils.response_cache.time.time", return_value=now + 31):
+            self.assertIsNone(cache.lookup("athens"))
+        self.assertEqual(len(cache), 0)
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_get_or_fetch_caches_the_value(self):
+        cache = TTLCache()
+        fetch = mock.Mock(return_value="sunny")
+        self.assertEqual(cache.get_or_fetch("athens", fetch), "sunny")
+        self.assertEqual(cache.get_or_fetch("athens", fetch), "sunny")
+        fetch.assert_called_once()
+
+    def test_stale_value_is_served_while_refreshing(self):
+        cache = TTLCache(ttl=10, stale_ttl=60)
+        cache.set("athens", "sunny", ttl=0)
+        refreshed = threading.Event()
+
+        def fetch():
+            refreshed.set()
+            return "rainy"
+
+        self.assertEqual(cache.get_or_fetch("athens", fetch), "sunny")
+        self.assertTrue(refreshed.wait(2))
+        for _ in range(100):
+            if cache.get("athens") == "rainy":
+                break
+            time.sleep(0.01)
+        self.assertEqual(cache.get("athens"), "rainy")
+
+    def test_failed_refresh_keeps_the_stale_value(self):
+        cache = TTLCache(ttl=10, stale_ttl=60)
+        cache.set("athens", "sunny", ttl=0)
+        failed = threading.Event()
+
+        def fetch():
+            failed.set()
+            raise OSError("offline")
+
+        with mock.patch("builtins.print"):
+            self.assertEqual(cache.get_or_fetch("athens", fetch), "sunny")
+            self.assertTrue(failed.wait(2))
+            for _ in range(100):
+                if not cache._refreshing:
+                    break
+                time.sleep(0.01)
+        self.assertEqual(cache.lookup("athens")[0], "sunny")
+
+    def test_concurrent_misses_share_one_fetch(self):
+        cache = TTLCache()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return "sunny"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(cache.get_or_fetch("athens", fetch)))
+        leader.start()
+        self.assertTrue(started.wait(2))
+        followers = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("athens", fetch)))
+                     for _ in range(3)]
+        for follower in followers:
+            follower.start()
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(2)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["sunny"] * 4)
+
+    def test_concurrent_misses_share_the_error(self):
+        cache = TTLCache()
+        started, release = threading.Event(), threading.Event()
+
+        def fetch():
+            started.set()
+            release.wait(2)
+            raise ValueError("bad response")
+
+        errors = []
+
+        def call():
+            try:
+                cache.get_or_fetch("athens", fetch)
+            except ValueError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        self.assertTrue(started.wait(2))
+        follower = threading.Thread(target=call)
+        follower.start()
+        release.set()
+        leader.join(2)
+        follower.join(2)
+
+        self.assertEqual(len(errors), 2)
+        self.assertIs(errors[0], errors[1])
+        self.assertEqual(len(cache), 0)
+
+
+class TTLCachePersistenceTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, content):
+        with open(self.path, "w", encoding="utf-8") as cache_file:
+            cache_file.write(content)
+
+    def test_entries_survive_a_restart(self):
+        cache = TTLCache(ttl=60, path=self.path)
+        cache.set("athens", {"temp": 21})
+        self.assertEqual(TTLCache(ttl=60, path=self.path).get("athens"), {"temp": 21})
+
+    def test_expired_entries_are_not_loaded(self):
+        now = time.time()
+        self.write(json.dumps([["old", now - 100, 10, "x"], ["new", now, 10, "y"]]))
+        cache = TTLCache(stale_ttl=30, path=self.path)
+        self.assertIsNone(cache.lookup("old"))
+        self.assertEqual(cache.get("new"), "y")
+
+    def test_malformed_files_are_ignored(self):
+        for content in ["not json", json.dumps({"athens": "sunny"}), json.dumps("sunny")]:
+            with self.subTest(content=content):
+                self.write(content)
+                with mock.patch("builtins.print"):
+                    cache = TTLCache(path=self.path)
+                self.assertEqual(len(cache), 0)
+
+    def test_malformed_entries_are_skipped(self):
+        now = time.time()
+        self.write(json.dumps([["athens", now, 60], "sunny", ["paris", "yesterday", 60, "x"],
+                               ["rome", now, 60, "cloudy"]]))
+        cache = TTLCache(path=self.path)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get("rome"), "cloudy")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,239 @@
+import math
+import queue
+import threading
+import time
+from array import array
+
+from colorama import Fore, Style
+from utils.audio_sources import MicrophoneSource
+
+try:
+    import audioop
+except ImportError:  # Removed from the standard library in Python 3.13
+    audioop = None
+
+
+def frame_energy(data):
+    """Get the RMS energy of a frame of 16-bit mono PCM"""
+    if audioop:
+        return audioop.rms(data, 2)
+    samples = array('h', data)
+    if not samples:
+        return 0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+class _PulledFrames(queue.Queue):
+    """Subscriber queue for replayed sources: a blocking get() reads the next frame on demand"""
+
+    def __init__(self, service, maxsize):
+        super().__init__(maxsize=maxsize)
+        self.service = service
+
+    def get(self, block=True, timeout=None):
+        if block and self.empty():
+            self.service._pump()
+        return super().get(block=False)
+
+
+class AudioCaptureService:
+    """Owns the single microphone input stream and fans its frames out to consumers
+
+    The wake word detector and the command recognizer both subscribe to the same
+    stream instead of opening their own devices. Frames heard while nobody is
+    capturing a command feed a running ambient-noise estimate, so capturing a
+    command does not need its own calibration pause.
+
+    A live source is read on a background thread. A replayed source (see
+    FileAudioSource) is instead read whenever a consumer waits for a frame, so
+    recorded sessions run as fast as the pipeline can process them.
+    """
+
+    def __init__(self, sample_rate=16000, frame_length=512, min_energy=200,
+                 energy_ratio=1.5, noise_adaptation=0.05, queue_seconds=5, source=None):
+        """Initialize the capture service (defaults match Porcupine's frame format)"""
+        self.source = source or MicrophoneSource(sample_rate, frame_length)
+        self.sample_rate = self.source.sample_rate
+        self.frame_length = self.source.frame_length
+        self.min_energy = min_energy
+        self.energy_ratio = energy_ratio
+        self.noise_adaptation = noise_adaptation
+        self.queue_size = int(queue_seconds * sample_rate / frame_length)
+
+        self.noise_level = None
+        self.is_capturing = False
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    @property
+    def frame_duration(self):
+        """Length of one frame in seconds"""
+        return self.frame_length / self.sample_rate
+
+    @property
+    def finished(self):
+        """Whether a replayed source has run out of audio"""
+        return self.source.exhausted
+
+    @property
+    def energy_threshold(self):
+        """Energy above which a frame is considered speech"""
+        if self.noise_level is None:
+            return self.min_energy
+        return max(self.min_energy, self.noise_level * self.energy_ratio)
+
+    def start(self):
+        """Open the input stream and start reading frames"""
+        try:
+            self.source.open()
+        except Exception as e:
+            print(f"Error opening microphone stream: {e}")
+            self.stop()
+            return False
+
+        self._running = True
+        if self.source.is_live:
+            self._thread = threading.Thread(target=self._run, name="audio-capture", daemon=True)
+            self._thread.start()
+        return True
+
+    def subscribe(self):
+        """Get a queue that receives every frame read from now on"""
+        if self.source.is_live:
+            frames = queue.Queue(maxsize=self.queue_size)
+        else:
+            frames = _PulledFrames(self, self.queue_size)
+        with self._lock:
+            self._subscribers.append(frames)
+        return frames
+
+    def unsubscribe(self, frames):
+        """Stop delivering frames to a queue returned by subscribe()"""
+        with self._lock:
+            if frames in self._subscribers:
+                self._subscribers.remove(frames)
+
+    def _run(self):
+        """Read frames from a live source on a background thread"""
+        while self._running:
+            try:
+                self._pump()
+            except Exception as e:
+                print(f"Error reading from microphone: {e}")
+                time.sleep(self.frame_duration)
+
+    def _pump(self):
+        """Read one frame and hand it to every subscriber"""
+        if not self._running:
+            return
+        data = self.source.read(self.frame_length)
+        if not data:
+            # A replayed recording has ended
+            self._running = False
+            return
+
+        if not self.is_capturing:
+            self._update_noise_level(frame_energy(data))
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for frames in subscribers:
+            self._deliver(frames, data)
+
+    def _deliver(self, frames, data):
+        """Put a frame on a subscriber queue, dropping its oldest frame if it is full"""
+        try:
+            frames.put_nowait(data)
+        except queue.Full:
+            try:
+                frames.get_nowait()
+            except queue.Empty:
+                pass
+            frames.put_nowait(data)
+
+    def _update_noise_level(self, energy):
+        """Fold a non-speech frame into the running ambient-noise estimate"""
+        if self.noise_level is None:
+            self.noise_level = energy
+        elif energy < self.energy_threshold:
+            self.noise_level += (energy - self.noise_level) * self.noise_adaptation
+
+    def capture_command(self, timeout=None, phrase_time_limit=10, pause_threshold=0.8, lead_in=0.3,
+                        preroll=None, frames=None):
+        """Capture one spoken phrase and return its raw PCM bytes, or None on timeout
+
+        preroll is PCM that was already heard (e.g. right after the wake word) and is
+        examined before any live audio; frames is an existing subscriber queue that
+        continues exactly where the preroll ends.
+        """
+        own_subscription = frames is None
+        if own_subscription:
+            frames = self.subscribe()
+        frame_bytes = self.frame_length * 2
+        pending = [preroll[start:start + frame_bytes] for start in range(0, len(preroll or b""), frame_bytes)]
+        pending.reverse()
+
+        def next_frame(wait):
+            if pending:
+                return pending.pop()
+            return frames.get(timeout=wait)
+
+        self.is_capturing = True
+        try:
+            threshold = self.energy_threshold
+            lead_in_frames = max(1, int(lead_in / self.frame_duration))
+            pause_frames = max(1, int(pause_threshold / self.frame_duration))
+            limit_frames = int(phrase_time_limit / self.frame_duration) if phrase_time_limit else None
+
+            # Wait for the first frame loud enough to be speech. The timeout is
+            # counted in frames so replayed audio times out like live audio does.
+            phrase = []
+            timeout_frames = int(timeout / self.frame_duration) if timeout else None
+            waited_frames = 0
+            while True:
+                if timeout_frames is not None and waited_frames >= timeout_frames and not pending:
+                    return None
+                try:
+                    data = next_frame(0.5)
+                except queue.Empty:
+                    if not self._running:
+                        return None
+                    # No audio arrived for half a second
+                    waited_frames += int(0.5 / self.frame_duration)
+                    continue
+                waited_frames += 1
+                phrase.append(data)
+                if frame_energy(data) > threshold:
+                    break
+                # Keep a little audio from before the speech started
+                del phrase[:-lead_in_frames]
+
+            # Record until a long enough pause or the phrase time limit
+            quiet_frames = 0
+            while quiet_frames < pause_frames:
+                if limit_frames and len(phrase) >= limit_frames:
+                    break
+                try:
+                    data = next_frame(1)
+                except queue.Empty:
+                    break
+                phrase.append(data)
+                quiet_frames = quiet_frames + 1 if frame_energy(data) <= threshold else 0
+
+            return b"".join(phrase)
+        finally:
+            self.is_capturing = False
+            if own_subscription:
+                self.unsubscribe(frames)
+
+    def stop(self):
+        """Stop reading and release the audio device"""
+        self._running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+        self.source.close()
+        print(f"{Style.DIM}{Fore.LIGHTGREEN_EX}Microphone stream closed.{Style.RESET_ALL}")
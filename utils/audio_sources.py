@@ -0,0 +1,120 @@
+import time
+import wave
+
+
+class MicrophoneSource:
+    """Live 16-bit mono input from the default microphone through PyAudio"""
+
+    is_live = True
+
+    def __init__(self, sample_rate=16000, frame_length=512):
+        """Initialize the source; the device is opened by open()"""
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        self.exhausted = False
+        self.frames_read = 0
+        self.pa = None
+        self.stream = None
+
+    def open(self):
+        """Open the input device"""
+        import pyaudio
+
+        self.pa = pyaudio.PyAudio()
+        self.stream = self.pa.open(
+            rate=self.sample_rate,
+            channels=1,
+            format=pyaudio.paInt16,
+            input=True,
+            frames_per_buffer=self.frame_length
+        )
+
+    def read(self, num_samples, exception_on_overflow=False):
+        """Read num_samples samples of raw PCM, blocking until they arrive"""
+        data = self.stream.read(num_samples, exception_on_overflow=exception_on_overflow)
+        self.frames_read += num_samples // self.frame_length
+        return data
+
+    def get_read_available(self):
+        """Number of samples that can be read without blocking"""
+        return self.stream.get_read_available()
+
+    def close(self):
+        """Release the input device"""
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if self.pa:
+            self.pa.terminate()
+            self.pa = None
+
+
+class FileAudioSource:
+    """Replays a recorded session from a WAV or raw 16-bit mono PCM file
+
+    By default the file is read as fast as the consumers can process it, which
+    lets the whole voice pipeline run headless and faster than real time. With
+    realtime=True reads are paced like a live microphone.
+    """
+
+    is_live = False
+
+    def __init__(self, path, sample_rate=16000, frame_length=512, realtime=False):
+        """Initialize the source for a recording; the file is loaded by open()"""
+        self.path = path
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        self.realtime = realtime
+        self.exhausted = False
+        self.frames_read = 0
+        self.pcm = b""
+        self.offset = 0
+        self._started = None
+
+    def open(self):
+        """Load the recording into memory"""
+        if self.path.lower().endswith(".wav"):
+            with wave.open(self.path, "rb") as wav:
+                if wav.getnchannels() != 1 or wav.getsampwidth() != 2 or wav.getframerate() != self.sample_rate:
+                    raise ValueError(f"{self.path} must be {self.sample_rate} Hz mono 16-bit PCM")
+                self.pcm = wav.readframes(wav.getnframes())
+        else:
+            with open(self.path, "rb") as raw:
+                self.pcm = raw.read()
+        self.offset = 0
+        self.exhausted = False
+        self._started = time.perf_counter()
+
+    @property
+    def position(self):
+        """Seconds of audio replayed so far"""
+        return self.offset / 2 / self.sample_rate
+
+    def read(self, num_samples, exception_on_overflow=False):
+        """Read num_samples samples, or b"" once the recording has run out"""
+        size = num_samples * 2
+        if self.offset + size > len(self.pcm):
+            # Drop a trailing partial frame; consumers only deal in whole frames
+            self.exhausted = True
+            return b""
+
+        if self.realtime:
+            delay = self._started + (self.offset + size) / 2 / self.sample_rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        data = self.pcm[self.offset:self.offset + size]
+        self.offset += size
+        self.frames_read += num_samples // self.frame_length
+        return data
+
+    def get_read_available(self):
+        """Number of samples that can be read without blocking"""
+        if self.realtime:
+            elapsed = int((time.perf_counter() - self._started) * self.sample_rate)
+            return max(0, min(elapsed, len(self.pcm) // 2) - self.offset // 2)
+        return (len(self.pcm) - self.offset) // 2
+
+    def close(self):
+        """Forget the loaded recording"""
+        self.pcm = b""
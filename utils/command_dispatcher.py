@@ -0,0 +1,281 @@
+import re
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+LITERAL = sre_constants.LITERAL
+IN = sre_constants.IN
+AT = sre_constants.AT
+BRANCH = sre_constants.BRANCH
+SUBPATTERN = sre_constants.SUBPATTERN
+REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+
+WORD_RE = re.compile(r"\w+")
+
+# Words too common in spoken requests to narrow anything down; patterns that
+# only have these as anchors (e.g. "tell me|what is ...") stay in the fallback
+GENERIC_WORDS = {
+    "a", "an", "the", "s", "i", "me", "my", "you", "it", "is", "are", "was",
+    "what", "who", "where", "when", "how", "can", "do", "tell",
+    "to", "for", "in", "on", "of", "at", "about", "and", "or",
+}
+
+
+def _is_word_char(char):
+    """Check whether a character is part of a \\w+ token"""
+    return WORD_RE.match(char) is not None
+
+
+def _edge_is_word(continuations, step):
+    """Check whether the pattern text next to a literal run can be a word character"""
+    # continuations is a tuple of (items, index) frames, innermost first; when a
+    # frame runs out the walk carries on in the enclosing sequence
+    while continuations:
+        items, index = continuations[0]
+        rest = continuations[1:]
+        while 0 <= index < len(items):
+            op, av = items[index]
+            if op is LITERAL:
+                return _is_word_char(chr(av))
+            if op is AT:
+                index += step
+                continue
+            if op is IN:
+                # A character class only counts if it can produce a word character
+                return any(kind is not LITERAL or _is_word_char(chr(value)) for kind, value in av)
+            if op is SUBPATTERN:
+                inner = list(av[-1])
+                start = 0 if step > 0 else len(inner) - 1
+                return _edge_is_word(((inner, start), (items, index + step)) + rest, step)
+            if op is BRANCH:
+                for alternative in av[1]:
+                    alternative = list(alternative)
+                    start = 0 if step > 0 else len(alternative) - 1
+                    if _edge_is_word(((alternative, start), (items, index + step)) + rest, step):
+                        return True
+                return False
+            if op in REPEATS:
+                minimum, _, inner = av
+                inner = list(inner)
+                start = 0 if step > 0 else len(inner) - 1
+                if _edge_is_word(((inner, start), (items, index + step)) + rest, step):
+                    return True
+                if minimum == 0:
+                    index += step
+                    continue
+                return False
+            # Anything else (., \d, backreferences...) may well be a word character
+            return True
+        continuations = rest
+    # Start or end of the whole pattern: whatever surrounds the match in the
+    # utterance is treated as a word boundary
+    return False
+
+
+def _run_anchors(run, before, after):
+    """Get the whole words of a literal run that a match is guaranteed to contain"""
+    words = []
+    for word in WORD_RE.finditer(run):
+        if word.start() == 0 and _edge_is_word(before, -1):
+            continue
+        if word.end() == len(run) and _edge_is_word(after, 1):
+            continue
+        if word.group() in GENERIC_WORDS:
+            continue
+        words.append(word.group())
+    return words
+
+
+def _best_option(options):
+    """Pick the most selective anchor set: fewest alternatives, then longest words"""
+    if not options:
+        return None
+    return min(options, key=lambda option: (len(option), -min(len(word) for word in option)))
+
+
+def _analyze(items, before=(), after=()):
+    """Get a set of words of which at least one appears in every match, or None"""
+    items = list(items)
+    options = []
+    run = []
+    run_start = 0
+
+    for index, (op, av) in enumerate(items + [(None, None)]):
+        if op is LITERAL:
+            if not run:
+                run_start = index
+            run.append(chr(av).lower())
+            continue
+
+        if run:
+            words = _run_anchors("".join(run), ((items, run_start - 1),) + before, ((items, index),) + after)
+            options.extend(frozenset([word]) for word in words)
+            run = []
+
+        inner_before = ((items, index - 1),) + before
+        inner_after = ((items, index + 1),) + after
+        if op is SUBPATTERN:
+            anchors = _analyze(av[-1], inner_before, inner_after)
+            if anchors:
+                options.append(anchors)
+        elif op is BRANCH:
+            alternatives = [_analyze(alternative, inner_before, inner_after) for alternative in av[1]]
+            if all(alternatives):
+                options.append(frozenset().union(*alternatives))
+        elif op in REPEATS and av[0] >= 1:
+            anchors = _analyze(av[2], inner_before, inner_after)
+            if anchors:
+                options.append(anchors)
+
+    return _best_option(options)
+
+
+def extract_anchors(pattern):
+    """Get the literal words a pattern requires, or None if it has no mandatory anchor"""
+    try:
+        return _analyze(sre_parse.parse(pattern))
+    except Exception:
+        return None
+
+
+class PhraseMatch:
+    """The parts of re.Match that CommandDispatcher uses, for a PhraseCommand match"""
+
+    def __init__(self, string, span, phrase_span, value):
+        self.string = string
+        self._span = span
+        self._phrase_span = phrase_span
+        self.value = value
+
+    def span(self, group=0):
+        return self._span if group == 0 else self._phrase_span
+
+    def group(self, group=0):
+        start, end = self.span(group)
+        return self.string[start:end]
+
+    def groups(self):
+        return (self.group(1),)
+
+
+class PhraseCommand:
+    """A command pattern whose one argument must be a phrase from a PhraseTrie
+
+    Stands in for a regex like "play (?:the )?(liked songs|discover weekly|...) spotify"
+    with the alternation taken from data: the trie finds the phrases in the
+    utterance and the before/after regexes only check the words around them, so
+    matching doesn't slow down as phrases are added. group(1) of a match is the
+    phrase as spoken, and its value is what the phrase was added with.
+    """
+
+    def __init__(self, before, phrases, after, flags=re.IGNORECASE):
+        """Initialize the command from the regexes before and after the phrase and a PhraseTrie"""
+        self.pattern = f"{before}(<phrase>){after}"
+        self.before = re.compile(f"(?:{before})$", flags)
+        self.after = re.compile(after, flags)
+        self.phrases = phrases
+        # Like a regex, indexed by a word it can't match without
+        self.anchors = _best_option([anchors for anchors in (extract_anchors(before), extract_anchors(after))
+                                     if anchors])
+
+    def search(self, text):
+        """Find the first phrase in text with the expected words around it; a PhraseMatch or None"""
+        for start, end, value in self.phrases.finditer(text):
+            prefix = self.before.search(text, 0, start)
+            if prefix is None:
+                continue
+            suffix = self.after.match(text, end)
+            if suffix is None:
+                continue
+            return PhraseMatch(text, (prefix.start(), suffix.end()), (start, end), value)
+        return None
+
+
+class CommandDispatcher:
+    """Resolves user text to a command handler using precompiled patterns
+
+    Every pattern is analyzed at registration time for the literal words it
+    cannot match without (e.g. "weather" or "spotify"). Those words go into an
+    inverted index, so an utterance only runs the regexes whose anchors it
+    contains, plus a fallback bucket of catch-all patterns that have no anchor.
+    Anchors are matched as whole words of the utterance.
+
+    Besides regex strings, a pattern can be a prebuilt matcher with a
+    search(text) method and anchors, such as a PhraseCommand.
+    """
+
+    def __init__(self, commands=None, flags=re.IGNORECASE, use_index=True):
+        """Initialize the dispatcher with an optional ordered pattern -> handler mapping"""
+        self.flags = flags
+        self.use_index = use_index
+        self.patterns = []
+        self.handlers = []
+        self.compiled = []
+        self.anchors = []
+        self.index = {}
+        self.fallback = []
+
+        if commands:
+            for pattern, func in commands.items():
+                self.register(pattern, func)
+
+    def register(self, pattern, func):
+        """Register a pattern; earlier registrations win when several patterns match"""
+        position = len(self.patterns)
+        self.patterns.append(pattern)
+        self.handlers.append(func)
+        if isinstance(pattern, str):
+            # Compile once here instead of going through the re module cache on every
+            # utterance (which thrashes once there are more than ~500 patterns)
+            self.compiled.append(re.compile(pattern, self.flags))
+            anchors = extract_anchors(pattern)
+        else:
+            self.compiled.append(pattern)
+            anchors = pattern.anchors
+        self.anchors.append(anchors)
+        if anchors:
+            for word in anchors:
+                self.index.setdefault(word, []).append(position)
+        else:
+            self.fallback.append(position)
+
+    def candidates(self, text):
+        """Get the positions of the patterns worth running on the text, in priority order"""
+        if not self.use_index:
+            return range(len(self.compiled))
+
+        positions = set(self.fallback)
+        for word in set(WORD_RE.findall(text.lower())):
+            if word in self.index:
+                positions.update(self.index[word])
+        return sorted(positions)
+
+    def match(self, text):
+        """Return (handler, match) for the highest priority pattern, or (None, None)"""
+        if not text:
+            return None, None
+
+        for index in self.candidates(text):
+            matches = self.compiled[index].search(text)
+            if matches:
+                return self.handlers[index], matches
+        return None, None
+
+    def dispatch(self, text):
+        """Call the handler of the first matching pattern and return its result"""
+        func, matches = self.match(text)
+        if func is None:
+            return None
+
+        if len(matches.groups()) > 0:
+            # If there are capturing groups, pass them to the function
+            if len(matches.groups()) == 1:
+                return func(matches.group(1))
+            else:
+                return func(*matches.groups())
+        else:
+            # No capturing groups, just call the function
+            return func()
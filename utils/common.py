@@ -1,9 +1,7 @@
 import re
 import webbrowser
-import requests
 import subprocess
 import sys
-import wikipedia
 from datetime import datetime
 from colorama import init, Fore, Style
 
@@ -0,0 +1,133 @@
+import calendar
+import time
+from array import array
+from collections import Counter
+from datetime import date, timedelta
+
+SECONDS_PER_DAY = 86400
+_EPOCH = date(1970, 1, 1)
+
+
+def local_utc_offset(timestamp=None):
+    """This machine's UTC offset in seconds at a timestamp (now by default)"""
+    return time.localtime(timestamp).tm_gmtoff
+
+
+def day_key(timestamp, utc_offset):
+    """Integer day number (days since 1970-01-01) of a UTC timestamp in a local time zone"""
+    return (int(timestamp) + utc_offset) // SECONDS_PER_DAY
+
+
+def _number(value):
+    """Drop the .0 from whole numbers so they read naturally ("20°C", not "20.0°C")"""
+    return int(value) if value.is_integer() else value
+
+
+def day_name(key, today):
+    """Speakable name of a day key: "Today", "Tomorrow" or the weekday"""
+    if key == today:
+        return "Today"
+    if key == today + 1:
+        return "Tomorrow"
+    # 1970-01-01 was a Thursday (weekday 3)
+    return calendar.day_name[(key + 3) % 7]
+
+
+class ForecastAggregator:
+    """Summarizes 3-hour forecast slots (OpenWeatherMap's "list") per local day in one pass
+
+    Slots are bucketed by integer day key, so there is no per-slot datetime or
+    string formatting. Each statistic lives in a preallocated array indexed by
+    day (running min/max/sums, no per-day lists), and the dominant description
+    is the mode of per-day counts.
+    """
+
+    def __init__(self, days=3):
+        """Initialize the aggregator for the first `days` days of a forecast"""
+        self.days = days
+
+    def aggregate(self, slots, utc_offset=None, now=None):
+        """Summarize slots into at most `days` day dicts, in order
+
+        utc_offset is the local time zone in seconds east of UTC (OpenWeatherMap's
+        city.timezone; defaults to this machine's). Each day dict holds key, date,
+        name, description, low, high, precipitation (mm), wind_max, humidity
+        (mean %), pop (highest chance of precipitation) and samples.
+        """
+        if now is None:
+            now = time.time()
+        if utc_offset is None:
+            utc_offset = local_utc_offset(now)
+
+        days = self.days
+        infinity = float("inf")
+        lows = array("d", [infinity]) * days
+        highs = array("d", [-infinity]) * days
+        precipitation = array("d", bytes(8 * days))
+        wind_max = array("d", bytes(8 * days))
+        humidity_sums = array("d", bytes(8 * days))
+        pops = array("d", bytes(8 * days))
+        samples = array("l", bytes(array("l").itemsize * days))
+        descriptions = [{} for _ in range(days)]
+
+        # Days are numbered from the first day present, as the forecast starts "now"
+        first_day = None
+        for slot in slots:
+            key = (int(slot["dt"]) + utc_offset) // SECONDS_PER_DAY
+            if first_day is None:
+                first_day = key
+            index = key - first_day
+            if index < 0 or index >= days:
+                continue
+
+            main = slot["main"]
+            value = main["temp_min"]
+            if value < lows[index]:
+                lows[index] = value
+            value = main["temp_max"]
+            if value > highs[index]:
+                highs[index] = value
+            humidity_sums[index] += main.get("humidity", 0)
+
+            wind = slot.get("wind")
+            if wind:
+                value = wind.get("speed", 0)
+                if value > wind_max[index]:
+                    wind_max[index] = value
+            if "rain" in slot:
+                precipitation[index] += slot["rain"].get("3h", 0)
+            if "snow" in slot:
+                precipitation[index] += slot["snow"].get("3h", 0)
+            value = slot.get("pop", 0)
+            if value > pops[index]:
+                pops[index] = value
+
+            counts = descriptions[index]
+            description = slot["weather"][0]["description"]
+            counts[description] = counts.get(description, 0) + 1
+            samples[index] += 1
+
+        if first_day is None:
+            return []
+
+        today = day_key(now, utc_offset)
+        summaries = []
+        for index in range(days):
+            if not samples[index]:
+                continue
+            key = first_day + index
+            summaries.append({
+                "key": key,
+                "date": _EPOCH + timedelta(days=key),
+                "name": day_name(key, today),
+                # Counter.most_common keeps first-seen order on ties
+                "description": Counter(descriptions[index]).most_common(1)[0][0],
+                "low": _number(lows[index]),
+                "high": _number(highs[index]),
+                "precipitation": round(precipitation[index], 1),
+                "wind_max": _number(wind_max[index]),
+                "humidity": round(humidity_sums[index] / samples[index]),
+                "pop": pops[index],
+                "samples": samples[index],
+            })
+        return summaries
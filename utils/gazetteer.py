@@ -0,0 +1,133 @@
+import gzip
+import json
+
+from utils.trigram_index import TrigramIndex, normalize
+
+# Used when no city list file is configured; without OpenWeatherMap ids these are queried by name
+DEFAULT_PLACES = [
+    {"name": "Lamia", "country": "GR"},
+    {"name": "Athens", "country": "GR"},
+    {"name": "Thessaloniki", "country": "GR"},
+    {"name": "Patras", "country": "GR"},
+    {"name": "Heraklion", "country": "GR"},
+]
+
+
+class Place:
+    """One gazetteer entry"""
+
+    __slots__ = ("id", "name", "country", "state", "lat", "lon")
+
+    def __init__(self, name, country="", id=None, state="", lat=None, lon=None):
+        self.id = id
+        self.name = name
+        self.country = country
+        self.state = state
+        self.lat = lat
+        self.lon = lon
+
+    @property
+    def label(self):
+        """Human readable "Name, CC" """
+        return f"{self.name}, {self.country}" if self.country else self.name
+
+    def query(self):
+        """OpenWeatherMap query parameters for this place, by city id when known"""
+        if self.id is not None:
+            return {"id": self.id}
+        return {"q": self.label}
+
+    def __repr__(self):
+        return f"Place({self.label!r}, id={self.id})"
+
+
+class Gazetteer:
+    """Place names indexed for fast exact and fuzzy lookup
+
+    Load OpenWeatherMap's city list (city.list.json or city.list.json.gz from
+    bulk.openweathermap.org) to resolve any of its ~200k cities to a city id,
+    including misrecognized names like "lemia" for Lamia. When several places
+    share a name, those in preferred_countries win, then the first listed.
+    """
+
+    def __init__(self, places=(), preferred_countries=("GR",)):
+        """Initialize the gazetteer with an iterable of Place objects"""
+        self.preferred_countries = [country.upper() for country in preferred_countries]
+        self.index = TrigramIndex()
+        self._places = []  # string id -> places with that normalized name
+        self._by_name_country = {}
+        for place in places:
+            self.add(place)
+
+    @classmethod
+    def default(cls, **kwargs):
+        """Gazetteer of the built-in places"""
+        return cls((Place(**entry) for entry in DEFAULT_PLACES), **kwargs)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """Load an OpenWeatherMap city list (JSON array, optionally gzipped)"""
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as city_file:
+            cities = json.load(city_file)
+        places = (Place(city["name"], city.get("country", ""), city.get("id"), city.get("state", ""),
+                        city.get("coord", {}).get("lat"), city.get("coord", {}).get("lon"))
+                  for city in cities if city.get("name"))
+        return cls(places, **kwargs)
+
+    def __len__(self):
+        return sum(len(places) for places in self._places)
+
+    def add(self, place):
+        """Add a place to the index"""
+        string_id = self.index.add(place.name)
+        if string_id == len(self._places):
+            self._places.append([])
+        self._places[string_id].append(place)
+        self._by_name_country.setdefault((self.index.strings[string_id], place.country.upper()), place)
+
+    def _pick(self, places):
+        """Choose among places sharing a name"""
+        for country in self.preferred_countries:
+            for place in places:
+                if place.country.upper() == country:
+                    return place
+        return places[0]
+
+    @staticmethod
+    def _split_country(spoken):
+        """Split "City, CC" (as produced by the location resolver) into name and country code"""
+        name, _, country = spoken.rpartition(",")
+        if name and len(country.strip()) == 2:
+            return name, country.strip().upper()
+        return spoken, None
+
+    def resolve(self, spoken, cutoff=0.6, fuzzy=True):
+        """Find the place for a spoken name ("lemia", "Athens, US"), or None if nothing is close
+
+        A country code limits fuzzy matches to places in that country, so
+        "Paris, US" is never taken for a Greek town. With fuzzy=False only exact
+        names are found.
+        """
+        spoken, country = self._split_country(spoken)
+        if country:
+            place = self._by_name_country.get((normalize(spoken), country))
+            if place or not fuzzy:
+                return place
+            string_id = self.index.best(spoken, cutoff=cutoff, accept=lambda candidate: any(
+                place.country.upper() == country for place in self._places[candidate]))
+            if string_id is None:
+                return None
+            return next(place for place in self._places[string_id] if place.country.upper() == country)
+
+        if fuzzy:
+            string_id = self.index.best(spoken, cutoff=cutoff)
+        else:
+            string_id = self.index.exact(spoken)
+        if string_id is None:
+            return None
+        return self._pick(self._places[string_id])
+
+    def is_exact(self, spoken):
+        """Whether a name is in the gazetteer exactly (after normalization)"""
+        return self.index.exact(self._split_country(spoken)[0]) is not None
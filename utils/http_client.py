@@ -0,0 +1,164 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Statuses worth retrying: rate limiting and transient server/gateway errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Methods safe to send again (as urllib3's Retry allows for requests)
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+
+def _retry_after(response):
+    """Seconds a 429/503 response's Retry-After header asks to wait (a number or an HTTP date), else None"""
+    if response.status_code not in (429, 503):
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpClient:
+    """Shared HTTP client used by every skill
+
+    Keeps keep-alive connection pools per host, so repeated commands reuse an open
+    TCP/TLS connection instead of handshaking again. Every request gets a connect
+    and a read timeout, and idempotent requests are retried with exponential
+    backoff on connection errors and transient statuses.
+
+    The session is created on the first request, so building a client costs
+    nothing at startup. With http2=True, httpx (with its h2 extra) is used
+    instead of requests when it is installed.
+    """
+
+    def __init__(self, connect_timeout=3.05, read_timeout=10, retries=2, backoff_factor=0.3,
+                 pool_connections=10, pool_maxsize=10, http2=False):
+        """Initialize the client; no connections are opened until the first request"""
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.http2 = http2
+        self._session = None
+        self._uses_httpx = False
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The underlying requests.Session (or httpx.Client), created on first use"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        """Build a pooled session with retries configured"""
+        if self.http2:
+            try:
+                import httpx
+                import h2  # noqa: F401 - httpx needs it for HTTP/2
+
+                self._uses_httpx = True
+                return httpx.Client(
+                    timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    # With a transport given, httpx ignores the client's http2 and limits, so they go here.
+                    # httpx only retries failed connection attempts; request() retries the rest
+                    transport=httpx.HTTPTransport(
+                        http2=True,
+                        limits=httpx.Limits(max_keepalive_connections=self.pool_maxsize),
+                        retries=self.retries
+                    ),
+                    follow_redirects=True
+                )
+            except ImportError:
+                print("HTTP/2 needs 'httpx[http2]'; falling back to HTTP/1.1 keep-alive.")
+
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=IDEMPOTENT_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                              max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """Send a request; timeout is seconds or a (connect, read) tuple and defaults to the client's"""
+        if timeout is None:
+            timeout = (self.connect_timeout, self.read_timeout)
+        session = self.session
+
+        if self._uses_httpx:
+            return self._request_httpx(session, method, url, timeout, **kwargs)
+        return session.request(method, url, timeout=timeout, **kwargs)
+
+    def _request_httpx(self, session, method, url, timeout, **kwargs):
+        """Send a request with httpx, retrying idempotent ones like the requests session's Retry does
+
+        Read errors and RETRY_STATUSES are retried up to self.retries times with
+        exponential backoff, waiting longer when Retry-After asks to; the last
+        response is returned whatever its status.
+        """
+        import httpx
+
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        retries = self.retries if method.upper() in IDEMPOTENT_METHODS else 0
+        for attempt in range(retries + 1):
+            backoff = self.backoff_factor * (2 ** attempt)
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                # The transport has already retried these
+                raise
+            except httpx.TransportError:
+                if attempt == retries:
+                    raise
+                time.sleep(backoff)
+                continue
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                break
+            wait = _retry_after(response)
+            response.close()
+            time.sleep(backoff if wait is None else max(wait, backoff))
+        # Skills report errors with requests' attribute name
+        response.reason = response.reason_phrase
+        return response
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        """Send a GET request"""
+        return self.request("GET", url, params=params, headers=headers, timeout=timeout)
+
+    def get_json(self, url, params=None, headers=None, timeout=None):
+        """Send a GET request and decode the JSON body"""
+        return self.get(url, params=params, headers=headers, timeout=timeout).json()
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
@@ -0,0 +1,118 @@
+import socket
+import threading
+import time
+
+
+class LocationResolver:
+    """Looks up the current location from the public IP once and keeps it
+
+    start() resolves in the background, so by the time someone asks for the
+    weather "here" the answer is already known and the weather request is the
+    only upstream call. The result is kept for ttl seconds. A watcher thread
+    checks the local network address every check_interval seconds and resolves
+    again in the background when it changes (e.g. after switching networks).
+    """
+
+    def __init__(self, http, ttl=6 * 3600, check_interval=60, url="https://ipinfo.io/json"):
+        """Initialize the resolver with the shared HTTP client"""
+        self.http = http
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.url = url
+        self.info = None
+        self.resolved_at = None
+        self._network = None
+        self._lock = threading.Lock()
+        self._resolved = threading.Event()
+        self._resolving = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def network_fingerprint():
+        """Local address used for outbound traffic; changes when the network does"""
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+                # Connecting a UDP socket picks a route without sending anything
+                probe.connect(("8.8.8.8", 80))
+                return probe.getsockname()[0]
+        except OSError:
+            return None
+
+    @property
+    def is_fresh(self):
+        """Whether a resolved location is cached and within its TTL"""
+        return self.info is not None and time.monotonic() - self.resolved_at <= self.ttl
+
+    def start(self):
+        """Resolve in the background now and keep watching for network changes"""
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="location-resolver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching for network changes"""
+        self._stop.set()
+        self._thread = None
+
+    def get_info(self, timeout=5):
+        """Get the ipinfo record (city, country, loc, timezone...), or None if it can't be resolved
+
+        Waits up to timeout seconds for a background lookup that is under way;
+        without one, looks the location up on the calling thread.
+        """
+        if self.is_fresh:
+            return self.info
+        deadline = time.monotonic() + timeout
+        if self._resolving:
+            self._resolved.wait(timeout)
+            if self.info is not None:
+                return self.info
+        self.resolve()
+        # resolve() returns at once if a background lookup started after the check above
+        if self._resolving:
+            self._resolved.wait(max(0, deadline - time.monotonic()))
+        return self.info
+
+    def get(self, timeout=5):
+        """Get the current location as "City, CC", or None if it can't be resolved"""
+        info = self.get_info(timeout)
+        if info and "city" in info and "country" in info:
+            return f"{info['city']}, {info['country']}"
+        return None
+
+    def invalidate(self):
+        """Forget the cached location; the next get() looks it up again"""
+        with self._lock:
+            self.info = None
+            self.resolved_at = None
+            self._resolved.clear()
+
+    def resolve(self):
+        """Look the location up now; keeps the previous result if the lookup fails"""
+        with self._lock:
+            if self._resolving:
+                return
+            self._resolving = True
+            self._resolved.clear()
+        try:
+            info = self.http.get_json(self.url)
+            with self._lock:
+                self.info = info
+                self.resolved_at = time.monotonic()
+                self._network = self.network_fingerprint()
+        except Exception as e:
+            print(f"Could not detect location: {e}")
+        finally:
+            with self._lock:
+                self._resolving = False
+            self._resolved.set()
+
+    def _watch(self):
+        """Resolve once, then re-resolve whenever the network changes or the TTL runs out"""
+        self.resolve()
+        while not self._stop.wait(self.check_interval):
+            if self.network_fingerprint() != self._network or not self.is_fresh:
+                self.resolve()
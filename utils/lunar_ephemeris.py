@@ -0,0 +1,185 @@
+"""
+Low-precision lunar ephemeris (Jean Meeus, Astronomical Algorithms, 2nd ed.)
+
+Computes the Moon's phase for any instant without a network call: the
+elongation of the Moon from the Sun in ecliptic longitude (0 = new moon,
+90 = first quarter, 180 = full moon, 270 = last quarter) and the illuminated
+fraction of the disc. Accurate to about 0.1 degree / 0.001 in fraction, far
+better than the phase names need.
+
+The phase is geocentric; an observer's location changes it by well under a
+percent, so location only matters for turning instants into local dates.
+
+Functions accept a single timestamp or, when NumPy is installed, an array of
+timestamps, which is evaluated vectorized.
+"""
+
+import math
+from datetime import datetime
+
+try:
+    import numpy
+except ImportError:  # Optional: only needed for the vectorized path
+    numpy = None
+
+SYNODIC_MONTH = 29.530588861  # Mean days from new moon to new moon
+J2000 = 2451545.0
+UNIX_EPOCH_JD = 2440587.5
+
+
+def julian_day(timestamp):
+    """Julian day of a Unix timestamp (seconds, UTC)"""
+    return timestamp / 86400.0 + UNIX_EPOCH_JD
+
+
+def to_timestamp(when):
+    """Unix timestamp of a datetime (naive means UTC) or a number"""
+    if isinstance(when, datetime):
+        if when.tzinfo is None:
+            return (when - datetime(1970, 1, 1)).total_seconds()
+        return when.timestamp()
+    return when
+
+
+def _math_for(value):
+    """The math module for scalars, NumPy for arrays"""
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        return numpy
+    return math
+
+
+def _fundamental_arguments(t):
+    """Mean elongation D, Sun anomaly M, Moon anomaly M' and argument of latitude F in degrees (Meeus 47.2-47.5)"""
+    d = 297.8501921 + 445267.1114034 * t - 0.0018819 * t ** 2 + t ** 3 / 545868 - t ** 4 / 113065000
+    m = 357.5291092 + 35999.0502909 * t - 0.0001536 * t ** 2 + t ** 3 / 24490000
+    m_moon = 134.9633964 + 477198.8675055 * t + 0.0087414 * t ** 2 + t ** 3 / 69699 - t ** 4 / 14712000
+    f = 93.2720950 + 483202.0175233 * t - 0.0036539 * t ** 2 - t ** 3 / 3526000 + t ** 4 / 863310000
+    return d, m, m_moon, f
+
+
+def elongation(timestamp):
+    """Moon-Sun elongation in ecliptic longitude, 0-360 degrees, growing through the month"""
+    t = (julian_day(timestamp) - J2000) / 36525.0
+    lib = _math_for(t)
+    sin, rad = lib.sin, lib.radians
+    d, m, m_moon, f = _fundamental_arguments(t)
+    e = 1 - 0.002516 * t - 0.0000074 * t ** 2  # Earth orbit eccentricity correction
+
+    # Sun's apparent geometric longitude (Meeus 25.2-25.4)
+    sun_mean = 280.46646 + 36000.76983 * t + 0.0003032 * t ** 2
+    sun_center = ((1.914602 - 0.004817 * t - 0.000014 * t ** 2) * sin(rad(m))
+                  + (0.019993 - 0.000101 * t) * sin(rad(2 * m))
+                  + 0.000289 * sin(rad(3 * m)))
+    sun_longitude = sun_mean + sun_center
+
+    # Moon's longitude from its mean longitude and the largest periodic terms of table 47.A
+    moon_mean = 218.3164477 + 481267.88123421 * t - 0.0015786 * t ** 2 + t ** 3 / 538841 - t ** 4 / 65194000
+    moon_longitude = (moon_mean
+                      + 6.288774 * sin(rad(m_moon))
+                      + 1.274027 * sin(rad(2 * d - m_moon))
+                      + 0.658314 * sin(rad(2 * d))
+                      + 0.213618 * sin(rad(2 * m_moon))
+                      - 0.185116 * e * sin(rad(m))
+                      - 0.114332 * sin(rad(2 * f))
+                      + 0.058793 * sin(rad(2 * d - 2 * m_moon))
+                      + 0.057066 * e * sin(rad(2 * d - m - m_moon))
+                      + 0.053322 * sin(rad(2 * d + m_moon))
+                      + 0.045758 * e * sin(rad(2 * d - m))
+                      - 0.040923 * e * sin(rad(m - m_moon))
+                      - 0.034720 * sin(rad(d))
+                      - 0.030383 * e * sin(rad(m + m_moon))
+                      + 0.015327 * sin(rad(2 * d - 2 * f))
+                      - 0.012528 * sin(rad(m_moon + 2 * f))
+                      + 0.010980 * sin(rad(m_moon - 2 * f))
+                      + 0.010675 * sin(rad(4 * d - m_moon))
+                      + 0.010034 * sin(rad(3 * m_moon))
+                      + 0.008548 * sin(rad(4 * d - 2 * m_moon)))
+    return (moon_longitude - sun_longitude) % 360
+
+
+def illumination(timestamp):
+    """Illuminated fraction of the Moon's disc, 0-1 (Meeus 48.1, with the phase angle from 48.4)"""
+    t = (julian_day(timestamp) - J2000) / 36525.0
+    lib = _math_for(t)
+    sin, rad = lib.sin, lib.radians
+    d, m, m_moon, _ = _fundamental_arguments(t)
+    phase_angle = (180 - d % 360
+                   - 6.289 * sin(rad(m_moon))
+                   + 2.100 * sin(rad(m))
+                   - 1.274 * sin(rad(2 * d - m_moon))
+                   - 0.658 * sin(rad(2 * d))
+                   - 0.214 * sin(rad(2 * m_moon))
+                   - 0.110 * sin(rad(d)))
+    return (1 + lib.cos(rad(phase_angle))) / 2
+
+
+def moon_phase(when=None):
+    """Phase of the Moon at a datetime or timestamp (now by default)
+
+    Returns a dict with "angle" (elongation, 0-360 degrees), "illumination"
+    (0-1) and "age" (approximate days since the last new moon).
+    """
+    if when is None:
+        when = datetime.now().timestamp()
+    timestamp = to_timestamp(when)
+    angle = elongation(timestamp)
+    return {
+        "angle": angle,
+        "illumination": illumination(timestamp),
+        "age": angle / 360 * SYNODIC_MONTH,
+    }
+
+
+def moon_phases(timestamps):
+    """Elongations and illuminated fractions for many timestamps at once (vectorized with NumPy)"""
+    if numpy is None:
+        return [elongation(ts) for ts in timestamps], [illumination(ts) for ts in timestamps]
+    timestamps = numpy.asarray(timestamps, dtype=float)
+    return elongation(timestamps), illumination(timestamps)
+
+
+# Principal phases by elongation
+PHASE_EVENTS = {0: "New Moon", 90: "First Quarter", 180: "Full Moon", 270: "Last Quarter"}
+
+
+def mean_phase_time(k):
+    """Timestamp of a mean lunar phase (Meeus 49.1)
+
+    k counts lunations from the new moon of 2000 January 6: integers are new
+    moons, .25 first quarters, .5 full moons and .75 last quarters.
+    """
+    t = k / 1236.85
+    jde = (2451550.09766 + SYNODIC_MONTH * k + 0.00015437 * t ** 2
+           - 0.000000150 * t ** 3 + 0.00000000073 * t ** 4)
+    return (jde - UNIX_EPOCH_JD) * 86400.0
+
+
+def phase_event_time(k, precision=1e-4):
+    """Timestamp of the true phase for lunation k, refined from the mean phase against elongation()
+
+    Converges to the ephemeris' own accuracy (a few minutes) in a handful of
+    steps. Dynamical and universal time (about a minute apart) are not told apart.
+    """
+    target = (k % 1) * 360
+    timestamp = mean_phase_time(k)
+    for _ in range(10):
+        # Signed distance to the target elongation, -180..180 degrees
+        remaining = (target - elongation(timestamp) + 180) % 360 - 180
+        timestamp += remaining / 360 * SYNODIC_MONTH * 86400
+        if abs(remaining) < precision:
+            break
+    return timestamp
+
+
+def lunar_events(start, end):
+    """Every principal phase between two timestamps as sorted (timestamp, angle) pairs"""
+    first = math.floor((start / 86400.0 + UNIX_EPOCH_JD - 2451550.09766) / SYNODIC_MONTH) - 1
+    last = math.ceil((end / 86400.0 + UNIX_EPOCH_JD - 2451550.09766) / SYNODIC_MONTH) + 1
+    events = []
+    for lunation in range(first, last + 1):
+        for quarter, angle in enumerate(PHASE_EVENTS):
+            timestamp = phase_event_time(lunation + quarter / 4)
+            if start <= timestamp < end:
+                events.append((timestamp, angle))
+    events.sort()
+    return events
@@ -0,0 +1,88 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+from utils.lunar_ephemeris import PHASE_EVENTS, lunar_events
+
+
+def _year_start(year):
+    """Timestamp of January 1st of a year, UTC"""
+    return datetime(year, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+class LunarEventTable:
+    """Sorted table of new moons, quarters and full moons answering lookups with binary search
+
+    Events are computed (no network) a few years at a time and kept in one
+    array('d') of timestamps per phase, so "next full moon after t" or "full
+    moons in 2031" is a bisect. The table grows on demand to cover whatever
+    years are asked about.
+    """
+
+    def __init__(self, years_ahead=5):
+        """Initialize an empty table that computes years_ahead years at a time"""
+        self.years_ahead = years_ahead
+        self.first_year = None
+        self.last_year = None
+        self.times = {angle: array("d") for angle in PHASE_EVENTS}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def angle_of(phase):
+        """Elongation of a phase given by name ("full moon") or angle"""
+        if isinstance(phase, str):
+            for angle, name in PHASE_EVENTS.items():
+                if name.lower() == phase.lower():
+                    return angle
+            raise ValueError(f"Unknown lunar phase: {phase}")
+        return phase
+
+    def _cover(self, first_year, last_year):
+        """Make sure every event from first_year through last_year is in the table"""
+        with self._lock:
+            if self.first_year is not None and self.first_year <= first_year and last_year <= self.last_year:
+                return
+            if self.first_year is not None:
+                first_year = min(first_year, self.first_year)
+                last_year = max(last_year, self.last_year)
+            events = lunar_events(_year_start(first_year), _year_start(last_year + 1))
+            times = {angle: array("d") for angle in PHASE_EVENTS}
+            for timestamp, angle in events:
+                times[angle].append(timestamp)
+            self.times = times
+            self.first_year, self.last_year = first_year, last_year
+
+    def _year_of(self, timestamp):
+        return datetime.fromtimestamp(timestamp, timezone.utc).year
+
+    def next_event(self, phase, after=None):
+        """Timestamp of the first event of a phase strictly after a timestamp (now by default)"""
+        if after is None:
+            after = datetime.now(timezone.utc).timestamp()
+        angle = self.angle_of(phase)
+        year = self._year_of(after)
+        self._cover(year, year + self.years_ahead)
+        times = self.times[angle]
+        index = bisect_right(times, after)
+        if index == len(times):
+            # Right at the end of the covered range; cover the next stretch
+            self._cover(year, year + 2 * self.years_ahead)
+            times = self.times[angle]
+            index = bisect_right(times, after)
+        return times[index]
+
+    def next_events(self, after=None):
+        """The next event of every phase after a timestamp, as sorted (timestamp, name) pairs"""
+        return sorted((self.next_event(angle, after), name) for angle, name in PHASE_EVENTS.items())
+
+    def events_between(self, phase, start, end):
+        """Timestamps of every event of a phase in [start, end)"""
+        angle = self.angle_of(phase)
+        self._cover(self._year_of(start), self._year_of(end))
+        times = self.times[angle]
+        return list(times[bisect_left(times, start):bisect_left(times, end)])
+
+    def events_in_year(self, phase, year):
+        """Timestamps of every event of a phase in a calendar year (UTC)"""
+        return self.events_between(phase, _year_start(year), _year_start(year + 1))
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+
+class PeriodMemo:
+    """Thread-safe memo whose entries expire at local-time period boundaries
+
+    Unlike a TTL, an entry stored at 14:59 with an hourly period expires at
+    15:00 local time, so answers that depend on the local hour or date (moon
+    phase, "in 3 days") never straddle a boundary. Periods are aligned to
+    midnight in the memo's time zone: 3600 for hourly, 86400 for daily. An
+    entry may also be given an earlier expiry of its own.
+    """
+
+    def __init__(self, period=3600, tz=None, max_entries=64):
+        """Initialize the memo for periods of `period` seconds in time zone tz (a tzinfo, local by default)"""
+        self.period = period
+        self.tz = tz
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def boundary(self, timestamp):
+        """Timestamp of the first period boundary after a timestamp"""
+        if self.tz is None:
+            moment = datetime.fromtimestamp(timestamp).astimezone()
+        else:
+            moment = datetime.fromtimestamp(timestamp, self.tz)
+        offset = moment.utcoffset().total_seconds()
+        local = timestamp + offset
+        return (local // self.period + 1) * self.period - offset
+
+    def lookup(self, key, now=None):
+        """Get the value for a key if it hasn't expired, else None"""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if now >= entry[0]:
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def store(self, key, value, now=None, expires_at=None):
+        """Store a value until the next boundary (or expires_at, if earlier)"""
+        if now is None:
+            now = time.time()
+        expiry = self.boundary(now)
+        if expires_at is not None:
+            expiry = min(expiry, expires_at)
+        with self._lock:
+            self._entries[key] = (expiry, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                # Drop whatever has expired, then the oldest entries
+                for stale in [k for k, (expires, _) in self._entries.items() if now >= expires]:
+                    del self._entries[stale]
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute, now=None):
+        """Get the memoized value for a key, computing and storing it on a miss"""
+        value = self.lookup(key, now)
+        if value is None:
+            value = compute()
+            self.store(key, value, now)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one entry, or every entry when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
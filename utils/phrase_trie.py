@@ -0,0 +1,76 @@
+import re
+
+from utils.trigram_index import normalize
+
+WORD_RE = re.compile(r"\w+")
+
+
+def phrase_words(text):
+    """Normalized words of a phrase ("Final Fantasy VII" -> ["final", "fantasy", "vii"])"""
+    return WORD_RE.findall(normalize(text))
+
+
+class PhraseTrie:
+    """Word-level trie of phrases (e.g. playlist names) for finding them inside an utterance
+
+    Each node is a dict from the next word to its child; a node that ends a
+    phrase also holds the phrase's value under the key None. Finding phrases
+    walks the trie from each word of the utterance, so it costs the same for
+    ten phrases as for ten thousand.
+    """
+
+    def __init__(self, phrases=None):
+        """Initialize the trie with optional phrases (an iterable of phrases or (phrase, value) pairs)"""
+        self.root = {}
+        self.size = 0
+        for phrase in phrases or ():
+            if isinstance(phrase, tuple):
+                self.add(*phrase)
+            else:
+                self.add(phrase)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, phrase):
+        return self.get(phrase) is not None
+
+    def add(self, phrase, value=None):
+        """Add a phrase with a value (the phrase itself by default); a phrase added twice keeps its first value"""
+        words = phrase_words(phrase)
+        if not words:
+            return
+        node = self.root
+        for word in words:
+            node = node.setdefault(word, {})
+        if None not in node:
+            node[None] = phrase if value is None else value
+            self.size += 1
+
+    def get(self, phrase, default=None):
+        """Value of an exact phrase (compared normalized), or default"""
+        node = self.root
+        for word in phrase_words(phrase):
+            node = node.get(word)
+            if node is None:
+                return default
+        return node.get(None, default)
+
+    def finditer(self, text):
+        """Yield (start, end, value) for each phrase in text, by start, longest first at the same start
+
+        start and end are character offsets into text; phrases only match whole words.
+        """
+        # Plain ASCII (nearly every utterance) only needs lowercasing
+        fold = str.lower if text.isascii() else normalize
+        words = [(word.start(), word.end(), fold(word.group())) for word in WORD_RE.finditer(text)]
+        for i, (start, _, _) in enumerate(words):
+            node = self.root
+            found = []
+            for _, end, word in words[i:]:
+                node = node.get(word)
+                if node is None:
+                    break
+                if None in node:
+                    found.append((start, end, node[None]))
+            yield from reversed(found)
@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """One fetch in progress that concurrent callers for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a time-to-live
+
+    get_or_fetch() implements stale-while-revalidate: an entry past its TTL but
+    still within stale_ttl is returned immediately while a background thread
+    fetches a fresh copy, so only a cold miss waits on the network. With a path,
+    entries are persisted as JSON and survive restarts (keys must then be
+    strings and values JSON-serializable). Concurrent misses for the same key
+    share a single fetch.
+    """
+
+    def __init__(self, ttl=600, max_entries=128, stale_ttl=0, path=None):
+        """Initialize the cache, loading persisted entries from path if given"""
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.path = path
+        self._entries = OrderedDict()  # key -> (stored_at, ttl, value)
+        self._refreshing = set()
+        self._inflight = {}
+        self._lock = threading.RLock()
+        if path:
+            self._load()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def lookup(self, key):
+        """Get (value, age in seconds, is_fresh) for a key that is fresh or still servable stale, else None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, ttl, value = entry
+            age = time.time() - stored_at
+            if age > ttl + self.stale_ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value, age, age <= ttl
+
+    def get(self, key, default=None):
+        """Get a fresh value, or default if the key is missing or stale"""
+        found = self.lookup(key)
+        if found is None or not found[2]:
+            return default
+        return found[0]
+
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entries past the size cap"""
+        with self._lock:
+            self._entries[key] = (time.time(), self.ttl if ttl is None else ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, key):
+        """Drop one entry"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def get_or_fetch(self, key, fetch, ttl=None):
+        """Get a value, calling fetch() on a miss and refreshing stale values in the background
+
+        Exceptions from fetch() propagate on a miss; a failed background refresh
+        keeps serving the stale value.
+        """
+        found = self.lookup(key)
+        if found is not None:
+            value, _, is_fresh = found
+            if not is_fresh:
+                self.refresh(key, fetch, ttl)
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            # Someone else is already fetching this key (e.g. a prefetch)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fetch()
+            self.set(key, flight.value, ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def refresh(self, key, fetch, ttl=None):
+        """Fetch a new value for key on a background thread (at most one refresh per key at a time)"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.set(key, fetch(), ttl)
+            except Exception as e:
+                print(f"Background refresh failed for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name="cache-refresh", daemon=True).start()
+
+    def _load(self):
+        """Read persisted entries, skipping any that are too old to serve"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as cache_file:
+                stored = json.load(cache_file)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(stored, list):
+            print(f"Ignoring cache file {self.path}: unexpected format")
+            return
+        now = time.time()
+        for entry in stored:
+            try:
+                key, stored_at, ttl, value = entry
+                if now - stored_at <= ttl + self.stale_ttl:
+                    self._entries[key] = (stored_at, ttl, value)
+            except (TypeError, ValueError):
+                # Not a [key, stored_at, ttl, value] entry (e.g. from an older version); skip it
+                continue
+
+    def _save(self):
+        """Write every entry to disk (atomically) when persistence is enabled"""
+        if not self.path:
+            return
+        stored = [[key, stored_at, ttl, value] for key, (stored_at, ttl, value) in self._entries.items()]
+        temp_path = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as cache_file:
+                json.dump(stored, cache_file)
+            os.replace(temp_path, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Could not persist cache to {self.path}: {e}")
@@ -0,0 +1,34 @@
+class PcmRingBuffer:
+    """Fixed-size ring of the most recent PCM frames, preallocated once"""
+
+    def __init__(self, frame_bytes, capacity):
+        """Initialize a ring holding `capacity` frames of `frame_bytes` bytes each"""
+        self.frame_bytes = frame_bytes
+        self.capacity = capacity
+        self.buffer = bytearray(frame_bytes * capacity)
+        self._view = memoryview(self.buffer)
+        self.total_frames = 0  # Frames ever written; doubles as an absolute position
+
+    def write(self, frame):
+        """Copy one frame into the oldest slot"""
+        start = (self.total_frames % self.capacity) * self.frame_bytes
+        length = min(len(frame), self.frame_bytes)
+        self._view[start:start + length] = frame[:length]
+        if length < self.frame_bytes:
+            # Pad a short read with silence so every slot stays one frame long
+            self._view[start + length:start + self.frame_bytes] = bytes(self.frame_bytes - length)
+        self.total_frames += 1
+
+    def read_since(self, position):
+        """Get the frames written at or after an absolute position, oldest first"""
+        # Frames that have already been overwritten are gone
+        first = max(position, self.total_frames - self.capacity, 0)
+        chunks = []
+        for index in range(first, self.total_frames):
+            start = (index % self.capacity) * self.frame_bytes
+            chunks.append(self._view[start:start + self.frame_bytes])
+        return b"".join(chunks)
+
+    def clear(self):
+        """Forget all buffered frames without releasing the storage"""
+        self.total_frames = 0
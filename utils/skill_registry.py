@@ -0,0 +1,47 @@
+import importlib
+import threading
+
+
+class SkillRegistry:
+    """Imports and builds skills on first use instead of at startup
+
+    Each skill is registered with the module and attribute that provide it and a
+    factory that turns that attribute into the skill object. Nothing is imported
+    until get() is first called for the skill, so heavy dependencies (spotipy,
+    wikipedia, pytz, ...) are only loaded when one of their intents is used.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry"""
+        self._specs = {}
+        self._skills = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, module, attribute, factory=None):
+        """Register a skill; factory receives the imported attribute (defaults to returning it as is)"""
+        self._specs[name] = (module, attribute, factory)
+        self._skills.pop(name, None)
+
+    def get(self, name):
+        """Get a skill, importing and building it on first use"""
+        skill = self._skills.get(name)
+        if skill is not None:
+            return skill
+
+        with self._lock:
+            # Another thread may have built it while we waited
+            skill = self._skills.get(name)
+            if skill is None:
+                module, attribute, factory = self._specs[name]
+                provider = getattr(importlib.import_module(module), attribute)
+                skill = factory(provider) if factory else provider
+                self._skills[name] = skill
+        return skill
+
+    def is_loaded(self, name):
+        """Whether a skill has been built yet"""
+        return name in self._skills
+
+    def loaded(self):
+        """Names of the skills built so far"""
+        return list(self._skills)
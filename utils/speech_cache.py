@@ -0,0 +1,131 @@
+import hashlib
+import os
+import threading
+import wave
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "voice_assistant", "speech")
+
+
+class RenderedSpeech:
+    """PCM audio of one rendered utterance together with its WAV format"""
+
+    def __init__(self, frames, channels, sample_width, sample_rate):
+        self.frames = frames
+        self.channels = channels
+        self.sample_width = sample_width
+        self.sample_rate = sample_rate
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a WAV file written by the TTS engine"""
+        with wave.open(path, "rb") as wav:
+            return cls(wav.readframes(wav.getnframes()), wav.getnchannels(),
+                       wav.getsampwidth(), wav.getframerate())
+
+    @property
+    def duration(self):
+        """Length of the audio in seconds"""
+        return len(self.frames) / (self.channels * self.sample_width * self.sample_rate)
+
+
+class SpeechCache:
+    """Content-addressed cache of rendered speech, kept in memory and on disk
+
+    Entries are keyed by a hash of the text, voice and rate, so changing the voice
+    settings never plays stale audio. Both tiers are LRU: memory holds a fixed
+    number of utterances, the disk directory a fixed number of bytes (a file's
+    modification time records when it was last used).
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_memory_items=32, max_disk_bytes=50 * 1024 * 1024):
+        """Initialize the cache, creating its directory if needed"""
+        self.directory = directory
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(text, voice, rate):
+        """Cache key for an utterance spoken with the given voice and rate"""
+        return hashlib.sha1(f"{text}\x00{voice}\x00{rate}".encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        """Disk location of an entry"""
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def get(self, key):
+        """Get the rendered audio for a key, or None on a miss"""
+        with self._lock:
+            speech = self._memory.get(key)
+            if speech is not None:
+                self._memory.move_to_end(key)
+                return speech
+
+        path = self.path_for(key)
+        try:
+            speech = RenderedSpeech.from_file(path)
+            os.utime(path)
+        except (OSError, EOFError, wave.Error):
+            return None
+        self._remember(key, speech)
+        return speech
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._memory:
+                return True
+        return os.path.exists(self.path_for(key))
+
+    def store(self, key, rendered_path):
+        """Adopt a file rendered by the engine; False if it is not a usable WAV file"""
+        try:
+            speech = RenderedSpeech.from_file(rendered_path)
+        except (OSError, EOFError, wave.Error):
+            speech = None
+        if speech is None or not speech.frames:
+            # Some engines write another container (e.g. AIFF) or nothing at all
+            self._remove(rendered_path)
+            return False
+
+        os.replace(rendered_path, self.path_for(key))
+        self._remember(key, speech)
+        self._trim_disk()
+        return True
+
+    def _remember(self, key, speech):
+        """Put an entry in the memory tier, evicting the least recently used"""
+        with self._lock:
+            self._memory[key] = speech
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    def _trim_disk(self):
+        """Delete the least recently used files until the directory fits its size cap"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".wav"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,279 @@
+import collections
+import os
+import queue
+import threading
+import time
+
+_STOP = object()
+_WAKE = object()
+
+# Seconds of audio written per chunk when playing cached speech; cancel() is checked between chunks
+PLAYBACK_CHUNK_SECONDS = 0.05
+
+
+class SpeechWorker:
+    """Speaks queued utterances on a dedicated thread so handlers never wait for playback
+
+    The TTS engine is created and driven entirely on the worker thread (pyttsx3
+    engines are not safe to share across threads). say() returns as soon as the
+    text is queued; the queue is bounded, so a runaway producer blocks instead of
+    piling up minutes of speech.
+
+    With a SpeechCache, utterances that were rendered before are played straight
+    from the cache instead of being synthesized again. Prompts passed to
+    prewarm(), and short utterances spoken live at least render_after times
+    (so one-off text like temperatures and track names is left out), are
+    rendered into the cache whenever the worker has nothing to say.
+    """
+
+    def __init__(self, engine_factory, max_queued=20, cache=None, max_cached_chars=200, render_after=2,
+                 max_counted=256):
+        """Initialize the worker with a callable that builds the TTS engine"""
+        self.engine_factory = engine_factory
+        self.engine = None
+        self.cache = cache
+        self.max_cached_chars = max_cached_chars
+        self.render_after = render_after
+        self.max_counted = max_counted
+        self._spoken = collections.OrderedDict()  # cache key -> times synthesized live, most recent last
+        self._voice = None
+        self._to_render = collections.deque()
+        self._rendering = False
+        self._pa = None
+        self._output = None
+        self._output_format = None
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._pending = 0
+        self._drained = threading.Condition()
+        self._cancel = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+        self._speaking = None  # (text, time.monotonic() it finished or None while it plays)
+
+    def start(self, wait=True):
+        """Start the worker thread; with wait, block until the engine is ready and report whether it loaded"""
+        if not self._thread:
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name="speech-worker", daemon=True)
+            self._thread.start()
+        if not wait:
+            return True
+        self._ready.wait()
+        return self.engine is not None
+
+    @property
+    def is_busy(self):
+        """Whether anything is being spoken or waiting to be spoken"""
+        with self._drained:
+            return self._pending > 0
+
+    def recently_spoken(self, within=1.0):
+        """Text being spoken now, or finished less than within seconds ago, else None
+
+        Lets a wake word detector listening during playback tell the assistant's
+        own voice (e.g. a track name that contains the keyword) from the user.
+        """
+        speaking = self._speaking
+        if speaking is None:
+            return None
+        text, finished_at = speaking
+        if finished_at is None or time.monotonic() - finished_at <= within:
+            return text
+        return None
+
+    def say(self, text):
+        """Queue an utterance and return immediately"""
+        with self._drained:
+            self._pending += 1
+        self._queue.put(text)
+
+    def prewarm(self, texts):
+        """Render utterances into the cache in the background, while the worker is idle"""
+        if not self.cache:
+            return
+        self._to_render.extend(texts)
+        try:
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            # The worker is busy and will get to the renders once it is idle
+            pass
+
+    def flush(self):
+        """Drop every utterance that has not started playing yet"""
+        dropped = 0
+        try:
+            while True:
+                item = self._queue.get_nowait()
+                if item is _STOP:
+                    # Keep a pending shutdown request
+                    self._queue.put_nowait(item)
+                    break
+                if item is not _WAKE:
+                    dropped += 1
+        except queue.Empty:
+            pass
+        self._finished(dropped)
+
+    def cancel(self):
+        """Stop the current utterance and drop everything queued after it"""
+        self.flush()
+        self._cancel.set()
+
+    def wait_until_drained(self, timeout=None):
+        """Block until everything queued so far has been spoken; False on timeout"""
+        with self._drained:
+            return self._drained.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def stop(self, drain=True, timeout=None):
+        """Shut the worker down, by default after finishing what is queued"""
+        if not self._thread:
+            return
+        if drain:
+            self.wait_until_drained(timeout)
+        else:
+            self.cancel()
+        self._queue.put(_STOP)
+        self._thread.join(timeout=2)
+        self._thread = None
+
+    def _finished(self, count=1):
+        """Mark utterances as done and wake anyone waiting for the queue to drain"""
+        if count <= 0:
+            return
+        with self._drained:
+            self._pending = max(0, self._pending - count)
+            self._drained.notify_all()
+
+    def _on_word(self, name, location, length):
+        """Engine callback between words; the only safe point to interrupt playback"""
+        if self._cancel.is_set() and not self._rendering:
+            self.engine.stop()
+
+    def _cache_key(self, text):
+        """Cache key for text in the engine's current voice and rate"""
+        voice, rate = self._voice
+        return self.cache.key(text, voice, rate)
+
+    def _speak(self, text):
+        """Play text from the cache, or synthesize it and queue it for rendering"""
+        if self.cache and self._voice:
+            speech = self.cache.get(self._cache_key(text))
+            if speech is not None and self._play(speech):
+                return
+        if self.engine:
+            self.engine.say(text)
+            self.engine.runAndWait()
+            if self.cache and self._voice and len(text) <= self.max_cached_chars and self._repeated(text):
+                self._to_render.append(text)
+
+    def _repeated(self, text):
+        """Count a live utterance; whether it has now been spoken often enough to be worth rendering"""
+        key = self._cache_key(text)
+        count = self._spoken.pop(key, 0) + 1
+        self._spoken[key] = count
+        while len(self._spoken) > self.max_counted:
+            self._spoken.popitem(last=False)
+        return count == self.render_after
+
+    def _render(self, text):
+        """Render text into the cache with the engine instead of speaking it"""
+        if not self.engine:
+            return
+        key = self._cache_key(text)
+        if key in self.cache:
+            return
+        part_path = self.cache.path_for(key) + ".part"
+        self._rendering = True
+        try:
+            self.engine.save_to_file(text, part_path)
+            self.engine.runAndWait()
+            if os.path.exists(part_path):
+                self.cache.store(key, part_path)
+        except Exception as e:
+            print(f"Error rendering speech: {e}")
+        finally:
+            self._rendering = False
+
+    def _play(self, speech):
+        """Play rendered speech on the default output device; False if that isn't possible"""
+        try:
+            stream = self._output_stream(speech)
+        except Exception as e:
+            print(f"Error opening audio output: {e}")
+            return False
+
+        frame_bytes = speech.channels * speech.sample_width
+        chunk = max(1, int(speech.sample_rate * PLAYBACK_CHUNK_SECONDS)) * frame_bytes
+        frames = memoryview(speech.frames)
+        for start in range(0, len(frames), chunk):
+            if self._cancel.is_set():
+                break
+            stream.write(bytes(frames[start:start + chunk]))
+        return True
+
+    def _output_stream(self, speech):
+        """Get an output stream for the speech's format, reusing the last one when it matches"""
+        audio_format = (speech.channels, speech.sample_width, speech.sample_rate)
+        if self._output and self._output_format == audio_format:
+            return self._output
+
+        import pyaudio
+
+        self._close_output()
+        if not self._pa:
+            self._pa = pyaudio.PyAudio()
+        self._output = self._pa.open(
+            format=self._pa.get_format_from_width(speech.sample_width),
+            channels=speech.channels,
+            rate=speech.sample_rate,
+            output=True
+        )
+        self._output_format = audio_format
+        return self._output
+
+    def _close_output(self):
+        """Release the output stream (and PyAudio once the worker stops)"""
+        if self._output:
+            self._output.close()
+            self._output = None
+            self._output_format = None
+
+    def _run(self):
+        """Worker loop: speak one utterance at a time"""
+        try:
+            self.engine = self.engine_factory()
+            self.engine.connect('started-word', self._on_word)
+            self._voice = (self.engine.getProperty('voice'), self.engine.getProperty('rate'))
+        except Exception as e:
+            print(f"Error initializing text-to-speech: {e}")
+            self.engine = None
+        finally:
+            self._ready.set()
+
+        while True:
+            try:
+                # Only block when there is nothing left to render
+                text = self._queue.get(block=not self._to_render)
+            except queue.Empty:
+                self._render(self._to_render.popleft())
+                continue
+            if text is _STOP:
+                break
+            if text is _WAKE:
+                continue
+            self._cancel.clear()
+            self._speaking = (text, None)
+            try:
+                self._speak(text)
+            except Exception as e:
+                print(f"Error in speech worker: {e}")
+            finally:
+                self._speaking = (text, time.monotonic())
+                self._finished()
+
+        self._close_output()
+        if self._pa:
+            self._pa.terminate()
+            self._pa = None
+        if self.engine:
+            self.engine.stop()
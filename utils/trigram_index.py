@@ -0,0 +1,116 @@
+import heapq
+import unicodedata
+from array import array
+from collections import Counter
+from difflib import SequenceMatcher
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse whitespace ("  Iráklion " -> "iraklion")"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.lower().split())
+
+
+def trigrams(text):
+    """Set of character trigrams of normalized text, padded so word edges count"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Fuzzy string lookup over a large set of names using an inverted trigram index
+
+    Each distinct normalized string gets an integer id and every trigram maps to
+    a compact array of the ids containing it. A query only counts shared trigrams
+    over the posting lists of its own trigrams (the counting runs in C through
+    Counter.update), then scores the candidates by Dice similarity, so lookups
+    stay in the millisecond range over hundreds of thousands of names.
+
+    Trigrams are harsh on short words ("lemia" and "lamia" share only half of
+    theirs), so best() uses them to shortlist candidates and ranks the shortlist
+    with difflib's ratio, which is what the cutoff applies to.
+    """
+
+    def __init__(self):
+        """Initialize an empty index"""
+        self.strings = []
+        self._ids = {}
+        self._sizes = array("H")
+        self._postings = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def add(self, text):
+        """Index a string (normalized) and return its id; adding it again returns the same id"""
+        text = normalize(text)
+        string_id = self._ids.get(text)
+        if string_id is not None:
+            return string_id
+
+        string_id = len(self.strings)
+        self.strings.append(text)
+        self._ids[text] = string_id
+        grams = trigrams(text)
+        self._sizes.append(min(len(grams), 0xFFFF))
+        postings = self._postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array("I")
+            posting.append(string_id)
+        return string_id
+
+    def exact(self, text):
+        """Id of a string that matches exactly after normalization, or None"""
+        return self._ids.get(normalize(text))
+
+    def search(self, text, limit=5, cutoff=0.5):
+        """Best fuzzy matches as (score, string id) pairs, best first, with Dice score >= cutoff"""
+        text = normalize(text)
+        grams = trigrams(text)
+        if not grams:
+            return []
+
+        shared = Counter()
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                shared.update(posting)
+
+        # A candidate sharing fewer trigrams than this can't reach the cutoff
+        query_size = len(grams)
+        minimum = cutoff * query_size / 2
+        sizes = self._sizes
+        scored = []
+        for string_id, count in shared.items():
+            if count < minimum:
+                continue
+            score = 2 * count / (query_size + sizes[string_id])
+            if score >= cutoff:
+                scored.append((score, -string_id))
+        # Ties go to the string indexed first
+        return [(score, -negative_id) for score, negative_id in heapq.nlargest(limit, scored)]
+
+    def best(self, text, cutoff=0.6, shortlist=20, min_overlap=0.3, accept=None):
+        """Id of the exact match, else of the closest fuzzy match with a ratio >= cutoff, else None
+
+        accept, if given, is a test of string ids that a match must also pass.
+        """
+        string_id = self.exact(text)
+        if string_id is not None and (accept is None or accept(string_id)):
+            return string_id
+
+        text = normalize(text)
+        # SequenceMatcher caches what it learns about seq2, so the query goes there
+        matcher = SequenceMatcher(b=text, autojunk=False)
+        best_id, best_ratio = None, cutoff
+        for _, candidate_id in self.search(text, limit=shortlist, cutoff=min_overlap):
+            if accept is not None and not accept(candidate_id):
+                continue
+            matcher.set_seq1(self.strings[candidate_id])
+            ratio = matcher.ratio()
+            if ratio > best_ratio or (ratio == best_ratio and best_id is None):
+                best_id, best_ratio = candidate_id, ratio
+        return best_id
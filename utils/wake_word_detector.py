@@ -1,17 +1,35 @@
 import pvporcupine
-import pyaudio
-import struct
+import queue
+from array import array
 from colorama import init, Fore, Style
+from utils.ring_buffer import PcmRingBuffer
+from utils.audio_sources import MicrophoneSource
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class WakeWordDetector:
-    def __init__(self, access_key, wake_words=None, sensitivity=0.5):
-        """Initialize the wake word detector"""
+    def __init__(self, access_key, wake_words=None, sensitivity=0.5, audio_capture=None, preroll_seconds=3,
+                 frames_per_read=1, use_numpy=False, audio_source=None):
+        """Initialize the wake word detector, reading from a shared AudioCaptureService or its own audio source"""
         self.access_key = access_key
         self.wake_words = wake_words or ["hey google", "jarvis", "computer"]
         self.sensitivity = sensitivity
+        self.audio_capture = audio_capture
+        self.audio_source = audio_source
+        self.preroll_seconds = preroll_seconds
+        # Reading several frames per call means fewer wake-ups while idle
+        self.frames_per_read = max(1, frames_per_read)
+        self.use_numpy = use_numpy and numpy is not None
+        self._frame = None
+        self._frame_bytes = None
+        self.frames = None
+        self.ring_buffer = None
+        self.keyword_position = None
         self.porcupine = None
         self.audio_stream = None
-        self.pa = None
     
     def start(self):
         """Start the wake word detection"""
@@ -23,15 +41,18 @@ class WakeWordDetector:
                 keywords=self.wake_words,
                 sensitivities=[self.sensitivity] * len(self.wake_words)
             )
-            # Initialize PyAudio
-            self.pa = pyaudio.PyAudio()
-            self.audio_stream = self.pa.open(
-                rate=self.porcupine.sample_rate,
-                channels=1,
-                format=pyaudio.paInt16,
-                input=True,
-                frames_per_buffer=self.porcupine.frame_length
-            )
+            if self.audio_capture:
+                # Share the capture service's stream instead of opening our own
+                if (self.audio_capture.sample_rate != self.porcupine.sample_rate
+                        or self.audio_capture.frame_length != self.porcupine.frame_length):
+                    raise ValueError("Audio capture format does not match the wake word engine")
+                self.frames = self.audio_capture.subscribe()
+            else:
+                # Open our own source, the microphone unless told otherwise
+                source = self.audio_source or MicrophoneSource(self.porcupine.sample_rate, self.porcupine.frame_length)
+                self.audio_stream = source
+                source.open()
+            self._prepare_buffers()
             print(f"{Style.BRIGHT}{Fore.LIGHTGREEN_EX}Wake word detection has started.{Style.RESET_ALL} {Style.DIM}{Fore.LIGHTRED_EX}Listening for{Style.RESET_ALL} {Fore.RED}{self.wake_words} {Style.RESET_ALL}")
             return True
         except Exception as e:
@@ -39,34 +60,107 @@ class WakeWordDetector:
             self.cleanup()
             return False
     
+    def _prepare_buffers(self):
+        """Allocate the frame buffers once the engine's frame format is known"""
+        frame_length = self.porcupine.frame_length
+        # Recent audio, so a command spoken right after the keyword isn't lost
+        self.ring_buffer = PcmRingBuffer(
+            frame_bytes=frame_length * 2,
+            capacity=max(1, int(self.preroll_seconds * self.porcupine.sample_rate / frame_length))
+        )
+        # One reusable int16 buffer that every frame is copied into
+        self._frame = array('h', bytes(frame_length * 2))
+        self._frame_bytes = memoryview(self._frame).cast('B')
+    
+    def _read_frames(self):
+        """Read up to frames_per_read raw frames, returned as buffers of one frame each"""
+        if self.frames:
+            try:
+                frames = [self.frames.get(timeout=0.5)]
+            except queue.Empty:
+                return []
+            while len(frames) < self.frames_per_read:
+                try:
+                    frames.append(self.frames.get_nowait())
+                except queue.Empty:
+                    break
+            return frames
+        
+        frame_length = self.porcupine.frame_length
+        data = memoryview(self.audio_stream.read(frame_length * self.frames_per_read))
+        frame_bytes = frame_length * 2
+        return [data[start:start + frame_bytes] for start in range(0, len(data), frame_bytes)]
+    
+    def _as_pcm(self, frame):
+        """View a raw frame as int16 samples without building a tuple of ints"""
+        if self.use_numpy:
+            return numpy.frombuffer(frame, dtype=numpy.int16)
+        self._frame_bytes[:] = frame
+        return self._frame
+    
     def listen(self):
         """Listen for wake words"""
         try:
             #Read audio from microphone
-            pcm = self.audio_stream.read(self.porcupine.frame_length)
-            #Convert audio to required format
-            pcm = struct.unpack_from("h" * self.porcupine.frame_length, pcm)
-            # Process audio frame
-            keyword_index = self.porcupine.process(pcm)
-            
-            #If wake words detected
-            if keyword_index >= 0:
-                detected_keyword = self.wake_words[keyword_index]
-                return detected_keyword
+            frames = self._read_frames()
+            for position, frame in enumerate(frames):
+                self.ring_buffer.write(frame)
+                # Process audio frame
+                keyword_index = self.porcupine.process(self._as_pcm(frame))
+                
+                #If wake words detected
+                if keyword_index >= 0:
+                    detected_keyword = self.wake_words[keyword_index]
+                    # Everything from the next frame on belongs to the command
+                    self.keyword_position = self.ring_buffer.total_frames
+                    for remaining in frames[position + 1:]:
+                        self.ring_buffer.write(remaining)
+                    return detected_keyword
             return None
         except Exception as e:
             print(f"Error in listening for wake words: {e}")
             return None
     
+    def audio_since_keyword(self):
+        """Get the PCM captured since the last wake word, including frames still waiting to be read"""
+        if self.keyword_position is None:
+            return b""
+        
+        if self.frames:
+            try:
+                while True:
+                    self.ring_buffer.write(self.frames.get_nowait())
+            except queue.Empty:
+                pass
+        elif self.audio_stream:
+            frame_length = self.porcupine.frame_length
+            for _ in range(self.audio_stream.get_read_available() // frame_length):
+                self.ring_buffer.write(self.audio_stream.read(frame_length, exception_on_overflow=False))
+        
+        audio = self.ring_buffer.read_since(self.keyword_position)
+        self.keyword_position = None
+        return audio
+    
+    def discard_pending(self):
+        """Drop frames that queued up on the shared stream while we were not listening"""
+        if not self.frames:
+            return
+        try:
+            while True:
+                self.frames.get_nowait()
+        except queue.Empty:
+            pass
+    
     def cleanup(self):
         """Cleanup resources"""
+        if self.frames:
+            self.audio_capture.unsubscribe(self.frames)
+            self.frames = None
+            
         if self.audio_stream:
             self.audio_stream.close()
             self.audio_stream = None
             
-        if self.pa:
-            self.pa.terminate()
-            self.pa = None
         if self.porcupine:
             self.porcupine.delete()
             self.porcupine = None
\ No newline at end of file
@@ -2,8 +2,7 @@ import os
 import sys
 import re
 import time
-import speech_recognition as sr
-import pyttsx3
+import threading
 from colorama import init, Fore, Style
 from dotenv import load_dotenv
 
@@ -16,22 +15,53 @@ astronomy_api_secret = os.getenv("ASTRONOMY_API_SECRET")
 weather_api_key = os.getenv("WEATHER_API_KEY")
 spotify_client_id = os.getenv("SPOTIFY_CLIENT_ID")
 spotify_client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
+spotify_playlist_aliases = os.getenv("SPOTIFY_PLAYLIST_ALIASES")
 
 #Access Wake Word
 access_key = os.getenv("WAKE_WORD_ACCESS_KEY")
 
-# Import project modules
-from utils.wake_word_detector import WakeWordDetector
-from skills.spotify_skill import SpotifySkill
-from skills.weather_skill import WeatherSkill
-from skills.web_skill import WebSkill
-from skills.moonphase_skill import MoonPhaseSkill
-from utils.common import TimeUtility, SystemUtility
+# Import project modules (skills, speech recognition, TTS and the wake word
+# engine are imported on first use to keep startup fast)
+from utils.command_dispatcher import CommandDispatcher, PhraseCommand
+from utils.phrase_trie import PhraseTrie
+from utils.speech_worker import SpeechWorker
+from utils.speech_cache import SpeechCache
+from utils.skill_registry import SkillRegistry
+from utils.http_client import HttpClient
+from utils.location_resolver import LocationResolver
+# Only the playlist alias table (no spotipy), which the playlist intent needs up front
+from skills.spotify_playlists import DEFAULT_CATALOG_PATH, load_playlist_aliases
 
 init(autoreset=False)
 
+
+def _skill(name):
+    """Property that builds a skill from the registry the first time it is used"""
+    return property(lambda self: self.skills.get(name))
+
+
 class VoiceAssistant:
     """Main voice assistant class that coordinates all functionality"""
+    # Prompts spoken word for word every session, rendered into the speech cache at startup
+    FIXED_PROMPTS = [
+        "Rub the oil lamp to wake me up.",
+        "Going back to sleep mode.",
+        "Goodbye!",
+        "Getting the current moon phase...",
+        "Getting the next full moon date...",
+        "Starting the speed test, this may take a moment...",
+        "Here are some things I can help you with.",
+        "Hello. I'm your text assistant. How can I help you today?",
+        "Sorry, my speech service is down",
+    ]
+    
+    weather_skill = _skill("weather")
+    spotify_skill = _skill("spotify")
+    moon_phase_skill = _skill("moon_phase")
+    web_skill = _skill("web")
+    time_utility = _skill("time")
+    system_utility = _skill("system")
+    
     def __init__(self, config=None):
         """Initialize the voice assistant with configuration"""
         # Default config if none provided
@@ -52,34 +82,34 @@ class VoiceAssistant:
             "spotify": {
                 "client_id": spotify_client_id,
                 "client_secret": spotify_client_secret,
-                "redirect_uri": "http://localhost:8888/callback"
+                "redirect_uri": "http://localhost:8888/callback",
+                # JSON alias table of the user's playlists; the .env playlists when unset
+                "playlist_aliases": spotify_playlist_aliases
             }
         }
         
-        self.moon_phase_skill = MoonPhaseSkill(api_key=self.config["api_keys"]["astronomy"])
-        
-        # Initialize speech recognition
-        self.recognizer = sr.Recognizer()
-        self.recognizer.energy_threshold = 200  # Adjust for microphone sensitivity
-        self.recognizer.dynamic_energy_threshold = True
-        
-        # Initialize text-to-speech engine
-        self.engine = pyttsx3.init()
-        
-        # Configure voice
-        voices = self.engine.getProperty('voices')
-        # Try to find a female voice (often provides better clarity)
-        for voice in voices:
-            if "female" in voice.name.lower():
-                self.engine.setProperty('voice', voice.id)
-                break
+        # Speech recognizer, created on first use
+        self._recognizer = None
         
-        # Set speech rate
-        self.engine.setProperty('rate', 180)  # Speed of speech (words per minute)
+        # Initialize text-to-speech on its own worker thread, replaying
+        # previously rendered prompts from the speech cache
+        try:
+            speech_cache = SpeechCache()
+        except OSError as e:
+            print(f"Speech cache unavailable: {e}")
+            speech_cache = None
+        self.speech = SpeechWorker(self._create_engine, cache=speech_cache)
+        # Don't wait for the engine; anything said before it is ready is queued
+        self.speech.start(wait=False)
+        self.speech.prewarm(self.FIXED_PROMPTS)
+        
+        # Shared microphone stream, opened in voice mode
+        self.audio_capture = None
         
         # State variables
         self.is_listening = False
         self.is_active = True
+        self.last_wake_time = None
         
         # Initialize skills
         self.init_skills()
@@ -88,30 +118,77 @@ class VoiceAssistant:
         self.init_commands()
     
     def init_skills(self):
-        """Initialize all skill modules"""
-        # Weather skill
-        self.weather_skill = WeatherSkill(self.config["api_keys"]["weather"])
+        """Register all skill modules; each is imported and built the first time one of its intents runs"""
+        self.skills = SkillRegistry()
         
-        # Spotify skill
-        self.spotify_skill = SpotifySkill(
-            self.config["spotify"]["client_id"],
-            self.config["spotify"]["client_secret"],
-            self.config["spotify"]["redirect_uri"]
-        )
+        # One pooled HTTP client shared by every skill (connections open on first use)
+        self.http = HttpClient(**self.config.get("http", {}))
+        
+        # Look up the current location in the background so "weather here" needs no extra round trip
+        self.location = LocationResolver(self.http)
+        self.location.start()
+        
+        # Weather skill
+        self.skills.register("weather", "skills.weather_skill", "WeatherSkill",
+                             lambda cls: cls(self.config["api_keys"]["weather"], http=self.http,
+                                             location_resolver=self.location,
+                                             gazetteer=self.config.get("gazetteer"),
+                                             **self.config.get("weather_cache", {})))
+        
+        # Spotify skill; the playlist aliases also drive the playlist intent, so they are loaded now
+        self.playlist_aliases = load_playlist_aliases(self.config["spotify"].get("playlist_aliases"))
+        self.skills.register("spotify", "skills.spotify_skill", "SpotifySkill",
+                             lambda cls: cls(
+                                 self.config["spotify"]["client_id"],
+                                 self.config["spotify"]["client_secret"],
+                                 self.config["spotify"]["redirect_uri"],
+                                 http=self.http,
+                                 playlist_catalog_path=self.config["spotify"].get("playlist_catalog_path",
+                                                                                  DEFAULT_CATALOG_PATH),
+                                 playlist_aliases=self.playlist_aliases,
+                                 # The handlers only speak the command's message, so don't wait for it
+                                 confirm_in_background=self.config["spotify"].get("confirm_in_background", True)
+                             ))
+        
+        # Moon phase skill
+        self.skills.register("moon_phase", "skills.moonphase_skill", "MoonPhaseSkill",
+                             lambda cls: cls(api_key=self.config["api_keys"]["astronomy"], http=self.http,
+                                             **self.config.get("moon_phase", {})))
         
         # Web skill (static methods, no initialization needed)
-        self.web_skill = WebSkill
+        self.skills.register("web", "skills.web_skill", "WebSkill")
         
         # Time utility (static methods, no initialization needed)
-        self.time_utility = TimeUtility
+        self.skills.register("time", "utils.common", "TimeUtility")
         
         # System utility (static methods, no initialization needed)
-        self.system_utility = SystemUtility
+        self.skills.register("system", "utils.common", "SystemUtility")
+    
+    @property
+    def recognizer(self):
+        """Speech recognizer, created on first use"""
+        if self._recognizer is None:
+            import speech_recognition as sr
+            
+            self._recognizer = sr.Recognizer()
+            self._recognizer.energy_threshold = 200  # Adjust for microphone sensitivity
+            self._recognizer.dynamic_energy_threshold = True
+        return self._recognizer
     
     def init_commands(self):
         """Initialize command mapping - maps user phrases to functions"""
+        # Playlist names come from the user's alias table and are found with a trie, not a regex
+        # alternation. Other library playlists need the word "playlist", so a song that shares a
+        # playlist's name is still played as a song
+        self.playlist_intent = PhraseCommand(
+            r"play (?:the )?",
+            PhraseTrie((alias, aliases[0]) for _, aliases in self.playlist_aliases for alias in aliases),
+            r"(?: on| in)? spotify")
+        
         self.commands = {
             # Weather commands
+            r"(?:full )?weather report(?: in| for)? (.+)": lambda match: self.handle_weather_report(match),
+            r"(?:full )?weather report": lambda: self.handle_weather_report("current location"),
             r"weather(?: in| for)? (.+)": lambda match: self.handle_weather(match),
             r"weather": lambda: self.handle_weather("current location"),
             r"forecast(?: in| for)? (.+)": lambda match: self.handle_forecast(match),
@@ -122,6 +199,8 @@ class VoiceAssistant:
             r"how is the moon( today| tonight| looking|)": self.handle_moon_phase,
             r"when('s| is) the next full moon": self.handle_next_full_moon,
             r"(when will|when can) I (see|expect) the next full moon": self.handle_next_full_moon,
+            r"(?:when(?:'s| is) the )?next (new moon|first quarter|last quarter)": self.handle_next_lunar_event,
+            r"(?:when are the |list the |)full moons (?:this year|in (\d{4}))": self.handle_full_moons,
             
             # System commands
             r"(internet |connection |)(speed test|test speed)": self.handle_speedtest,
@@ -142,7 +221,9 @@ class VoiceAssistant:
             r"(youtube\.com|youtube|gmail\.com|gmail|google\.com|facebook\.com|twitter\.com|reddit\.com|netflix\.com|google\.com|claude\.ai|crunchyroll\.com|crunchyroll)": self.handle_open_website,
             
             # Spotify commands
-            r"play (?:the )?(liked songs|discover weekly|release radar|roulette|this is echo tides|this is d|daily mix 1|daily mix 2|daily mix 3|this is evanescence|Final Fantasy VII|my chemical romance|this is agnes obel)(?: on| in)? spotify": self.handle_spotify_playlist,
+            r"play (?:the |my )?playlist (.+?)(?: on| in)? spotify": self.handle_spotify_playlist,
+            r"play (?:the |my )?(.+?) playlist(?: on| in)? spotify": self.handle_spotify_playlist,
+            self.playlist_intent: self.handle_spotify_playlist,
             r"play (.+?)(?: on| in)? spotify": self.handle_spotify_song,
             r"(pause|stop) (spotify|music)": self.handle_spotify_pause,
             r"resume (spotify|music)|play spotify|continue music": self.handle_spotify_resume,
@@ -160,9 +241,30 @@ class VoiceAssistant:
             r"help|what can you do": self.show_help,
             r"exit|quit|stop|goodbye": self.exit
         }
+        
+        # Precompile the patterns once, keeping their declaration order as priority
+        self.dispatcher = CommandDispatcher(self.commands)
+    
+    def _create_engine(self):
+        """Build and configure the text-to-speech engine (runs on the speech worker thread)"""
+        import pyttsx3
+        
+        engine = pyttsx3.init()
+        
+        # Configure voice
+        voices = engine.getProperty('voices')
+        # Try to find a female voice (often provides better clarity)
+        for voice in voices:
+            if "female" in voice.name.lower():
+                engine.setProperty('voice', voice.id)
+                break
+        
+        # Set speech rate
+        engine.setProperty('rate', 180)  # Speed of speech (words per minute)
+        return engine
     
     def speak(self, text, text_color=None):
-        """Convert text to speech"""
+        """Convert text to speech; returns once the text is queued, not when it has been spoken"""
         
         if text_color:
             print(f"{Style.DIM}{Fore.YELLOW}Assistant: {Style.RESET_ALL}{text_color}{text}{Style.RESET_ALL}")
@@ -170,52 +272,79 @@ class VoiceAssistant:
             print(f"{Style.DIM}{Fore.YELLOW}Assistant: {Style.RESET_ALL}{text}")
         
         clean_text = re.sub(r'\x1b\[\d+m', '', text)
-        self.engine.say(clean_text)
-        self.engine.runAndWait()
+        self.speech.say(clean_text)
         
         # print(f"Assistant: {text}")
         # self.engine.say(text)
         # self.engine.runAndWait()
     
-    def listen(self, timeout=None):
+    def listen(self, timeout=None, preroll=None, frames=None):
         """Listen for user speech and convert to text"""
+        if self.audio_capture:
+            return self._listen_shared_stream(timeout, preroll, frames)
+        
+        import speech_recognition as sr
+        
         with sr.Microphone() as source:
             # print(f"{Fore.CYAN}Listening...{Style.RESET_ALL}")
             self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
             try:
                 audio = self.recognizer.listen(source, timeout=timeout)
-                text = self.recognizer.recognize_google(audio)
-                print(f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}You said:{Style.RESET_ALL} {Fore.YELLOW}{text}{Style.RESET_ALL}")
-                return text.lower()
+                return self._recognize(audio)
             except sr.WaitTimeoutError:
                 return None
-            except sr.UnknownValueError:
-                return None
-            except sr.RequestError:
-                self.speak("Sorry, my speech service is down")
-                return None
             except Exception as e:
                 print(f"Error in listen: {e}")
                 return None
     
+    def _listen_shared_stream(self, timeout=None, preroll=None, frames=None):
+        """Capture a command from the shared microphone stream, without recalibrating"""
+        import speech_recognition as sr
+        
+        try:
+            frame_data = self.audio_capture.capture_command(timeout=timeout, preroll=preroll, frames=frames)
+            if not frame_data:
+                return None
+            audio = sr.AudioData(frame_data, self.audio_capture.sample_rate, 2)
+            return self._recognize(audio)
+        except Exception as e:
+            print(f"Error in listen: {e}")
+            return None
+    
+    def _recognize(self, audio):
+        """Convert captured audio to lowercase text"""
+        import speech_recognition as sr
+        
+        try:
+            text = self.recognizer.recognize_google(audio)
+            print(f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}You said:{Style.RESET_ALL} {Fore.YELLOW}{text}{Style.RESET_ALL}")
+            text = text.lower()
+            self._speculate(text)
+            return text
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError:
+            self.speak("Sorry, my speech service is down")
+            return None
+    
+    def _speculate(self, text):
+        """Start slow lookups for a recognized command before it is dispatched (Spotify song searches, when enabled)"""
+        if not self.config["spotify"].get("speculative_search", False):
+            return
+        handler, matches = self.dispatcher.match(text)
+        if handler == self.handle_spotify_song:
+            # Building the skill may import spotipy, so don't hold up the command loop for it
+            song_name = matches.group(1)
+            threading.Thread(target=lambda: self.spotify_skill.prefetch_song(song_name),
+                             name="spotify-speculate", daemon=True).start()
+    
     def process_command(self, text):
         """Process user commands based on pattern matching"""
         if not text:
             return
             
-        # Check each command pattern
-        for pattern, func in self.commands.items():
-            matches = re.search(pattern, text, re.IGNORECASE)
-            if matches:
-                if len(matches.groups()) > 0:
-                    # If there are capturing groups, pass them to the function
-                    if len(matches.groups()) == 1:
-                        return func(matches.group(1))
-                    else:
-                        return func(matches)
-                else:
-                    # No capturing groups, just call the function
-                    return func()
+        # Resolve the first matching command pattern in a single dispatcher pass
+        return self.dispatcher.dispatch(text)
         
         # If no command matched, respond with a default message
         # return f"{Style.DIM}{Fore.RED}I'm not sure how to help with that. Try asking for help to see what I can do.{Style.RESET_ALL}"
@@ -245,6 +374,28 @@ class VoiceAssistant:
             return result["error"]
 
     
+    def handle_next_lunar_event(self, phase):
+        """Handle next new moon / quarter requests"""
+        result = self.moon_phase_skill.get_next_event(phase)
+        
+        if result["success"]:
+            self.speak(result["speech"])
+            return None
+        else:
+            self.speak(f"Sorry, I couldn't work out the next {phase}: {result['error']}")
+            return result["error"]
+    
+    def handle_full_moons(self, year=None):
+        """Handle requests for all full moons of a year"""
+        result = self.moon_phase_skill.get_full_moons(year)
+        
+        if result["success"]:
+            self.speak(result["speech"])
+            return None
+        else:
+            self.speak(f"Sorry, I couldn't list the full moons: {result['error']}")
+            return result["error"]
+    
     
     # --- Weather handlers --- #
     def handle_weather(self, location):
@@ -258,6 +409,31 @@ class VoiceAssistant:
             print(result["detailed_info"])
         return None
     
+    def handle_weather_report(self, location):
+        """Handle requests for current conditions plus the forecast"""
+        self.speak(f"Getting the weather report for {location}")
+        result = self.weather_skill.get_weather_report(location)
+        
+        if "error" in result:
+            self.speak(f"Sorry, I couldn't get the weather report: {result['error']}")
+            return None
+        
+        current, forecast = result["current"], result["forecast"]
+        if "error" in current:
+            self.speak(f"Sorry, I couldn't get the weather: {current['error']}")
+        else:
+            self.speak(current["speech_summary"])
+            print(current["detailed_info"])
+        
+        if "error" in forecast:
+            self.speak(f"Sorry, I couldn't get the forecast: {forecast['error']}")
+        else:
+            self.speak(forecast["speech_intro"])
+            for day_summary in forecast["day_summaries"]:
+                self.speak(day_summary)
+            print(forecast["detailed_info"])
+        return None
+    
     def handle_forecast(self, location):
         """Handle forecast requests"""
         self.speak(f"Getting weather forecast for {location}")
@@ -443,9 +619,12 @@ class VoiceAssistant:
         help_text = f"""{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX}
         I can help you with the following:
         • Get the weather (say {Style.BRIGHT}{Fore.RED}'what's the weather'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX} or {Style.BRIGHT}{Fore.RED}'weather in [location]'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
+        • Get the weather and forecast together (say {Style.BRIGHT}{Fore.RED}'weather report'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX} or {Style.BRIGHT}{Fore.RED}'weather report for [location]'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
         • Get weather forecast (say {Style.BRIGHT}{Fore.RED}'forecast'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX} or {Style.BRIGHT}{Fore.RED}'forecast for [location]'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
         • Get moon phase (say {Style.BRIGHT}{Fore.RED}'what's the moon phase'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX} or {Style.BRIGHT}{Fore.RED}'how's the moon tonight'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
         • Get next full moon date (say {Style.BRIGHT}{Fore.RED}'when's the next full moon'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
+        • Get the next new moon or quarter (say {Style.BRIGHT}{Fore.RED}'next new moon'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX} or {Style.BRIGHT}{Fore.RED}'next last quarter'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
+        • List the full moons of a year (say {Style.BRIGHT}{Fore.RED}'full moons this year'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX} or {Style.BRIGHT}{Fore.RED}'full moons in 2027'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
         • Get internet speed (say {Style.BRIGHT}{Fore.RED}'test my internet speed'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
         • Tell you the time (say {Style.BRIGHT}{Fore.RED}'what time is it'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
         • Tell you the date (say {Style.BRIGHT}{Fore.RED}'what's today's date'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
@@ -455,6 +634,7 @@ class VoiceAssistant:
         • Find your phone (say {Style.BRIGHT}{Fore.RED}'find my phone'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
         • Control Spotify:
         • Play music (say {Style.BRIGHT}{Fore.RED}'play [song name] on Spotify'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
+        • Play a playlist (say {Style.BRIGHT}{Fore.RED}'play the [playlist name] playlist on Spotify'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
         • Pause music (say {Style.BRIGHT}{Fore.RED}'pause Spotify'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX} or {Style.BRIGHT}{Fore.RED}'stop music'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
         • Resume playback (say {Style.BRIGHT}{Fore.RED}'resume Spotify'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX} or {Style.BRIGHT}{Fore.RED}'play Spotify'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
         • Next track (say {Style.BRIGHT}{Fore.RED}'next song'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX} or {Style.BRIGHT}{Fore.RED}'skip song'{Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTMAGENTA_EX})
@@ -475,42 +655,76 @@ class VoiceAssistant:
         self.is_active = False
         return f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}Exiting voice assistant.{Style.RESET_ALL}"
     
-    def start_voice_mode(self):
-        """Start the voice assistant with wake word detection"""
+    def start_voice_mode(self, audio_source=None):
+        """Start the voice assistant with wake word detection, from the microphone or a recorded source"""
         self.speak("Rub the oil lamp to wake me up.", f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}")
         print(f"{Style.DIM}{Fore.LIGHTGREEN_EX}Voice Assistant is active.{Style.RESET_ALL}")
         print(f"{Style.DIM}{Fore.LIGHTGREEN_EX}Say 'Hey Google', 'Jarvis', or 'Computer' to wake me up.{Style.RESET_ALL}")
         print(f"{Style.DIM}{Fore.LIGHTGREEN_EX}Say 'exit' or 'quit' to end the session.{Style.RESET_ALL}")
         
+        from utils.audio_capture import AudioCaptureService
+        from utils.wake_word_detector import WakeWordDetector
+        
+        # Open the one microphone stream shared by wake word detection and commands
+        self.audio_capture = AudioCaptureService(source=audio_source)
+        if not self.audio_capture.start():
+            self.audio_capture = None
+            self.speak("Failed to open the microphone.")
+            return False
+        
         # Initialize wake word detector
         wake_detector = WakeWordDetector(
             access_key=self.config["wake_word"]["access_key"],
             wake_words=self.config["wake_word"]["wake_words"],
-            sensitivity=self.config["wake_word"]["sensitivity"]
+            sensitivity=self.config["wake_word"]["sensitivity"],
+            audio_capture=self.audio_capture
         )
         
         # Start the detector
         if not wake_detector.start():
+            self.audio_capture.stop()
+            self.audio_capture = None
             self.speak("Failed to start wake word detection.")
             return False
         
         self.is_listening = False
+        just_woken = False
         
         try:
             while self.is_active:
+                if self.audio_capture.finished:
+                    # A replayed recording has run out
+                    break
+                
                 if not self.is_listening:
                     # Check for wake word using Porcupine
                     detected_word = wake_detector.listen()
                     
                     if detected_word:
                         print(f"{Style.NORMAL}{Fore.LIGHTGREEN_EX}Wake word detected:{Style.RESET_ALL} {Fore.RED}{detected_word}{Style.RESET_ALL}")
+                        self.last_wake_time = time.perf_counter()
+                        # Cut off anything still being said (e.g. the greeting)
+                        self.speech.cancel()
                         self.is_listening = True
-                        self.speak("State your wish...", f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}")
+                        # Show the prompt instead of speaking it, so the user can talk
+                        # straight away; the detector has been buffering since the keyword
+                        print(f"{Style.DIM}{Fore.YELLOW}Assistant: {Style.RESET_ALL}{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}State your wish...{Style.RESET_ALL}")
+                        just_woken = True
                         active_until = time.time() + 30  # Active for 30 seconds
                 else:
+                    # Let the last answer play out, unless the wake word interrupts it
+                    if not just_woken and self._listen_for_barge_in(wake_detector):
+                        just_woken = True
+                    
                     # Command listening mode
                     print(f"{Fore.LIGHTRED_EX}Listening for command...{Style.RESET_ALL}")
-                    text = self.listen(timeout=3)
+                    if just_woken:
+                        # Start from the audio right after the wake word, then keep
+                        # reading the detector's frames so nothing in between is dropped
+                        just_woken = False
+                        text = self.listen(timeout=3, preroll=wake_detector.audio_since_keyword(), frames=wake_detector.frames)
+                    else:
+                        text = self.listen(timeout=3)
                     
                     if text:
                         print(f"{Style.DIM}{Fore.RED}Processing command:{Style.RESET_ALL} {Fore.RED}'{text}'{Style.RESET_ALL}")
@@ -533,6 +747,8 @@ class VoiceAssistant:
                     if time.time() > active_until:
                         self.speak("Going back to sleep mode.", f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}")
                         self.is_listening = False
+                        # Don't run the wake word engine over the commands we just heard
+                        wake_detector.discard_pending()
         
         except KeyboardInterrupt:
             print(f"{Style.BRIGHT}{Fore.LIGHTRED_EX}Stopping voice assistant...{Style.RESET_ALL}")
@@ -541,12 +757,42 @@ class VoiceAssistant:
         finally:
             # Clean up resources
             wake_detector.cleanup()
+            self.audio_capture.stop()
+            self.audio_capture = None
             
-        # Clean up resources
-        self.engine.stop()
+        # Clean up resources, letting any last words (e.g. "Goodbye!") finish first
+        self.speech.stop()
         print(f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}Voice assistant shutdown complete{Style.RESET_ALL}")
         return True
     
+    def _listen_for_barge_in(self, wake_detector):
+        """Keep running wake word detection while speech plays; stop the speech if the wake word is heard"""
+        if not self.speech.is_busy:
+            return False
+        
+        # Only look at audio from now on, not the command that was just handled
+        wake_detector.discard_pending()
+        while self.speech.is_busy and not self.audio_capture.finished:
+            detected_word = wake_detector.listen()
+            if detected_word and self._is_own_voice(detected_word):
+                # The microphone picked up the keyword in what we are saying
+                continue
+            if detected_word:
+                print(f"{Style.NORMAL}{Fore.LIGHTGREEN_EX}Interrupted by wake word:{Style.RESET_ALL} {Fore.RED}{detected_word}{Style.RESET_ALL}")
+                self.last_wake_time = time.perf_counter()
+                self.speech.cancel()
+                return True
+        return False
+    
+    def _is_own_voice(self, wake_word):
+        """Whether a wake word heard during playback is in the text being spoken (or just finished)"""
+        spoken = self.speech.recently_spoken()
+        if not spoken:
+            return False
+        words = re.findall(r"[a-z0-9]+", spoken.lower())
+        keyword = re.findall(r"[a-z0-9]+", wake_word.lower())
+        return any(words[i:i + len(keyword)] == keyword for i in range(len(words) - len(keyword) + 1))
+    
     def start_text_mode(self):
         """Start the assistant in text mode"""
         self.speak("Hello. I'm your text assistant. How can I help you today?")
@@ -564,6 +810,6 @@ class VoiceAssistant:
             except Exception as e:
                 print(f"Error in text mode: {e}")
                 
-        # Clean up resources
-        self.engine.stop()
+        # Clean up resources, letting any last words (e.g. "Goodbye!") finish first
+        self.speech.stop()
         return True
\ No newline at end of file